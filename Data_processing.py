@@ -1,116 +1,180 @@
 import sys
+import selectors
 import threading
 import time
 import socket
-import serial
 
 from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel
 from PySide6.QtCore import Signal, QObject
 
+from line_batcher import LineBatcher
+from rolling_stats import RollingStats
+from capture import CaptureWriter, SOURCE_SERIAL, SOURCE_UDP
+from replay import open_port, ReplayUdp, REPLAY_PREFIX
+from line_parser import LineParser, CsvFormat
+from state_store import StateStore
+from startup import after_first_paint, mark, report_when_shown
+
 
 LISTEN_IP = "192.168.178.218"
 LISTEN_PORT_YOLO = 5005
-sockYOLO = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sockYOLO.bind((LISTEN_IP, LISTEN_PORT_YOLO))
+US_PORT = "/dev/cu.usbmodem11401"
+# replay a capture instead of live sensors: "replay:captures/sensors?speed=1"
+REPLAY = None
 
 PAPIprev = 0
-DistanceList = []
+US_WINDOW = 1000   # ultrasonic samples in the rolling statistics
+CAPTURE_BASE = None   # e.g. "captures/sensors" to record both inputs
+ASYNCIO = False   # run both sensors on an asyncio loop instead of SensorLoop.run()
+DistanceHistory = None   # SampleStore, created when the sensors start
 
-ser = serial.Serial(port="/dev/cu.usbmodem11401", baudrate=115200, timeout=1)
+# "timeUS,distance"; timeUS == 0 lines may come without a distance
+USParser = LineParser(CsvFormat(["timeUS", "distance"], types=int, min_fields=1))
 
 
-class SystemState:
+class SystemState(StateStore):
+    # Published values (PAPI, distance, deldistance, USstatus, us_stats) are
+    # only changed through publish(), so the GUI never sees half an update.
     def __init__(self):
-        self.lock = threading.Lock()
-        self.PAPI = 0
-        self.distance = 0
-        self.deldistance = 0
+        self.us_stats = RollingStats(US_WINDOW)   # written by the sensor loop only
+        super().__init__(PAPI=0, distance=0, deldistance=0, USstatus="Initialising",
+                         us_stats=self.us_stats.snapshot())
         self.lastdata = 0
-        self.USstatus = "Initialising"
         self.running = True
 
 
 class Bridge(QObject):
-    update_signal = Signal(int, int, object, str)
-    # aguments emit(PAPI, distance, delta, USstatus)
+    update_signal = Signal(int, int, object, str, object)
+    # aguments emit(PAPI, distance, delta, USstatus, US stats dict)
     # delta is obj due to in declaration called none
 
 bridge = Bridge()
 
 
-class SensorYOLO(threading.Thread):
-    def __init__(self, state):
+class SensorLoop(threading.Thread):
+    # One thread, one selector for both sensors: wakes up as soon as a
+    # YOLO datagram or ultrasonic bytes arrive, never sleeps on a timer.
+    def __init__(self, state, sock, ser, capture=None):
         super().__init__(daemon=True)
         self.state = state
+        self.sock = sock
+        self.ser = ser
+        self.capture = capture
+        self.batcher = LineBatcher(flush_interval=0)
+        self.no_distance = 0   # timeUS lines without the distance they should carry
 
     def run(self):
+        sel = selectors.DefaultSelector()
+        self.sock.setblocking(False)
+        sel.register(self.sock, selectors.EVENT_READ, self.read_yolo)
+        sel.register(self.ser.fileno(), selectors.EVENT_READ, self.read_us)
+        try:
+            while self.state.running:
+                for key, _ in sel.select(timeout=0.5):
+                    key.data()
+        finally:
+            sel.close()
+
+    def attach(self, backend):
+        # asyncio mode: the same handlers, called from the backend's loop
+        backend.open_udp(self.on_datagram, sock=self.sock)
+        backend.add_reader(self.ser.fileno(), self.read_us)
+
+    # ---- YOLO (UDP) ----
+    def read_yolo(self):
+        # drain the socket, only the newest datagram matters
+        newest = None
+        while True:
+            try:
+                newest, _ = self.sock.recvfrom(1024)
+            except BlockingIOError:
+                break
+            if self.capture is not None:
+                self.capture.write(newest, SOURCE_UDP)
+        if newest is None:
+            return
+        try:
+            self.handle_yolo(int(newest.decode().strip()))
+        except ValueError:
+            pass
+
+    def on_datagram(self, data, addr):
+        if self.capture is not None:
+            self.capture.write(data, SOURCE_UDP)
+        try:
+            self.handle_yolo(int(data.decode().strip()))
+        except ValueError:
+            pass
+
+    def handle_yolo(self, PAPIraw):
         global PAPIprev
-        while self.state.running:
-            time.sleep(0.2)
-            data, _ = sockYOLO.recvfrom(1024)
-            PAPIraw = int(data.decode().strip())
-
-            if PAPIraw == 5:
-                self.state.PAPI = PAPIraw
-            elif abs(PAPIraw - PAPIprev) <= 1:
-                self.state.PAPI = PAPIraw
-            elif abs(PAPIraw - PAPIprev) > 1:
-                self.state.PAPI = 6
-            else:
-                self.state.PAPI = 7
-
-            PAPIprev = PAPIraw
-
-
-class SensorUS(threading.Thread):
-    def __init__(self, state):
-        super().__init__(daemon=True)
-        self.state = state
-
-    def run(self):
-        while self.state.running:
-            USraw = ser.readline().decode(errors="ignore").strip()
-            if not USraw:
-                continue
-
-            parts = USraw.split(',')
-            timeUS = int(parts[0])
-            Ldata = self.state.lastdata
-
-            if timeUS == 0:
-                timepassed = time.time() - Ldata
-                USstatus = "connection lost" if timepassed > 3 else "no data received yippie!!!"
-            else:
-                distanceUS = int(parts[1])
-                self.state.lastdata = time.time()
-                DistanceList.append(distanceUS)
-                self.state.distance = distanceUS
-
-                if len(DistanceList) > 1:
-                    self.state.deldistance = DistanceList[-1] - DistanceList[-2]
-
-                USstatus = "OK"
-
-            self.state.USstatus = USstatus
-
+        if PAPIraw == 5:
+            PAPI = PAPIraw
+        elif abs(PAPIraw - PAPIprev) <= 1:
+            PAPI = PAPIraw
+        elif abs(PAPIraw - PAPIprev) > 1:
+            PAPI = 6
+        else:
+            PAPI = 7
+
+        PAPIprev = PAPIraw
+        self.state.publish(PAPI=PAPI)
+
+    # ---- Ultrasonic (serial) ----
+    def read_us(self):
+        chunk = self.ser.read(self.ser.in_waiting or 1)
+        if self.capture is not None:
+            self.capture.write(chunk, SOURCE_SERIAL)
+        self.batcher.feed(chunk)
+        while self.batcher.pending():
+            for USraw in self.batcher.take():
+                self.handle_us(USraw)
+
+    def handle_us(self, USraw):
+        row = USParser.parse(USraw)
+        if row is None:
+            return   # malformed line, counted in USParser.malformed
+        timeUS = row["timeUS"]
+        Ldata = self.state.lastdata
+
+        if timeUS == 0:
+            timepassed = time.time() - Ldata
+            USstatus = "connection lost" if timepassed > 3 else "no data received yippie!!!"
+            self.state.publish(USstatus=USstatus)
+        elif row["distance"] is None:
+            self.no_distance += 1
+        else:
+            distanceUS = row["distance"]
+            self.state.lastdata = time.time()
+            DistanceHistory.append({"distance": distanceUS})
+            stats = self.state.us_stats
+            stats.push(distanceUS)
+            self.state.publish(distance=distanceUS, deldistance=stats.delta or 0,
+                               USstatus="OK", us_stats=stats.snapshot())
 
 
 class Monitor(threading.Thread):
-    def __init__(self, state):
+    # Sleeps until the state changes, then sends the newest snapshot to the
+    # GUI; at most one update per frame however fast the sensors publish.
+    def __init__(self, state, frame=1 / 60):
         super().__init__(daemon=True)
         self.state = state
+        self.frame = frame
+        self.updates = 0
 
     def run(self):
-        while self.state.running:
-            with self.state.lock:
-                PAPI = self.state.PAPI
-                distance = self.state.distance
-                deldistance = self.state.deldistance
-                USstatus = self.state.USstatus
+        seen = None   # show the initial values too
+        while True:
+            current = self.state.wait(seen)
+            if current is None:
+                return   # state closed
+            seen, values = current
 
             # send data to GUI instead of print
-            bridge.update_signal.emit(PAPI, distance, deldistance, USstatus)
-            time.sleep(0.1)
+            bridge.update_signal.emit(values["PAPI"], values["distance"], values["deldistance"],
+                                      values["USstatus"], values["us_stats"])
+            self.updates += 1
+            time.sleep(self.frame)
 
 
 class MonitorWindow(QWidget):
@@ -126,28 +190,100 @@ class MonitorWindow(QWidget):
 
         bridge.update_signal.connect(self.update_display)
 
-    def update_display(self, PAPI, distance, delta, status):
+    def update_display(self, PAPI, distance, delta, status, stats):
+        def fmt(v):
+            return "-" if v is None else f"{v:.1f}"
+
         self.label.setText(
             f"YOLO PAPI: {PAPI}\n"
             f"Distance: {distance}\n"
             f"Delta: {delta}\n"
-            f"US Status: {status}"
+            f"US Status: {status}\n"
+            f"Last {stats['count']}: mean {fmt(stats['mean'])}  std {fmt(stats['std'])}\n"
+            f"min {fmt(stats['min'])}  max {fmt(stats['max'])}  median {fmt(stats['median'])}"
         )
 
 
-state = SystemState()
-
-SensorYOLO(state).start()
-SensorUS(state).start()
-Monitor(state).start()
-
-
-app = QApplication(sys.argv)
-window = MonitorWindow()
-window.show()
-
-try:
-    sys.exit(app.exec())
-finally:
-    state.running = False
-
+class Sensors:
+    # The YOLO socket, the ultrasonic port and whatever reads them. Nothing
+    # is opened at import; start() runs once the window is on screen.
+    def __init__(self, state):
+        self.state = state
+        self.sock = None
+        self.ser = None
+        self.capture = None
+        self.loop = None
+        self.backend = None
+        self.yolo_replay = None
+        self.monitor = None
+
+    def start(self):
+        global DistanceHistory
+        from sample_store import SampleStore
+        DistanceHistory = SampleStore(["distance"], capacity=1_000_000)
+
+        # a replay sends its YOLO datagrams to our own socket, same path as live ones
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1" if REPLAY else LISTEN_IP, LISTEN_PORT_YOLO))
+        self.ser = open_port(REPLAY or US_PORT, baudrate=115200, timeout=1)
+        self.capture = CaptureWriter(CAPTURE_BASE) if CAPTURE_BASE else None
+
+        self.loop = SensorLoop(self.state, self.sock, self.ser, self.capture)
+        if ASYNCIO:
+            from aio_transport import AsyncioBackend
+            self.backend = AsyncioBackend()
+            self.backend.start()
+            self.loop.attach(self.backend)
+        else:
+            self.loop.start()
+
+        if REPLAY:
+            # same clock as the serial replay: both streams stay in step
+            self.yolo_replay = ReplayUdp(self.ser.base, self.sock.getsockname(),
+                                         clock=self.ser.clock)
+        self.monitor = Monitor(self.state)
+        self.monitor.start()
+
+    def close(self):
+        self.state.running = False
+        self.state.close()
+        # nothing may read the socket or the port once they are closed
+        if self.backend is not None:
+            self.backend.stop()
+        elif self.loop is not None and self.loop.is_alive():
+            self.loop.join()   # leaves select() within its 0.5 s timeout
+        if self.yolo_replay is not None:
+            self.yolo_replay.close()
+        if self.capture is not None:
+            self.capture.close()
+        if self.sock is not None:
+            self.sock.close()
+        if self.ser is not None and self.ser.is_open:
+            self.ser.close()
+
+
+def main():
+    mark("imports")
+    app = QApplication(sys.argv)
+    window = MonitorWindow()
+    mark("window built")
+    window.show()
+    report_when_shown(window)
+
+    sensors = Sensors(SystemState())
+
+    def start_sensors():
+        try:
+            sensors.start()
+        except Exception as e:
+            window.label.setText(f"Sensor error: {e}")
+
+    after_first_paint(window, start_sensors)
+    try:
+        return app.exec()
+    finally:
+        sensors.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
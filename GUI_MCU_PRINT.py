@@ -1,42 +1,18 @@
 import sys
-import serial
-import serial.tools.list_ports
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QTextEdit, QComboBox, QLabel, QMessageBox
+    QPushButton, QComboBox, QLabel, QMessageBox, QCheckBox, QFileDialog
 )
-from PySide6.QtCore import QThread, Signal
 
+from serial_reader import SerialReader
+from replay import replay_port
+from log_view import LogView
+from startup import after_first_paint, mark, report_when_shown
+from port_registry import PortRegistry, PortChooser
 
-# ---------------- Serial Thread ----------------
-class SerialReader(QThread):
-    data_received = Signal(str)
-    error = Signal(str)
 
-    def __init__(self, port, baudrate=115200):
-        super().__init__()
-        self.port = port
-        self.baudrate = baudrate
-        self.running = True
-        self.ser = None
-
-    def run(self):
-        try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
-            while self.running:
-                line = self.ser.readline().decode(errors="ignore").strip()
-                if line:
-                    self.data_received.emit(line)
-        except Exception as e:
-            self.error.emit(str(e))
-        finally:
-            if self.ser and self.ser.is_open:
-                self.ser.close()
-
-    def stop(self):
-        self.running = False
-        self.wait()
+CAPTURE_DIR = "captures"
 
 
 # ---------------- GUI ----------------
@@ -49,7 +25,11 @@ class SerialMonitor(QWidget):
 
         self.reader = None
         self.init_ui()
-        self.refresh_ports()
+
+        self.registry = PortRegistry()
+        self.port_chooser = PortChooser(self.port_combo, self.registry)
+        self.port_chooser.reconnect.connect(self.auto_reconnect)
+        after_first_paint(self, self.registry.start)
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -65,6 +45,10 @@ class SerialMonitor(QWidget):
         self.refresh_btn.clicked.connect(self.refresh_ports)
         port_row.addWidget(self.refresh_btn)
 
+        self.auto_check = QCheckBox("Auto-reconnect")
+        self.auto_check.setChecked(True)
+        port_row.addWidget(self.auto_check)
+
         layout.addLayout(port_row)
 
         # ---- Connect buttons ----
@@ -75,22 +59,27 @@ class SerialMonitor(QWidget):
         btn_row.addWidget(self.connect_btn)
 
         self.disconnect_btn = QPushButton("Disconnect")
-        self.disconnect_btn.clicked.connect(self.disconnect_serial)
+        self.disconnect_btn.clicked.connect(self.user_disconnect)
         self.disconnect_btn.setEnabled(False)
         btn_row.addWidget(self.disconnect_btn)
 
+        self.record_check = QCheckBox("Record")
+        self.record_check.toggled.connect(self.toggle_record)
+        btn_row.addWidget(self.record_check)
+
+        self.replay_btn = QPushButton("Replay...")
+        self.replay_btn.clicked.connect(self.choose_replay)
+        btn_row.addWidget(self.replay_btn)
+
         layout.addLayout(btn_row)
 
         # ---- Output ----
-        self.output = QTextEdit()
-        self.output.setReadOnly(True)
+        self.output = LogView(max_lines=200_000)
         layout.addWidget(self.output)
 
     # -------- Logic --------
     def refresh_ports(self):
-        self.port_combo.clear()
-        for p in serial.tools.list_ports.comports():
-            self.port_combo.addItem(p.device)
+        self.registry.refresh()
 
     def connect_serial(self):
         if self.reader:
@@ -103,8 +92,11 @@ class SerialMonitor(QWidget):
 
         self.reader = SerialReader(port)
         self.reader.data_received.connect(self.output.append)
-        self.reader.error.connect(self.on_error)
+        self.reader.lines_received.connect(self.output.append_lines)
+        self.reader.disconnected.connect(self.on_error)
+        self.toggle_record()
         self.reader.start()
+        self.port_chooser.remember(port)
 
         self.output.append(f"Connected to {port}")
         self.connect_btn.setEnabled(False)
@@ -113,24 +105,64 @@ class SerialMonitor(QWidget):
     def disconnect_serial(self):
         if self.reader:
             self.reader.stop()
+            self.stop_record()
             self.reader = None
             self.output.append("Disconnected")
 
         self.connect_btn.setEnabled(True)
         self.disconnect_btn.setEnabled(False)
 
+    def toggle_record(self):
+        if not self.reader:
+            return
+        recording = self.reader.capture is not None
+        if self.record_check.isChecked() and not recording:
+            base = self.reader.start_capture(CAPTURE_DIR)
+            self.output.append(f"Recording to {base}.*.cap")
+        elif not self.record_check.isChecked() and recording:
+            self.stop_record()
+
+    def stop_record(self):
+        capture = self.reader.stop_capture() if self.reader else None
+        if capture is not None:
+            self.output.append(f"Recorded {capture.summary()}")
+
+    def choose_replay(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Replay capture", CAPTURE_DIR,
+                                              "Captures (*.cap)")
+        if path:
+            self.port_combo.addItem(replay_port(path))
+            self.port_combo.setCurrentIndex(self.port_combo.count() - 1)
+
+    def user_disconnect(self):
+        self.port_chooser.forget()
+        self.disconnect_serial()
+
     def on_error(self, msg):
         self.output.append(f"[ERROR] {msg}")
         self.disconnect_serial()
+        if self.auto_check.isChecked() and self.port_chooser.wanted is not None:
+            self.output.append("Waiting for the device to come back...")
+            self.port_chooser.lost()
+
+    def auto_reconnect(self, device):
+        if self.reader or not self.auto_check.isChecked():
+            return
+        self.port_combo.setCurrentText(device)
+        self.connect_serial()
 
     def closeEvent(self, event):
         self.disconnect_serial()
+        self.registry.stop()
         event.accept()
 
 
 # ---------------- Main ----------------
 if __name__ == "__main__":
+    mark("imports")
     app = QApplication(sys.argv)
     win = SerialMonitor()
+    mark("window built")
     win.show()
+    report_when_shown(win)
     sys.exit(app.exec())
\ No newline at end of file
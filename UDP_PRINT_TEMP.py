@@ -2,49 +2,32 @@
 # used for monitoring printf from Mcu , UDP MCU carrier 
 
 import sys
-import serial
-import serial.tools.list_ports
-from collections import deque
-import socket
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QTextEdit, QComboBox, QLabel, QMessageBox,
-    QLineEdit, QCheckBox
+    QPushButton, QComboBox, QLabel, QMessageBox,
+    QLineEdit, QCheckBox, QListWidget, QListWidgetItem, QFileDialog
 )
 
-from PySide6.QtCore import QThread, Signal, QTimer
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+from PySide6.QtCore import Qt, QTimer
 
+from serial_reader import SerialReader
+from replay import replay_port
+from log_view import LogView
+from line_parser import LineParser, KeyValueFormat, TemplateFormat
+from udp_sink import UdpForwarder
+from latency import LatencyStages
+from perf_overlay import PerfCounters, PerfOverlay
+from handoff import Handoff, POLICIES, BLOCK, DROP_OLDEST
+from startup import after_first_paint, mark, report_when_shown
+from port_registry import PortRegistry, PortChooser
 
-class SerialReader(QThread):
-    data_received = Signal(str)
-    disconnected = Signal(str)
 
-    def __init__(self, port, baudrate=115200):
-        super().__init__()
-        self.port = port
-        self.baudrate = baudrate
-        self.serial = None
-        self.running = True
-
-    def run(self):
-        try:
-            self.serial = serial.Serial(self.port, self.baudrate, timeout=1)
-            while self.running:
-                line = self.serial.readline().decode("utf-8", errors="ignore").strip()
-                if line:
-                    self.data_received.emit(line)
-        except Exception as e:
-            self.disconnected.emit(f"Serial error: {e}")
-        finally:
-            if self.serial and self.serial.is_open:
-                self.serial.close()
-
-    def stop(self):
-        self.running = False
-        self.wait()
+HISTORY = 500_000     # samples kept per field (float32, a few MB per field)
+PLOT_WINDOW = 1000    # samples shown in the live plot at first (zoom out for history)
+CAPTURE_DIR = "captures"   # recordings
+LATENCY_DIR = "captures"   # where "Save latency" writes
+DISPLAY_BACKLOG = 50_000   # lines waiting for log + plot before the policy kicks in
 
 
 class SerialMonitor(QWidget):
@@ -54,15 +37,32 @@ class SerialMonitor(QWidget):
         self.setGeometry(200, 200, 800, 650)
 
         self.reader_thread = None
-        self.raw_values = deque(maxlen=100)
-        self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.samples = None     # SampleStore, built with the plot
+        self.live_plot = None   # built on the first parsed value, see build_plot()
+        # the old "raw value = N" lines, then any name=value fields
+        self.parser = LineParser(TemplateFormat("raw value = %(raw)d"), KeyValueFormat())
+        # read -> batch emitted -> parsed / sent over UDP / in the log view
+        self.latency = LatencyStages("batch", "parse", "forward", "display")
+        self.counters = PerfCounters()
+        # reader -> log view and plot, allowed to shed load; the forwarder
+        # blocks the reader instead of dropping anything
+        self.display = Handoff(DISPLAY_BACKLOG, DROP_OLDEST)
+        self.forwarder = UdpForwarder(mtu=1400, flush_interval=0.01, policy=BLOCK,
+                                      latency=self.latency["forward"])
+        self.forwarder.start()
 
         self.init_ui()
-        self.refresh_ports()
 
-        self.plot_timer = QTimer()
-        self.plot_timer.timeout.connect(self.update_plot)
-        self.plot_timer.start(100)
+        # port list maintained in the background, filled in once the window is up
+        self.registry = PortRegistry()
+        self.port_chooser = PortChooser(self.combo, self.registry)
+        self.port_chooser.reconnect.connect(self.auto_reconnect)
+        after_first_paint(self, self.registry.start)
+
+        self.udp_timer = QTimer()
+        self.udp_timer.timeout.connect(self.update_udp_stats)
+        self.udp_timer.timeout.connect(self.update_latency)
+        self.udp_timer.start(500)
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -75,6 +75,9 @@ class SerialMonitor(QWidget):
         self.refresh_button = QPushButton("🔄 Refresh")
         self.refresh_button.clicked.connect(self.refresh_ports)
         port_row.addWidget(self.refresh_button)
+        self.auto_check = QCheckBox("Auto-reconnect")
+        self.auto_check.setChecked(True)
+        port_row.addWidget(self.auto_check)
         layout.addLayout(port_row)
 
         # --- Connect/Disconnect Buttons ---
@@ -83,46 +86,160 @@ class SerialMonitor(QWidget):
         self.connect_button.clicked.connect(self.connect_serial)
         btn_row.addWidget(self.connect_button)
         self.disconnect_button = QPushButton("Disconnect")
-        self.disconnect_button.clicked.connect(self.disconnect_serial)
+        self.disconnect_button.clicked.connect(self.user_disconnect)
         self.disconnect_button.setEnabled(False)
         btn_row.addWidget(self.disconnect_button)
+        self.record_check = QCheckBox("● Record")
+        self.record_check.toggled.connect(self.toggle_record)
+        btn_row.addWidget(self.record_check)
+        self.replay_button = QPushButton("Replay…")
+        self.replay_button.setToolTip("Add a recorded session to the port list")
+        self.replay_button.clicked.connect(self.choose_replay)
+        btn_row.addWidget(self.replay_button)
         layout.addLayout(btn_row)
 
         # --- UDP Settings ---
         udp_row = QHBoxLayout()
         self.udp_enable = QCheckBox("Enable UDP")
         self.udp_enable.setChecked(False)
+        self.udp_enable.toggled.connect(self.apply_udp_settings)
         udp_row.addWidget(self.udp_enable)
         udp_row.addWidget(QLabel("IP:"))
         self.udp_ip = QLineEdit("127.0.0.1")
+        self.udp_ip.editingFinished.connect(self.apply_udp_settings)
         udp_row.addWidget(self.udp_ip)
         udp_row.addWidget(QLabel("Port:"))
         self.udp_port = QLineEdit("5005")
+        self.udp_port.editingFinished.connect(self.apply_udp_settings)
         udp_row.addWidget(self.udp_port)
+        self.udp_stats = QLabel("sent 0 | dropped 0 | errors 0 | truncated 0")
+        udp_row.addWidget(self.udp_stats)
         layout.addLayout(udp_row)
 
         # --- Serial Output Text Area ---
-        self.text_box = QTextEdit()
-        self.text_box.setReadOnly(True)
+        self.text_box = LogView(max_lines=200_000)
+        self.text_box.latency = self.latency["display"]
         layout.addWidget(self.text_box, stretch=2)
 
-        # --- Plot Area ---
+        # --- Latency ---
+        latency_row = QHBoxLayout()
+        self.stamp_check = QCheckBox("Timestamps")
+        self.stamp_check.toggled.connect(self.toggle_timestamps)
+        latency_row.addWidget(self.stamp_check)
+        self.perf_check = QCheckBox("Perf")
+        latency_row.addWidget(self.perf_check)
+        latency_row.addWidget(QLabel("Display behind:"))
+        self.policy_combo = QComboBox()
+        for policy in POLICIES:
+            self.policy_combo.addItem(policy, policy)
+        self.policy_combo.setCurrentText(self.display.policy)
+        self.policy_combo.setToolTip("What log and plot give up when they cannot keep up")
+        self.policy_combo.currentIndexChanged.connect(self.change_policy)
+        latency_row.addWidget(self.policy_combo)
+        self.latency_label = QLabel(self.latency.summary())
+        latency_row.addWidget(self.latency_label, stretch=1)
+        self.latency_button = QPushButton("Save latency")
+        self.latency_button.clicked.connect(self.save_latency)
+        latency_row.addWidget(self.latency_button)
+        layout.addLayout(latency_row)
+
+        # --- Perf overlay (over the log, sampled only while shown) ---
+        c, f = self.counters, self.forwarder
+        self.perf = PerfOverlay(self.text_box)
+        self.perf.add_rate("bytes/s", lambda: c.bytes)
+        self.perf.add_rate("lines/s", lambda: c.lines)
+        self.perf.add_level("display queue", lambda: self.display.depth)
+        self.perf.add_level("display dropped", lambda: self.display.dropped)
+        self.perf.add_level("log backlog", self.text_box.pending)
+        self.perf.add_level("parse errors", lambda: self.parser.malformed)
+        self.perf.add_rate("UDP datagrams/s", lambda: f.sent)
+        self.perf.add_level("UDP queue", f.backlog)
+        self.perf.add_level("UDP dropped", lambda: f.dropped_lines)
+        self.perf.add_level("reader blocked", lambda: f.queue.blocked_ns / 1e6, "{:,.0f} ms")
+        self.perf.add_mean_ms("plot frame", lambda: self.live_plot.frames if self.live_plot else 0,
+                              lambda: self.live_plot.frame_ns if self.live_plot else 0)
+        self.perf.add_level("plot points", lambda: self.live_plot.points if self.live_plot else 0)
+        self.perf.add_lag()
+        self.perf_check.toggled.connect(self.perf.setVisible)
+
+        # --- Plot Area (filled in by build_plot) ---
+        self.plot_area = QVBoxLayout()
+        self.plot_placeholder = QLabel("The plot starts with the first value.")
+        self.plot_placeholder.setAlignment(Qt.AlignCenter)
+        self.plot_area.addWidget(self.plot_placeholder)
+        layout.addLayout(self.plot_area, stretch=1)
+
+    def build_plot(self):
+        # matplotlib and numpy take longer to import than the whole window
+        # takes to show, so they load with the first value to plot
+        import numpy as np
+        from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        from live_plot import LivePlot
+        from sample_store import SampleStore
+
+        # one column per field, found as the firmware prints them
+        self.samples = SampleStore(capacity=HISTORY, dtype=np.float32)
+
         self.figure = Figure(figsize=(5, 2))
         self.canvas = FigureCanvas(self.figure)
-        self.ax = self.figure.add_subplot(111)
-        self.line, = self.ax.plot([], [], 'g-')
-        self.ax.set_ylim(0, 300)
-        self.ax.set_xlim(0, 100)
-        self.ax.set_title("Live Raw Values")
-        self.ax.set_xlabel("Samples")
-        self.ax.set_ylabel("Value")
-        layout.addWidget(self.canvas, stretch=1)
+        self.plot_area.removeWidget(self.plot_placeholder)
+        self.plot_placeholder.deleteLater()
+
+        plot_row = QHBoxLayout()
+        self.stack_check = QCheckBox("Stacked")
+        self.stack_check.setToolTip("One axes per series")
+        self.stack_check.toggled.connect(self.toggle_stacked)
+        plot_row.addWidget(self.stack_check)
+        self.autoscale_check = QCheckBox("Autoscale")
+        self.autoscale_check.setChecked(True)
+        self.autoscale_check.toggled.connect(self.toggle_autoscale)
+        plot_row.addWidget(self.autoscale_check)
+        plot_row.addWidget(QLabel("Decimation:"))
+        self.lod_combo = QComboBox()
+        self.lod_combo.addItem("min/max", "minmax")
+        self.lod_combo.addItem("LTTB", "lttb")
+        self.lod_combo.setToolTip("min/max keeps every spike, LTTB keeps the shape")
+        self.lod_combo.currentIndexChanged.connect(self.change_decimation)
+        plot_row.addWidget(self.lod_combo)
+        plot_row.addWidget(QLabel("wheel: zoom | drag: back in history | double click: live"),
+                           stretch=1)
+        self.plot_area.addLayout(plot_row)
+
+        # series list (check to show) next to the plot
+        plot_split = QHBoxLayout()
+        self.series_list = QListWidget()
+        self.series_list.setMaximumWidth(160)
+        self.series_list.itemChanged.connect(self.toggle_series)
+        plot_split.addWidget(self.series_list)
+        plot_split.addWidget(self.canvas, stretch=1)
+        self.plot_area.addLayout(plot_split, stretch=1)
+
+        self.live_plot = LivePlot(self.canvas, self.samples, window=PLOT_WINDOW, fps=20)
+        self.live_plot.on_series = self.add_series
+        self.live_plot.start()
+
+    def add_series(self, name):
+        item = QListWidgetItem(name)
+        item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+        item.setCheckState(Qt.Checked)
+        self.series_list.addItem(item)
+
+    def toggle_series(self, item):
+        self.live_plot.set_visible(item.text(), item.checkState() == Qt.Checked)
+
+    def toggle_stacked(self, on):
+        self.live_plot.set_stacked(on)
+
+    def toggle_autoscale(self, on):
+        self.live_plot.set_autoscale(on)
+
+    def change_decimation(self):
+        self.live_plot.set_mode(self.lod_combo.currentData())
 
     def refresh_ports(self):
-        self.combo.clear()
-        ports = serial.tools.list_ports.comports()
-        for port in ports:
-            self.combo.addItem(port.device)
+        # the registry keeps the list current; this forces a rescan
+        self.registry.refresh()
         self.connect_button.setEnabled(True)
 
     def connect_serial(self):
@@ -135,10 +252,20 @@ class SerialMonitor(QWidget):
             QMessageBox.warning(self, "No Port Selected", "Choose a serial port.")
             return
 
-        self.reader_thread = SerialReader(port)
+        self.latency.reset()
+        self.reader_thread = SerialReader(port, latency=self.latency, counters=self.counters,
+                                          display=self.display, queues=[self.forwarder.queue])
         self.reader_thread.data_received.connect(self.update_output)
+        self.reader_thread.lines_ready.connect(self.take_display)
+        # forwarding happens in the reader thread, not via the GUI event loop
+        self.reader_thread.lines_received.connect(self.forwarder.send_lines,
+                                                  Qt.DirectConnection)
+        self.reader_thread.data_received.connect(lambda line: self.forwarder.send_lines([line]),
+                                                 Qt.DirectConnection)
         self.reader_thread.disconnected.connect(self.handle_disconnect)
+        self.toggle_record()
         self.reader_thread.start()
+        self.port_chooser.remember(port)
 
         self.connect_button.setEnabled(False)
         self.disconnect_button.setEnabled(True)
@@ -147,51 +274,125 @@ class SerialMonitor(QWidget):
     def disconnect_serial(self):
         if self.reader_thread:
             self.reader_thread.stop()
+            self.take_display()   # the last lines the reader queued
+            self.display.notify = None
+            self.stop_record()
             self.reader_thread = None
             self.text_box.append("Disconnected")
 
         self.connect_button.setEnabled(True)
         self.disconnect_button.setEnabled(False)
 
+    def user_disconnect(self):
+        self.port_chooser.forget()
+        self.disconnect_serial()
+
     def handle_disconnect(self, msg):
         self.text_box.append(msg)
         self.disconnect_serial()
+        if self.auto_check.isChecked() and self.port_chooser.wanted is not None:
+            self.text_box.append("Waiting for the device to come back...")
+            self.port_chooser.lost()
+
+    def auto_reconnect(self, device):
+        # the remembered board is back, possibly under a new name
+        if self.reader_thread or not self.auto_check.isChecked():
+            return
+        self.combo.setCurrentText(device)
+        self.connect_serial()
+
+    # --- Recording / replay ---
+    def toggle_record(self):
+        if not self.reader_thread:
+            return
+        recording = self.reader_thread.capture is not None
+        if self.record_check.isChecked() and not recording:
+            base = self.reader_thread.start_capture(CAPTURE_DIR)
+            self.text_box.append(f"Recording to {base}.*.cap")
+        elif not self.record_check.isChecked() and recording:
+            self.stop_record()
+
+    def stop_record(self):
+        capture = self.reader_thread.stop_capture() if self.reader_thread else None
+        if capture is not None:
+            self.text_box.append(f"Recorded {capture.summary()}")
+
+    def choose_replay(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Replay capture", CAPTURE_DIR,
+                                              "Captures (*.cap)")
+        if path:
+            self.combo.addItem(replay_port(path))
+            self.combo.setCurrentIndex(self.combo.count() - 1)
 
     def update_output(self, text):
-        self.text_box.append(text)
+        self.update_lines([text])
+
+    def take_display(self):
+        lines = self.display.take()
+        if lines:
+            self.update_lines(lines)
 
-        # --- UDP Forwarding ---
-        if self.udp_enable.isChecked():
-            try:
-                ip = self.udp_ip.text().strip()
-                port = int(self.udp_port.text().strip())
-                self.udp_socket.sendto(text.encode('utf-8'), (ip, port))
-            except Exception as e:
-                self.text_box.append(f"[UDP Error] {e}")
+    def change_policy(self):
+        self.display.policy = self.policy_combo.currentData()
+
+    def update_lines(self, lines):
+        self.text_box.append_lines(lines)
 
         # --- Parse for plotting ---
-        if "raw value =" in text:
-            try:
-                value = int(text.split("=")[-1].strip())
-                self.raw_values.append(value)
-            except ValueError:
-                pass
-
-    def update_plot(self):
-        y = list(self.raw_values)
-        x = list(range(len(y)))
-        self.line.set_data(x, y)
-        self.ax.set_xlim(0, max(100, len(y)))
-        self.canvas.draw()
+        batch = self.parser.parse_batch(lines)
+        stamps = getattr(lines, "stamps", None)
+        if stamps:
+            self.latency.record_stamps("parse", stamps)
+        if batch.rows:
+            if self.live_plot is None:
+                self.build_plot()
+            self.samples.extend(batch.columns)
+
+    # --- UDP Forwarding ---
+    def apply_udp_settings(self):
+        # resolve the destination once, not per line
+        if not self.udp_enable.isChecked():
+            self.forwarder.disable()
+            return
+        try:
+            self.forwarder.set_destination(self.udp_ip.text().strip(),
+                                           self.udp_port.text().strip())
+        except Exception as e:
+            self.forwarder.disable()
+            self.text_box.append(f"[UDP Error] {e}")
+
+    def update_udp_stats(self):
+        f = self.forwarder
+        self.udp_stats.setText(f"sent {f.sent} | dropped {f.dropped} | errors {f.errors}"
+                               f" | truncated {f.truncated}")
+
+    # --- Latency ---
+    def toggle_timestamps(self, on):
+        # applies to lines appended from now on
+        self.text_box.show_timestamps = on
+
+    def update_latency(self):
+        self.latency_label.setText(self.latency.summary())
+
+    def save_latency(self):
+        path = self.latency.save(LATENCY_DIR)
+        self.text_box.append(f"Latency histograms saved to {path}")
 
     def closeEvent(self, event):
         self.disconnect_serial()
-        self.udp_socket.close()
+        if self.live_plot:
+            self.live_plot.stop()
+        self.udp_timer.stop()
+        self.forwarder.stop()
+        self.registry.stop()
         event.accept()
 
 
 if __name__ == "__main__":
+    mark("imports")
     app = QApplication(sys.argv)
     window = SerialMonitor()
+    mark("window built")
     window.show()
+    report_when_shown(window)
     sys.exit(app.exec())
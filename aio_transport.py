@@ -0,0 +1,91 @@
+# aio_transport.py
+# Optional asyncio I/O backend: every serial port and UDP socket of a tool
+# on one event loop, in one thread.
+#
+# Serial ports are plain non-blocking fds watched with loop.add_reader(),
+# UDP goes through loop.create_datagram_endpoint(). Callbacks run in the
+# loop thread; Qt code emits signals from there, which Qt queues to the
+# GUI thread as usual. Nothing blocks on a read timeout, so stop() returns
+# as soon as the loop has processed it.
+#
+# (PySide6.QtAsyncio would run the loop on the Qt thread itself, but it does
+# not implement add_reader() or create_datagram_endpoint() yet.)
+
+import asyncio
+import concurrent.futures
+import threading
+
+
+class DatagramSource(asyncio.DatagramProtocol):
+    def __init__(self, on_datagram, on_error=None):
+        self.on_datagram = on_datagram
+        self.on_error = on_error
+
+    def datagram_received(self, data, addr):
+        self.on_datagram(data, addr)
+
+    def error_received(self, exc):
+        if self.on_error:
+            self.on_error(exc)
+
+
+class AsyncioBackend(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True, name="asyncio-io")
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def start(self):
+        super().start()
+        self._ready.wait()
+
+    def stop(self):
+        if self.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.join()
+
+    # ---- Calls into the loop (any thread) ----
+    def in_loop(self):
+        return threading.current_thread() is self
+
+    def call(self, fn, *args):
+        # run fn(*args) in the loop thread, don't wait
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    def call_wait(self, fn, *args, timeout=5):
+        # run fn(*args) in the loop thread and return its result
+        if self.in_loop():
+            return fn(*args)
+        future = concurrent.futures.Future()
+
+        def runner():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self.loop.call_soon_threadsafe(runner)
+        return future.result(timeout)
+
+    # ---- Sources ----
+    def add_reader(self, fd, callback):
+        self.call_wait(self.loop.add_reader, fd, callback)
+
+    def remove_reader(self, fd):
+        self.call_wait(self.loop.remove_reader, fd)
+
+    def open_udp(self, on_datagram, local_addr=None, sock=None, on_error=None):
+        # returns the DatagramTransport; on_datagram(data, addr) runs in the loop
+        coro = self.loop.create_datagram_endpoint(
+            lambda: DatagramSource(on_datagram, on_error), local_addr=local_addr, sock=sock)
+        transport, _ = asyncio.run_coroutine_threadsafe(coro, self.loop).result(5)
+        return transport
@@ -0,0 +1,266 @@
+# bench_throughput.py
+# Throughput / latency benchmark for the serial monitors, no hardware needed.
+#
+# A fake MCU (child process) writes lines into a Linux pseudo-terminal at a
+# fixed rate; the monitor under test reads the other end, headless on the
+# offscreen Qt platform. Every line carries its send time, so the time until
+# it reaches the log view gives the read-to-display latency.
+#
+#   python bench_throughput.py                          # default matrix
+#   python bench_throughput.py --targets mcu_debug --rates 1000 50000 --out run.json
+#   python bench_throughput.py --compare old.json new.json
+#
+# Each target/rate runs in its own process, so CPU time and RSS are its own.
+# Results are JSON: one record per run plus host info.
+
+import argparse
+import json
+import os
+import platform
+import pty
+import resource
+import subprocess
+import sys
+import time
+import tty
+
+
+TARGETS = ["mcu_debug", "GUI_MCU_PRINT", "UDP_PRINT_TEMP"]
+FORMATS = {
+    # body of a line after the "#seq@t_ns " header
+    "raw": lambda i: f"raw value = {i % 300}",
+    "kv": lambda i: f"t={i} temp={20 + i % 10}.5 hum={40 + i % 7}",
+    "csv": lambda i: f"{i},{i % 400}",
+}
+
+
+# ---------------- Fake MCU (child process) ----------------
+def fake_mcu(fd, rate, size, fmt, duration):
+    body = FORMATS[fmt]
+    sent = 0
+    start = time.monotonic()
+    end = start + duration
+    while True:
+        now = time.monotonic()
+        if now >= end:
+            break
+        due = int((now - start) * rate)
+        if due > sent:
+            out = []
+            stamp = time.monotonic_ns()
+            for i in range(sent, due):
+                line = f"#{i}@{stamp} {body(i)}"
+                out.append(line.ljust(size - 1) + "\n")
+            os.write(fd, "".join(out).encode())
+            sent = due
+        time.sleep(0.001)
+    print(sent, flush=True)
+
+
+# ---------------- One run (child process) ----------------
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    i = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+
+def run_one(target, rate, size, fmt, duration):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import importlib
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QTimer
+
+    app = QApplication([])
+    module = importlib.import_module(target)
+
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    port = os.ttyname(slave)
+
+    window = module.SerialMonitor()
+    combo = getattr(window, "combo", None) or window.port_combo
+    view = getattr(window, "text_box", None) or window.output
+    combo.addItem(port)
+    combo.setCurrentIndex(combo.count() - 1)
+
+    # stamp every line when it reaches the log model
+    latencies = []
+    displayed = [0]   # lines
+    model_append = view.log_model.append_lines
+
+    def on_display(lines):
+        now = time.monotonic_ns()
+        for line in lines:
+            if line.startswith("#"):
+                head = line.split(" ", 1)[0]
+                latencies.append(now - int(head.split("@", 1)[1]))
+                displayed[0] += 1
+        model_append(lines)
+
+    view.log_model.append_lines = on_display
+
+    window.connect_serial()
+    # raw bytes off the port, line endings and partial lines included
+    reader = getattr(window, "reader_thread", None) or window.reader
+    bytes_start = reader.counters.bytes
+    rss_start = rss_kb()
+    cpu_start = resource.getrusage(resource.RUSAGE_SELF)
+    wall_start = time.monotonic()
+
+    mcu = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--fake-mcu", str(master),
+         str(rate), str(size), fmt, str(duration)],
+        pass_fds=[master], stdout=subprocess.PIPE, text=True)
+
+    # let the reader drain what is left after the MCU stops
+    QTimer.singleShot(int((duration + 1.0) * 1000), app.quit)
+    app.exec()
+
+    sent = int(mcu.communicate()[0].strip() or 0)
+    wall = time.monotonic() - wall_start
+    cpu_end = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (cpu_end.ru_utime - cpu_start.ru_utime) + (cpu_end.ru_stime - cpu_start.ru_stime)
+    rss_growth = rss_kb() - rss_start
+    bytes_read = reader.counters.bytes - bytes_start
+
+    window.disconnect_serial()
+    os.close(master)
+    os.close(slave)
+
+    latencies.sort()
+    ms = 1e-6
+    p50 = percentile(latencies, 50)
+    p99 = percentile(latencies, 99)
+    return {
+        "target": target,
+        "rate": rate,
+        "line_size": size,
+        "format": fmt,
+        "duration_s": duration,
+        "sent": sent,
+        "displayed": displayed[0],
+        "dropped": max(0, sent - displayed[0]),
+        "lines_per_s": displayed[0] / duration,
+        "bytes_per_s": bytes_read / duration,
+        "cpu_s": cpu,
+        "cpu_pct": 100 * cpu / wall,
+        "rss_growth_kb": rss_growth,
+        "latency_ms": {
+            "p50": None if p50 is None else p50 * ms,
+            "p99": None if p99 is None else p99 * ms,
+            "max": latencies[-1] * ms if latencies else None,
+        },
+    }
+
+
+# ---------------- Driver ----------------
+def host_info():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        rev = ""
+    return {
+        "git": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def run_matrix(args):
+    results = []
+    for target in args.targets:
+        for rate in args.rates:
+            cmd = [sys.executable, os.path.abspath(__file__), "--run-one", target,
+                   str(rate), str(args.size), args.format, str(args.duration)]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                results.append({"target": target, "rate": rate, "error": proc.stderr.strip()[-2000:]})
+                print(f"{target:16s} {rate:>8d}/s  FAILED", file=sys.stderr)
+                continue
+            res = json.loads(proc.stdout.strip().splitlines()[-1])
+            results.append(res)
+            lat = res["latency_ms"]
+            print(f"{target:16s} {rate:>8d}/s  {res['lines_per_s']:>9.0f} lines/s  "
+                  f"cpu {res['cpu_pct']:5.1f}%  drop {res['dropped']:>6d}  "
+                  f"p50 {lat['p50'] or 0:7.1f} ms  p99 {lat['p99'] or 0:7.1f} ms", file=sys.stderr)
+    return {"host": host_info(), "results": results}
+
+
+def compare(old_path, new_path, tolerance=0.10):
+    # print runs where the new numbers are worse than old by more than tolerance
+    with open(old_path) as f:
+        old = {(r["target"], r["rate"]): r for r in json.load(f)["results"] if "error" not in r}
+    with open(new_path) as f:
+        new = [r for r in json.load(f)["results"] if "error" not in r]
+
+    regressions = 0
+    for r in new:
+        o = old.get((r["target"], r["rate"]))
+        if not o:
+            continue
+        checks = [
+            ("lines_per_s", r["lines_per_s"] < o["lines_per_s"] * (1 - tolerance)),
+            ("cpu_s", r["cpu_s"] > o["cpu_s"] * (1 + tolerance)),
+            ("latency p99", (r["latency_ms"]["p99"] or 0) > (o["latency_ms"]["p99"] or 0) * (1 + tolerance)),
+        ]
+        for name, worse in checks:
+            if worse:
+                regressions += 1
+                print(f"REGRESSION {r['target']} @ {r['rate']}/s: {name}")
+    print(f"{regressions} regressions")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial monitor throughput benchmark")
+    parser.add_argument("--targets", nargs="+", default=TARGETS)
+    parser.add_argument("--rates", nargs="+", type=int, default=[1000, 10000, 50000])
+    parser.add_argument("--size", type=int, default=48, help="bytes per line")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="raw")
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--fake-mcu", nargs=5, help=argparse.SUPPRESS)
+    parser.add_argument("--run-one", nargs=5, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fake_mcu:
+        fd, rate, size, fmt, duration = args.fake_mcu
+        fake_mcu(int(fd), int(rate), int(size), fmt, float(duration))
+        return 0
+    if args.run_one:
+        target, rate, size, fmt, duration = args.run_one
+        print(json.dumps(run_one(target, int(rate), int(size), fmt, float(duration))), flush=True)
+        # skip interpreter teardown: the result is out, and tearing down a
+        # running Qt app from the GC is not something we want to measure
+        os._exit(0)
+    if args.compare:
+        return compare(*args.compare)
+
+    report = json.dumps(run_matrix(args), indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
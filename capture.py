@@ -0,0 +1,236 @@
+# capture.py
+# Recording raw session bytes to disk and reading them back.
+#
+# A capture is a set of segment files  <base>.000.cap, <base>.001.cap, ...
+# each with a sparse time index next to it  <base>.000.idx
+#
+# .cap   header   "<8sIIqQ"  magic, version, segment no, wall clock ns, monotonic ns
+#        records  "<QHI"     monotonic ns, source id, length  + raw bytes
+# .idx   entries  "<QQ"      monotonic ns, byte offset of a record in the .cap
+#
+# Files are append-only. An index entry is written about every index_every
+# bytes, so seeking by time is a bisect on the index plus a short scan.
+# CaptureWriter.write() only queues the chunk; a background thread does the
+# (buffered) file writes, so recording never blocks the read loop.
+
+import glob
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from bisect import bisect_right
+
+
+MAGIC = b"MCUCAP\x00\x01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIqQ")
+RECORD = struct.Struct("<QHI")
+INDEX = struct.Struct("<QQ")
+
+# source ids used by the tools
+SOURCE_SERIAL = 0
+SOURCE_UDP = 1
+
+
+def segment_path(base, n, ext):
+    return f"{base}.{n:03d}.{ext}"
+
+
+# ---------------- Writer ----------------
+class CaptureWriter(threading.Thread):
+    def __init__(self, base, segment_bytes=64 << 20, index_every=64 << 10,
+                 flush_interval=0.5):
+        super().__init__(daemon=True)
+        self.base = base
+        self.segment_bytes = segment_bytes
+        self.index_every = index_every
+        self.flush_interval = flush_interval
+
+        folder = os.path.dirname(base)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._queue = queue.SimpleQueue()
+        self._segment = -1
+        self._cap = None
+        self._idx = None
+        self.records = 0
+        self.bytes = 0
+        self.lost = 0   # chunks written after close(), not recorded
+        self.closed = False
+        self.start()
+
+    # ---- Any thread ----
+    def write(self, data, source=SOURCE_SERIAL, t_ns=None):
+        if data:
+            if self.closed:
+                self.lost += 1
+                return
+            self._queue.put((time.monotonic_ns() if t_ns is None else t_ns, source, bytes(data)))
+
+    def summary(self):
+        text = f"{self.records} chunks, {self.bytes} bytes"
+        if self.lost:
+            text += f" ({self.lost} chunks after close not recorded)"
+        return text
+
+    def close(self):
+        self.closed = True
+        self._queue.put(None)
+        self.join()
+        # writes that raced close() landed behind the end marker
+        while True:
+            try:
+                if self._queue.get_nowait():
+                    self.lost += 1
+            except queue.Empty:
+                break
+
+    # ---- Worker ----
+    def run(self):
+        self._open_segment()
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                break
+            if item:
+                self._append(*item)
+            if time.monotonic() >= next_flush:
+                self._cap.flush()
+                self._idx.flush()
+                next_flush = time.monotonic() + self.flush_interval
+
+        self._close_segment()
+
+    def _open_segment(self):
+        self._close_segment()
+        self._segment += 1
+        self._cap = open(segment_path(self.base, self._segment, "cap"), "wb", buffering=1 << 20)
+        self._idx = open(segment_path(self.base, self._segment, "idx"), "wb", buffering=1 << 16)
+        self._cap.write(HEADER.pack(MAGIC, VERSION, self._segment,
+                                    time.time_ns(), time.monotonic_ns()))
+        self._offset = HEADER.size
+        self._last_indexed = None
+
+    def _close_segment(self):
+        if self._cap:
+            self._cap.close()
+            self._idx.close()
+            self._cap = self._idx = None
+
+    def _append(self, t_ns, source, data):
+        if self._offset >= self.segment_bytes:
+            self._open_segment()
+        if self._last_indexed is None or self._offset - self._last_indexed >= self.index_every:
+            self._idx.write(INDEX.pack(t_ns, self._offset))
+            self._last_indexed = self._offset
+
+        self._cap.write(RECORD.pack(t_ns, source, len(data)))
+        self._cap.write(data)
+        self._offset += RECORD.size + len(data)
+        self.records += 1
+        self.bytes += len(data)
+
+
+# ---------------- Reader ----------------
+class CaptureSegment:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"{path}: not a capture file")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.number, self.wall_ns, self.mono_ns = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a capture file")
+
+        self.index = []   # [(t_ns, offset)]
+        idx_path = path[:-3] + "idx"
+        if os.path.exists(idx_path):
+            with open(idx_path, "rb") as f:
+                raw = f.read()
+            usable = len(raw) - len(raw) % INDEX.size
+            self.index = list(INDEX.iter_unpack(raw[:usable]))
+        if not self.index and len(self.map) > HEADER.size + RECORD.size:
+            self.index = [(RECORD.unpack_from(self.map, HEADER.size)[0], HEADER.size)]
+
+    def records(self, offset=HEADER.size):
+        # (t_ns, source, offset, payload); stops at a torn tail
+        buf = self.map
+        end = len(buf)
+        while offset + RECORD.size <= end:
+            t_ns, source, length = RECORD.unpack_from(buf, offset)
+            start = offset + RECORD.size
+            if start + length > end:
+                break
+            yield t_ns, source, offset, buf[start:start + length]
+            offset = start + length
+
+    def offset_for(self, t_ns):
+        # offset of an indexed record at or before t_ns
+        i = bisect_right(self.index, (t_ns, float("inf"))) - 1
+        return self.index[max(i, 0)][1] if self.index else HEADER.size
+
+    def close(self):
+        self.map.close()
+
+
+class CaptureReader:
+    def __init__(self, base):
+        paths = sorted(glob.glob(glob.escape(base) + ".[0-9][0-9][0-9].cap"))
+        if not paths:
+            raise FileNotFoundError(f"no capture segments for {base}")
+        self.segments = [CaptureSegment(p) for p in paths]
+        self.wall_ns = self.segments[0].wall_ns
+        self.mono_ns = self.segments[0].mono_ns
+
+    @property
+    def start_ns(self):
+        for seg in self.segments:
+            if seg.index:
+                return seg.index[0][0]
+        return self.mono_ns
+
+    @property
+    def end_ns(self):
+        # scan from the last index entry of the last non-empty segment
+        for seg in reversed(self.segments):
+            if seg.index:
+                last = seg.index[-1][0]
+                for t_ns, _, _, _ in seg.records(seg.index[-1][1]):
+                    last = t_ns
+                return last
+        return self.mono_ns
+
+    def records(self, start_ns=None, segment=0, offset=None):
+        # all records from start_ns (or from a segment / offset) to the end
+        if start_ns is not None:
+            segment, offset = self.seek(start_ns)
+        for n in range(segment, len(self.segments)):
+            seg = self.segments[n]
+            first = offset if (n == segment and offset is not None) else HEADER.size
+            for t_ns, source, _, payload in seg.records(first):
+                if start_ns is not None and t_ns < start_ns:
+                    continue
+                yield t_ns, source, payload
+
+    def seek(self, t_ns):
+        # (segment, offset) to start scanning from for time t_ns
+        segment = 0
+        for n, seg in enumerate(self.segments):
+            if seg.index and seg.index[0][0] <= t_ns:
+                segment = n
+        return segment, self.segments[segment].offset_for(t_ns)
+
+    def close(self):
+        for seg in self.segments:
+            seg.close()
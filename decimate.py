@@ -0,0 +1,241 @@
+# decimate.py
+# Level of detail for plotting long sample histories.
+#
+# A screen that is 1000 pixels wide cannot show more than about 2000
+# meaningful points, so drawing a million samples only costs time. The
+# line is reduced to what the pixels can show before it is handed to the
+# plot:
+#
+#   min/max  per pixel column the smallest and the largest sample. The
+#            envelope is exact: no spike, however short, disappears.
+#   LTTB     "largest triangle three buckets": one sample per column,
+#            picked so the line keeps its visual shape. Smoother to look
+#            at, but a single-sample spike can be skipped.
+#
+# Both work from a MinMaxPyramid over a SampleRing: level 0 holds min and
+# max of every block of `base` samples, each level above of two blocks of
+# the level below. sync() only reduces what was appended since the last
+# call, so keeping the pyramid current costs about the same as appending.
+# envelope(x0, x1, width) picks the finest level with no more blocks than
+# pixels, so the work per frame depends on the plot width, not on the
+# history length; query() gives the same as one line. NaN samples (rows
+# without a value for this column) are left out, the line joins across
+# them.
+#
+#   pyramid = MinMaxPyramid(ring)
+#   x, lo, hi = pyramid.envelope(ring.total - 100_000, ring.total, width=800)
+#   x, y = pyramid.query(ring.total - 100_000, ring.total, width=800)
+#   x, y = lttb(x, y, 800)
+#
+# A dense envelope is much cheaper to draw as one filled polygon (hi
+# forward, lo back) than as a line zigzagging between lo and hi.
+
+import numpy as np
+
+from sample_ring import SampleRing
+
+
+def _reduce(y, size):
+    # (lo, hi, centers) over blocks of size samples; the last block may be short
+    full = len(y) // size * size
+    lo = np.fmin.reduce(y[:full].reshape(-1, size), axis=1)   # fmin/fmax skip NaN
+    hi = np.fmax.reduce(y[:full].reshape(-1, size), axis=1)
+    centers = np.arange(len(lo)) * size + (size - 1) / 2
+    if full < len(y):
+        rest = y[full:]
+        lo = np.append(lo, np.fmin.reduce(rest))
+        hi = np.append(hi, np.fmax.reduce(rest))
+        centers = np.append(centers, full + (len(rest) - 1) / 2)
+    return lo, hi, centers
+
+
+def interleave(centers, lo, hi):
+    # min and max of a block at the same x: the line draws the envelope.
+    # Every other block goes max first, so the line does not run back across
+    # each block: half the stroke length, and the rasterizer pays per pixel.
+    pairs = np.column_stack((lo, hi))
+    pairs[1::2] = pairs[1::2, ::-1]
+    return np.repeat(centers, 2), pairs.ravel()
+
+
+def _present(x, *ys):
+    # drop NaN points so the line is not cut into pieces
+    keep = ~np.isnan(ys[0])
+    if keep.all():
+        return (x, *ys)
+    return (x[keep], *(y[keep] for y in ys))
+
+
+def minmax(x, y, buckets):
+    # envelope of (x, y) in `buckets` equal groups of points, 2 points per group
+    if len(y) <= 2 * buckets:
+        return x, y
+    size = -(-len(y) // buckets)
+    lo, hi, centers = _reduce(y, size)
+    xs = x[np.minimum(centers.astype(np.intp), len(x) - 1)]
+    return interleave(xs, lo, hi)
+
+
+def lttb(x, y, n):
+    # n points of (x, y) by largest triangle three buckets (NaNs are dropped)
+    x, y = _present(x, y)
+    size = len(y)
+    if n >= size or n < 3:
+        return x, y
+
+    # first and last point stay, the n - 2 buckets in between get one each
+    edges = np.linspace(1, size - 1, n - 1).astype(np.intp)
+    starts = edges[:-1]
+    avg_x = np.append(np.add.reduceat(x[1:size - 1], starts - 1) / np.diff(edges), x[-1])
+    avg_y = np.append(np.add.reduceat(y[1:size - 1], starts - 1) / np.diff(edges), y[-1])
+
+    picked = np.empty(n, dtype=np.intp)
+    picked[0] = 0
+    picked[-1] = size - 1
+    if size < 8 * n:
+        # a few points per bucket (the usual case after the pyramid): plain
+        # Python beats a handful of NumPy calls per bucket
+        picked[1:-1] = _lttb_small(x.tolist(), y.tolist(), edges.tolist(),
+                                   avg_x.tolist(), avg_y.tolist())
+        return x[picked], y[picked]
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xa, ya = x[a], y[a]
+        # twice the triangle area (a, candidate, average of the next bucket)
+        area = np.abs((xa - avg_x[i + 1]) * (y[lo:hi] - ya)
+                      - (xa - x[lo:hi]) * (avg_y[i + 1] - ya))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return x[picked], y[picked]
+
+
+def _lttb_small(x, y, edges, avg_x, avg_y):
+    out = []
+    a = 0
+    for i in range(len(edges) - 1):
+        xa, ya = x[a], y[a]
+        dx, dy = xa - avg_x[i + 1], avg_y[i + 1] - ya
+        best = -1.0
+        for j in range(edges[i], edges[i + 1]):
+            area = abs(dx * (y[j] - ya) - (xa - x[j]) * dy)
+            if area > best:
+                best, a = area, j
+        out.append(a)
+    return out
+
+
+# ---------------- Pyramid ----------------
+class MinMaxPyramid:
+    def __init__(self, ring, base=8, min_blocks=256):
+        self.ring = ring
+        # block size per level: base, 2 * base, ... while a level of the
+        # full ring still has min_blocks blocks
+        self.sizes = []
+        size = base
+        while ring.capacity // size >= min_blocks:
+            self.sizes.append(size)
+            size *= 2
+        self.reset()
+
+    def reset(self, first=0):
+        # start over with the first block that begins at or after sample first
+        cap = self.ring.capacity
+        dtype = self.ring.view().dtype
+        self.lo = [SampleRing(cap // size + 2, dtype) for size in self.sizes]
+        self.hi = [SampleRing(cap // size + 2, dtype) for size in self.sizes]
+        self.done = [-(-first // size) for size in self.sizes]   # complete blocks per level
+        self.seen = first
+
+    # ---- Keeping up with the ring ----
+    def sync(self):
+        ring = self.ring
+        total = ring.total
+        if total == self.seen:
+            return
+        first = total - len(ring)
+        if total < self.seen:
+            self.reset()   # the ring was cleared
+        if not self.sizes:
+            self.seen = total
+            return
+        start = self.done[0] * self.sizes[0]
+        if start < first:
+            # not synced for longer than the ring holds: rebuild from what is left
+            self.reset(first)
+            start = self.done[0] * self.sizes[0]
+        self.seen = total
+
+        # level 0 from the samples
+        size = self.sizes[0]
+        new = total // size - self.done[0]
+        if new <= 0:
+            return
+        y = ring.view(total - start)[:new * size].reshape(new, size)
+        self.lo[0].extend(np.fmin.reduce(y, axis=1))
+        self.hi[0].extend(np.fmax.reduce(y, axis=1))
+        self.done[0] += new
+
+        # every level above from pairs of blocks of the one below
+        for k in range(1, len(self.sizes)):
+            new = self.done[k - 1] // 2 - self.done[k]
+            if new <= 0:
+                break
+            pending = self.done[k - 1] - 2 * self.done[k]
+            lo = self.lo[k - 1].view(pending)[:2 * new].reshape(new, 2)
+            hi = self.hi[k - 1].view(pending)[:2 * new].reshape(new, 2)
+            self.lo[k].extend(np.fmin.reduce(lo, axis=1))
+            self.hi[k].extend(np.fmax.reduce(hi, axis=1))
+            self.done[k] += new
+
+    # ---- Reading ----
+    def envelope(self, x0, x1, width):
+        # (x, lo, hi) for samples [x0, x1), one or two blocks per pixel;
+        # x are absolute sample numbers (ring.total is the next sample).
+        # With few enough samples they come as they are (lo is hi).
+        self.sync()
+        ring = self.ring
+        total = ring.total
+        first = total - len(ring)
+        x0 = max(int(x0), first)
+        x1 = min(int(np.ceil(x1)), total)
+        if x1 <= x0:
+            empty = np.empty(0)
+            return empty, empty, empty
+        n = x1 - x0
+        width = max(int(width), 1)
+        if n <= 2 * width:
+            x, y = _present(np.arange(x0, x1, dtype=np.float64), ring.view(total - x0)[:n])
+            return x, y, y
+        if not self.sizes or n // self.sizes[0] < width:
+            # finer than level 0: reduce the samples on the fly, O(n) < base * width
+            lo, hi, centers = _reduce(ring.view(total - x0)[:n], n // width)
+            return _present(centers + x0, lo, hi)
+
+        # coarsest level that still has a block per pixel
+        k = 0
+        while k + 1 < len(self.sizes) and n // self.sizes[k + 1] >= width:
+            k += 1
+        size = self.sizes[k]
+        done = self.done[k]
+        j0 = max(x0 // size, done - len(self.lo[k]))
+        j1 = min(-(-x1 // size), done)
+        parts = []
+        if j1 > j0:
+            back = done - j0
+            parts.append((np.arange(j0, j1) * size + (size - 1) / 2,
+                          self.lo[k].view(back)[:j1 - j0], self.hi[k].view(back)[:j1 - j0]))
+
+        # samples after the last complete block: reduce them on the fly
+        tail = max(done * size, x0)
+        if x1 > tail:
+            lo, hi, centers = _reduce(ring.view(total - tail)[:x1 - tail], size)
+            parts.append((centers + tail, lo, hi))
+        return _present(*(np.concatenate(column) for column in zip(*parts)))
+
+    def query(self, x0, x1, width):
+        # envelope() as one line: (x, y) with a min and a max point per block
+        x, lo, hi = self.envelope(x0, x1, width)
+        if lo is hi:
+            return x, lo
+        return interleave(x, lo, hi)
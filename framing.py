@@ -0,0 +1,176 @@
+# framing.py
+# Binary telemetry frames for the serial path.
+#
+# Frame on the wire (COBS):  cobs(payload + crc) 0x00
+#                  (SLIP):   0xC0 slip(payload + crc) 0xC0
+#
+# payload  one or more records packed with struct (e.g. "<Ihh")
+# crc16    CRC-16/CCITT-FALSE (init 0xFFFF), 2 bytes big endian
+# crc32    zlib CRC-32, 4 bytes little endian
+#
+# FrameDecoder.feed() takes raw chunks, keeps unfinished frames for the next
+# call and returns all records of all complete frames. Frames that fail
+# unstuffing, CRC or length checks are counted in bad_frames and dropped.
+
+import struct
+import zlib
+from binascii import crc_hqx
+
+
+# record layout the firmware sends in binary frame mode, the default for
+# mcu_debug and mcu_debug_cli
+BINARY_LAYOUT = "<Ihh"
+BINARY_NAMES = ["t_ms", "ch0", "ch1"]
+BINARY_FRAMING = "cobs"
+BINARY_CRC = "crc16"
+
+
+# ---------------- COBS ----------------
+def cobs_encode(data):
+    out = bytearray()
+    for block in data.split(b"\x00"):
+        # blocks longer than 254 bytes are split with 0xFF codes
+        while len(block) >= 254:
+            out.append(0xFF)
+            out += block[:254]
+            block = block[254:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out)
+
+
+def cobs_decode(data):
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        code = data[i]
+        if code == 0:
+            raise ValueError("zero byte inside COBS frame")
+        end = i + code
+        if end > n:
+            raise ValueError("truncated COBS block")
+        out += data[i + 1:end]
+        i = end
+        if code < 0xFF and i < n:
+            out.append(0)
+    return bytes(out)
+
+
+# ---------------- SLIP ----------------
+SLIP_END = 0xC0
+SLIP_ESC = 0xDB
+SLIP_ESC_END = 0xDC
+SLIP_ESC_ESC = 0xDD
+
+
+def slip_encode(data):
+    data = data.replace(b"\xdb", b"\xdb\xdd").replace(b"\xc0", b"\xdb\xdc")
+    return b"\xc0" + data + b"\xc0"
+
+
+def slip_decode(data):
+    if b"\xdb" not in data:
+        return data
+    out = bytearray()
+    it = iter(data)
+    for b in it:
+        if b == SLIP_ESC:
+            nxt = next(it, None)
+            if nxt == SLIP_ESC_END:
+                out.append(SLIP_END)
+            elif nxt == SLIP_ESC_ESC:
+                out.append(SLIP_ESC)
+            else:
+                raise ValueError("bad SLIP escape")
+        else:
+            out.append(b)
+    return bytes(out)
+
+
+FRAMINGS = {
+    # name: (delimiter, encode, decode)
+    "cobs": (b"\x00", lambda d: cobs_encode(d) + b"\x00", cobs_decode),
+    "slip": (b"\xc0", slip_encode, slip_decode),
+}
+
+
+# ---------------- CRC ----------------
+def _crc16(data):
+    return crc_hqx(data, 0xFFFF).to_bytes(2, "big")
+
+
+def _crc32(data):
+    return zlib.crc32(data).to_bytes(4, "little")
+
+
+CRCS = {
+    # name: (size, compute)
+    "crc16": (2, _crc16),
+    "crc32": (4, _crc32),
+    None: (0, lambda data: b""),
+}
+
+
+# ---------------- Decoder ----------------
+class FrameDecoder:
+    def __init__(self, layout, names=None, framing="cobs", crc="crc16"):
+        self.record = struct.Struct(layout)
+        count = len(self.record.unpack(bytes(self.record.size)))
+        self.names = list(names) if names else [f"f{i}" for i in range(count)]
+        if len(self.names) != count:
+            raise ValueError(f"layout {layout!r} has {count} fields, got {len(self.names)} names")
+
+        self.framing = framing
+        self._delim, self._encode, self._unstuff = FRAMINGS[framing]
+        self._crc_size, self._crc = CRCS[crc]
+
+        self._partial = b""
+        self.frames = 0       # good frames
+        self.records = 0      # records in good frames
+        self.bad_frames = 0
+
+    def reset(self):
+        # drop a half received frame, e.g. after switching modes
+        self._partial = b""
+
+    def encode(self, rows):
+        # build one frame holding the given records (fake MCU / tests)
+        payload = b"".join(self.record.pack(*row) for row in rows)
+        return self._encode(payload + self._crc(payload))
+
+    def feed(self, chunk):
+        data = self._partial + chunk
+        frames = data.split(self._delim)
+        self._partial = frames.pop()
+
+        rows = []
+        size = self.record.size
+        crc_size = self._crc_size
+        for raw in frames:
+            if not raw:
+                continue   # idle delimiters between frames
+            try:
+                frame = self._unstuff(raw)
+            except ValueError:
+                self.bad_frames += 1
+                continue
+
+            payload = frame[:len(frame) - crc_size]
+            if (not payload or len(payload) % size
+                    or frame[len(payload):] != self._crc(payload)):
+                self.bad_frames += 1
+                continue
+
+            rows.extend(self.record.iter_unpack(payload))
+            self.frames += 1
+
+        self.records += len(rows)
+        return rows
+
+    def feed_columns(self, chunk):
+        # same as feed() but as {name: tuple}, ready for SampleStore.extend
+        rows = self.feed(chunk)
+        if not rows:
+            return {}
+        return dict(zip(self.names, zip(*rows)))
@@ -0,0 +1,141 @@
+# handoff.py
+# Bounded hand-off of lines from an I/O thread to one consumer.
+#
+# A queued Qt signal per batch has no bound: while the GUI is stuck (a
+# resize, a modal dialog, a slow plot) batches pile up in the event queue
+# and are all painted in one burst afterwards. A Handoff holds at most
+# max_lines lines. The producer put()s batches. The consumer is woken by
+# notify() only when the queue was empty and takes everything in one go, so
+# at most one wake-up is ever pending. When the queue is full the policy
+# decides what gives:
+#
+#   block        put() waits until the consumer made room (lossless,
+#                the producer slows down instead)
+#   drop-oldest  the oldest queued lines go, the consumer sees the newest
+#   drop-newest  incoming lines that do not fit go
+#   decimate     every other queued line goes and incoming batches are
+#                thinned the same way until the consumer catches up: the
+#                consumer still sees the whole time span, less densely
+#
+# Lines that carry read stamps (latency.Lines) keep them, and take()
+# returns a Lines. Counters: lines_in, dropped, blocked_ns.
+
+import threading
+import time
+
+from latency import Lines
+
+
+BLOCK = "block"
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+DECIMATE = "decimate"
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, DECIMATE)
+
+
+class Handoff:
+    def __init__(self, max_lines=100_000, policy=DROP_OLDEST, notify=None):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy!r}")
+        self.max_lines = max_lines
+        self.policy = policy   # may be changed at any time
+        self.notify = notify   # called (producer thread) when lines become available
+        self.closed = False
+
+        self._cond = threading.Condition()
+        self._lines = []
+        self._stamps = []
+        self._step = 1          # decimate: keep every step-th incoming line
+        self._notified = False  # a wake-up is pending, the consumer has not taken yet
+        self._released = False  # block: let put() through until the next take()
+
+        self.lines_in = 0
+        self.dropped = 0
+        self.blocked_ns = 0
+
+    @property
+    def depth(self):
+        return len(self._lines)
+
+    # ---- Producer ----
+    def put(self, lines):
+        n = len(lines)
+        if not n:
+            return
+        stamps = getattr(lines, "stamps", None)
+        if stamps is None:
+            stamps = [time.perf_counter_ns()] * n
+        with self._cond:
+            if self.closed:
+                return
+            self.lines_in += n
+            policy = self.policy
+            room = self.max_lines - len(self._lines)
+
+            if policy == BLOCK and n > room and self._lines:
+                t0 = time.perf_counter_ns()
+                while (not self.closed and not self._released and self._lines
+                       and len(self._lines) + n > self.max_lines):
+                    self._cond.wait(0.1)
+                self.blocked_ns += time.perf_counter_ns() - t0
+                if self.closed:
+                    return
+            elif policy == DROP_NEWEST and n > room:
+                keep = max(room, 0)
+                self.dropped += n - keep
+                lines, stamps = lines[:keep], stamps[:keep]
+            elif policy == DECIMATE:
+                if self._step > 1:
+                    kept = lines[::self._step]
+                    self.dropped += n - len(kept)
+                    lines, stamps = kept, stamps[::self._step]
+                if len(self._lines) + len(lines) > self.max_lines:
+                    before = len(self._lines)
+                    self._lines = self._lines[::2]
+                    self._stamps = self._stamps[::2]
+                    self.dropped += before - len(self._lines)
+                    self._step *= 2
+
+            self._lines.extend(lines)
+            self._stamps.extend(stamps)
+            excess = len(self._lines) - self.max_lines
+            if excess > 0 and policy != BLOCK:
+                # drop-oldest, or one batch larger than the whole queue
+                del self._lines[:excess]
+                del self._stamps[:excess]
+                self.dropped += excess
+
+            wake = bool(self._lines) and not self._notified
+            if wake:
+                self._notified = True
+            self._cond.notify_all()
+        if wake and self.notify is not None:
+            self.notify()
+
+    # ---- Consumer ----
+    def take(self, timeout=0):
+        # everything queued as one Lines (empty if nothing came within timeout)
+        with self._cond:
+            if not self._lines and timeout and not self.closed:
+                self._cond.wait_for(lambda: self._lines or self.closed, timeout)
+            lines = Lines(self._lines, self._stamps)
+            self._lines = []
+            self._stamps = []
+            self._step = 1
+            self._notified = False
+            self._released = False
+            self._cond.notify_all()
+            return lines
+
+    def release(self):
+        # blocked and later put()s queue without waiting until the next
+        # take(): for a consumer that has to wait for the producer to stop
+        with self._cond:
+            self._released = True
+            self._cond.notify_all()
+
+    def close(self):
+        # wake blocked producers and waiting consumers for good
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
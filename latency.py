@@ -0,0 +1,187 @@
+# latency.py
+# Where the time goes between bytes arriving and a line on screen.
+#
+# Readers stamp every chunk with perf_counter_ns() as soon as read()
+# returns. LineBatcher(stamped=True) gives each line the stamp of the chunk
+# that completed it and hands batches out as Lines: a plain list of str
+# that also carries .stamps, so the stamps travel with the lines through
+# Signal(object), the parser, the UDP forwarder and the log view, and code
+# that expects a list of lines keeps working. Each stage records
+# now - stamp into a histogram.
+#
+# LatencyHistogram is HDR-style: exact below 64 ns, then 32 buckets per
+# power of two (about 3 % resolution) up to 2**40 ns (18 min), in one fixed
+# list of counts. Recording is a handful of integer operations, lines read
+# in the same chunk are recorded together, and memory never grows.
+
+import math
+import os
+import time
+
+
+SUB_BITS = 5
+SUB = 1 << SUB_BITS
+LIMIT = 1 << 40   # ns, larger values are clamped
+
+
+def _bucket(ns):
+    if ns < 2 * SUB:
+        return ns
+    e = ns.bit_length() - SUB_BITS - 1
+    return e * SUB + (ns >> e)
+
+
+def _bucket_range(i):
+    # (lowest, highest) value that lands in bucket i
+    if i < 2 * SUB:
+        return i, i
+    e = i // SUB - 1
+    low = (i - e * SUB) << e
+    return low, low + (1 << e) - 1
+
+
+BUCKETS = _bucket(LIMIT - 1) + 1
+
+
+class Lines(list):
+    # a batch of lines plus one perf_counter_ns() read stamp per line
+    __slots__ = ("stamps",)
+
+    def __init__(self, lines=(), stamps=()):
+        super().__init__(lines)
+        self.stamps = list(stamps)
+
+
+# ---------------- Histogram ----------------
+class LatencyHistogram:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0   # ns, for the mean
+        self.max = 0
+
+    def record(self, ns, n=1):
+        if ns < 0:
+            ns = 0
+        elif ns >= LIMIT:
+            ns = LIMIT - 1
+        self.counts[_bucket(ns)] += n
+        self.count += n
+        self.total += ns * n
+        if ns > self.max:
+            self.max = ns
+
+    def record_stamps(self, stamps, now=None):
+        # now - stamp for every stamp; runs of equal stamps are one record()
+        if now is None:
+            now = time.perf_counter_ns()
+        prev = None
+        n = 0
+        for t in stamps:
+            if t == prev:
+                n += 1
+                continue
+            if n:
+                self.record(now - prev, n)
+            prev, n = t, 1
+        if n:
+            self.record(now - prev, n)
+
+    # ---- Reading (any thread, values may lag a record or two) ----
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        # highest value of the bucket holding the p-th percentile, in ns
+        if not self.count:
+            return 0
+        target = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(_bucket_range(i)[1], self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p99.9": self.percentile(99.9),
+            "max": self.max,
+        }
+
+    def dump(self):
+        # percentile distribution, one line per non-empty bucket
+        out = [f"{'value_ms':>12} {'percentile':>12} {'count':>10}"]
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c:
+                seen += c
+                out.append(f"{min(_bucket_range(i)[1], self.max) / 1e6:12.3f} {seen / self.count:12.6f} {seen:10d}")
+        s = self.snapshot()
+        out.append(f"#count {s['count']}  mean {s['mean'] / 1e6:.3f} ms  "
+                   f"max {s['max'] / 1e6:.3f} ms")
+        return "\n".join(out)
+
+
+# ---------------- Pipeline stages ----------------
+class LatencyStages:
+    # one histogram per stage, each stage measured from the read stamp
+    def __init__(self, *names):
+        self.stages = {name: LatencyHistogram() for name in names}
+
+    def __getitem__(self, name):
+        return self.stages[name]
+
+    def record_stamps(self, stage, stamps, now=None):
+        self.stages[stage].record_stamps(stamps, now)
+
+    def reset(self):
+        for hist in self.stages.values():
+            hist.reset()
+
+    def summary(self):
+        # one line for a status label: p50/p99 per stage in ms
+        parts = []
+        for name, hist in self.stages.items():
+            if hist.count:
+                parts.append(f"{name} {hist.percentile(50) / 1e6:.1f}/"
+                             f"{hist.percentile(99) / 1e6:.1f}")
+        return "latency p50/p99 ms: " + (" | ".join(parts) if parts else "-")
+
+    def dump(self):
+        out = [f"# latency from read, {time.strftime('%Y-%m-%d %H:%M:%S')}"]
+        for name, hist in self.stages.items():
+            out.append(f"\n## {name}")
+            out.append(hist.dump() if hist.count else "#count 0")
+        return "\n".join(out) + "\n"
+
+    def save(self, folder):
+        # write dump() to folder/latency_<time>.txt, returns the path
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"latency_{time.strftime('%Y%m%d_%H%M%S')}.txt")
+        with open(path, "w") as f:
+            f.write(self.dump())
+        return path
+
+
+# ---------------- Wall clock ----------------
+_WALL_OFFSET = time.time_ns() - time.perf_counter_ns()
+_second = [None, ""]   # cache: (second, "HH:MM:SS")
+
+
+def wall_clock(t_ns):
+    # "HH:MM:SS.uuuuuu" local time for a perf_counter_ns() stamp
+    wall = t_ns + _WALL_OFFSET
+    sec, frac = divmod(wall, 1_000_000_000)
+    if sec != _second[0]:
+        _second[0], _second[1] = sec, time.strftime("%H:%M:%S", time.localtime(sec))
+    return f"{_second[1]}.{frac // 1000:06d}"
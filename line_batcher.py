@@ -0,0 +1,82 @@
+# line_batcher.py
+# Turns raw serial chunks into batches of complete lines.
+#
+# readline() + one signal per line costs a cross-thread event for every
+# line. Instead the reader drains whatever is waiting in one read(), we
+# split all complete lines at once and keep the unfinished tail for the
+# next chunk. Lines are handed out as one list per flush.
+#
+# With stamped=True every line keeps the perf_counter_ns() stamp of the
+# chunk that completed it, and batches come out as latency.Lines.
+
+import time
+
+from latency import Lines
+
+
+class LineBatcher:
+    def __init__(self, flush_interval=0.02, max_batch=500, encoding="utf-8", stamped=False):
+        self.flush_interval = flush_interval  # seconds between flushes
+        self.max_batch = max_batch            # flush early when this many lines wait
+        self.encoding = encoding
+
+        self._partial = b""   # unfinished line carried over to next chunk
+        self._pending = []    # complete lines waiting for the next flush
+        self._stamps = [] if stamped else None   # read stamp per pending line
+        self._last_flush = time.monotonic()
+
+    # ---- Input ----
+    def feed(self, chunk, t_ns=None):
+        # split all complete lines of this chunk in one go; t_ns is when the
+        # chunk was read (perf_counter_ns), only used when stamped
+        if not chunk:
+            return
+        data = self._partial + chunk
+        parts = data.split(b"\n")
+        self._partial = parts.pop()
+
+        decode = self.encoding
+        before = len(self._pending)
+        for raw in parts:
+            line = raw.decode(decode, errors="ignore").strip()
+            if line:
+                self._pending.append(line)
+        if self._stamps is not None:
+            if t_ns is None:
+                t_ns = time.perf_counter_ns()
+            self._stamps.extend([t_ns] * (len(self._pending) - before))
+
+    # ---- Output ----
+    def ready(self, now=None):
+        # True when the pending batch should be emitted
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.max_batch:
+            return True
+        if now is None:
+            now = time.monotonic()
+        return now - self._last_flush >= self.flush_interval
+
+    def take(self, now=None):
+        # hand out the pending lines (at most max_batch) and reset the timer
+        n = self.max_batch
+        batch = self._pending[:n]
+        del self._pending[:n]
+        self._last_flush = time.monotonic() if now is None else now
+        if self._stamps is not None:
+            batch = Lines(batch, self._stamps[:n])
+            del self._stamps[:n]
+        return batch
+
+    def flush_partial(self):
+        # treat the carried over tail as a finished line (used on close)
+        if self._partial:
+            line = self._partial.decode(self.encoding, errors="ignore").strip()
+            self._partial = b""
+            if line:
+                self._pending.append(line)
+                if self._stamps is not None:
+                    self._stamps.append(time.perf_counter_ns())
+
+    def pending(self):
+        return len(self._pending)
@@ -0,0 +1,223 @@
+# line_parser.py
+# Declarative parsing of MCU text lines into typed columns.
+#
+# Declare what the firmware prints, once:
+#
+#   KeyValueFormat()                          "temp=21.5 hum=40"
+#   CsvFormat(["timeUS", "distance"], int)    "1234,87"
+#   TemplateFormat("raw value = %(raw)d")     "raw value = 123"
+#
+# Formats are compiled up front (regexes / split on a fixed separator).
+# LineParser tries its formats in order. Lines that match no format are
+# skipped, lines that look like a format but do not convert (and that no
+# later format takes) are counted as malformed. A TemplateFormat claims
+# every line with its whole leading text ("raw value ="): if such a line
+# does not convert, later formats do not get to read it another way.
+# Nothing raises on bad input.
+
+import re
+
+
+NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+
+# printf conversion -> (regex, converter)
+CONVERSIONS = {
+    "d": (r"[-+]?\d+", int),
+    "i": (r"[-+]?\d+", int),
+    "u": (r"\d+", int),
+    "x": (r"[0-9a-fA-F]+", lambda s: int(s, 16)),
+    "X": (r"[0-9a-fA-F]+", lambda s: int(s, 16)),
+    "f": (NUMBER, float),
+    "g": (NUMBER, float),
+    "e": (NUMBER, float),
+    "s": (r"\S+", str),
+}
+
+
+def number(text):
+    # int when it looks like one, float otherwise
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+class Malformed(ValueError):
+    # the line belongs to this format but does not parse; later formats
+    # must not take it
+    pass
+
+
+# ---------------- Formats ----------------
+class KeyValueFormat:
+    # name=value pairs anywhere in the line, e.g. "t=12 temp=21.5,hum=40"
+    def __init__(self, fields=None, types=number, sep="="):
+        self.fields = set(fields) if fields else None
+        self.types = types
+        self.prefix = sep
+        self._re = re.compile(r"([A-Za-z_][\w.]*)\s*" + re.escape(sep) + r"\s*(" + NUMBER + r"|\S+)")
+
+    def parse(self, line):
+        if self.prefix not in line:
+            return None
+        pairs = self._re.findall(line)
+        if not pairs:
+            return None
+
+        row = {}
+        fields = self.fields
+        wanted = False
+        for name, text in pairs:
+            if fields is not None and name not in fields:
+                continue
+            wanted = True
+            conv = self.types.get(name, number) if isinstance(self.types, dict) else self.types
+            try:
+                row[name] = conv(text.rstrip(",;"))
+            except ValueError:
+                continue   # text value in a numeric stream, not a sample
+        if not row:
+            if fields is None or not wanted:
+                return None   # nothing this format is after
+            raise ValueError("no usable fields")
+        return row
+
+
+class CsvFormat:
+    # fixed columns split on sep; lines equal to the header are ignored
+    def __init__(self, header, types=number, sep=",", min_fields=None):
+        self.header = list(header)
+        self.sep = sep
+        self.min_fields = len(self.header) if min_fields is None else min_fields
+        if isinstance(types, dict):
+            self.converters = [types.get(name, number) for name in self.header]
+        else:
+            self.converters = [types] * len(self.header)
+        self._header_line = sep.join(self.header)
+
+    def parse(self, line):
+        if line == self._header_line:
+            return None
+        parts = line.split(self.sep)
+        if not self.min_fields <= len(parts) <= len(self.header):
+            raise ValueError(f"expected {len(self.header)} fields, got {len(parts)}")
+
+        row = dict.fromkeys(self.header)
+        for name, conv, text in zip(self.header, self.converters, parts):
+            row[name] = conv(text.strip())
+        return row
+
+
+class TemplateFormat:
+    # printf-like template: "raw value = %(raw)d", "T:%f H:%f" (-> f0, f1);
+    # text may come before it, nothing but whitespace after it
+    _spec = re.compile(r"%(?:\((\w+)\))?([diuxXfges%])")
+
+    def __init__(self, template):
+        pattern = []
+        self.names = []
+        self.converters = []
+        pos = 0
+        for m in self._spec.finditer(template):
+            pattern.append(self._literal(template[pos:m.start()]))
+            pos = m.end()
+            name, conv = m.groups()
+            if conv == "%":
+                pattern.append("%")
+                continue
+            regex, func = CONVERSIONS[conv]
+            pattern.append(f"({regex})")
+            self.names.append(name or f"f{len(self.names)}")
+            self.converters.append(func)
+        pattern.append(self._literal(template[pos:]))
+        pattern.append(r"\s*$")   # anything after the template is malformed, not ignored
+
+        # first word of the template: cheap substring reject; all text
+        # before the first field: the line is ours
+        first = self._spec.search(template)
+        head = (template[:first.start()] if first else template).strip()
+        words = head.split()
+        self.prefix = words[0] if words else ""
+        self._head = re.compile(self._literal(head)) if head else None
+        self._re = re.compile("".join(pattern))
+
+    @staticmethod
+    def _literal(text):
+        # any run of whitespace in the template matches any whitespace
+        return r"\s*".join(re.escape(part) for part in re.split(r"\s+", text))
+
+    def parse(self, line):
+        if self.prefix and self.prefix not in line:
+            return None
+        m = self._re.search(line)
+        if m is None:
+            if self._head is not None and self._head.search(line):
+                raise Malformed("line starts like the template but does not match it")
+            raise ValueError("prefix found but line does not match template")
+        return {name: conv(text) for name, conv, text in zip(self.names, self.converters, m.groups())}
+
+
+# ---------------- Parser ----------------
+class ParsedBatch:
+    def __init__(self):
+        self.columns = {}    # name -> list, None where a row has no value
+        self.rows = 0
+        self.skipped = 0     # lines no format was interested in
+        self.malformed = 0   # lines that looked like data but did not parse
+
+
+class LineParser:
+    def __init__(self, *formats):
+        self.formats = list(formats)
+        # running totals over everything this parser has seen
+        self.parsed = 0
+        self.skipped = 0
+        self.malformed = 0
+
+    def parse(self, line):
+        # first format that parses the line wins; None if skipped or
+        # malformed (looked like a format, and no later format took it)
+        failed = False
+        for fmt in self.formats:
+            try:
+                row = fmt.parse(line)
+            except Malformed:
+                failed = True
+                break
+            except (ValueError, IndexError, OverflowError):
+                failed = True
+                continue
+            if row is not None:
+                self.parsed += 1
+                return row
+        if failed:
+            self.malformed += 1
+        else:
+            self.skipped += 1
+        return None
+
+    def parse_batch(self, lines):
+        batch = ParsedBatch()
+        columns = batch.columns
+        malformed, skipped = self.malformed, self.skipped
+        parse = self.parse
+        rows = 0
+        for line in lines:
+            row = parse(line)
+            if row is None:
+                continue
+            for name, value in row.items():
+                col = columns.get(name)
+                if col is None:
+                    col = columns[name] = [None] * rows
+                col.append(value)
+            rows += 1
+            # pad columns this row did not have
+            for col in columns.values():
+                if len(col) < rows:
+                    col.append(None)
+
+        batch.rows = rows
+        batch.malformed = self.malformed - malformed
+        batch.skipped = self.skipped - skipped
+        return batch
@@ -0,0 +1,341 @@
+# live_plot.py
+# Frame driver for live matplotlib lines fed from a SampleStore.
+#
+# A full canvas.draw() redraws axes, ticks, labels and text every frame.
+# Here the static parts are drawn once and cached as a background bitmap;
+# each frame restores the background once, redraws the line artists and
+# blits the whole figure once, however many series there are. Frames where
+# neither the store nor the view changed are skipped.
+#
+# Every column of the store is a series, found as it appears (on_series is
+# called with its name). Series can be hidden, and shown on one shared
+# axes or stacked, one axes each with a shared x axis.
+#
+# Lines are drawn from a MinMaxPyramid (decimate.py) per series: whatever
+# span of the history is on screen, it is reduced to about one min/max
+# pair (or one LTTB point) per pixel, so a frame costs the same for 100
+# samples or a million. The min/max envelope is drawn as a filled outline,
+# not a zigzag line: a dense signal costs a fraction to rasterize.
+#
+# View: span samples (rows) wide. While following (the default) the right
+# edge is the newest sample and x is "samples before the newest", so the x
+# axis never changes and stays in the cached background. The mouse wheel
+# zooms (around the newest sample while following, around the cursor
+# otherwise), dragging pans back into the history and stops following, a
+# double click follows again. In a stopped view x counts from the newest
+# sample at the moment following stopped.
+#
+# Autoscale fits y to what is on screen with some margin and only changes
+# the limits (a full draw) when the data leaves them or uses less than
+# half of them, at most every RESCALE_EVERY seconds.
+
+import time
+
+import numpy as np
+from matplotlib import rcParams
+from matplotlib.patches import Polygon
+from matplotlib.ticker import MaxNLocator
+from PySide6.QtCore import QTimer
+
+from decimate import MinMaxPyramid, interleave, lttb
+
+
+MODES = ("minmax", "lttb")
+MIN_SPAN = 10   # samples, the closest zoom
+ZOOM_STEP = 1.25
+MARGIN = 0.1    # autoscale: room above and below the data
+SHRINK = 0.5    # autoscale: tighten once the data uses less than this of the range
+RESCALE_EVERY = 0.5   # s, autoscale changes limits (a full draw) at most this often
+
+
+class Series:
+    def __init__(self, name, ring, color):
+        self.name = name
+        self.ring = ring
+        self.pyramid = MinMaxPyramid(ring)
+        self.color = color
+        self.visible = True
+        self.ax = None     # set by the layout while visible
+        self.line = None   # Line2D: samples, LTTB
+        self.band = None   # Polygon: min/max envelope
+        self.artist = None  # the one drawn this frame
+
+
+class LivePlot:
+    def __init__(self, canvas, store, window=None, fps=20, mode="minmax"):
+        self.canvas = canvas
+        self.figure = canvas.figure
+        self.store = store
+        self.series = {}       # name -> Series, in the order they appeared
+        self.on_series = None  # called with the name of every new series
+        self.mode = mode
+        self.stacked = False
+        self.autoscale = True
+        self.axes = []
+        self._colors = rcParams["axes.prop_cycle"].by_key()["color"]
+
+        self.span = window or store.capacity   # samples across the x axis
+        self.end = None      # right edge (absolute sample), None = follow the newest
+        self._anchor = 0     # x = 0 when not following
+        self._drag = None    # (pixel x, end) at the start of a pan
+        self._layout_changed = True
+        self._view_changed = True
+        self._fit = False    # fit y once even with autoscale off (new axes)
+        self._rescaled = 0.0  # perf_counter() of the last autoscale change
+        self._rescale_due = False   # a frame skipped autoscale, check again later
+
+        self._background = None
+        self._seen_version = -1
+
+        # frames drawn, the time they took and the points of the last one,
+        # read by perf_overlay
+        self.frames = 0
+        self.frame_ns = 0
+        self.points = 0
+
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.mpl_connect("scroll_event", self._on_scroll)
+        self.canvas.mpl_connect("button_press_event", self._on_press)
+        self.canvas.mpl_connect("motion_notify_event", self._on_motion)
+        self.canvas.mpl_connect("button_release_event", self._on_release)
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update)
+        self.set_fps(fps)
+
+    # ---- Control ----
+    def set_fps(self, fps):
+        self.fps = fps
+        self.timer.setInterval(max(1, int(1000 / fps)))
+
+    def set_mode(self, mode):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode {mode!r}")
+        self.mode = mode
+        self._view_changed = True
+
+    def set_visible(self, name, visible):
+        self.series[name].visible = visible
+        self._layout_changed = True
+
+    def set_stacked(self, stacked):
+        self.stacked = stacked
+        self._layout_changed = True
+
+    def set_autoscale(self, on):
+        self.autoscale = on
+        self._view_changed = True
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def redraw(self):
+        # force a full draw, e.g. after changing limits or labels
+        self._background = None
+        self.canvas.draw_idle()
+
+    # ---- Series and axes ----
+    def _discover(self):
+        channels = self.store.channels
+        if len(channels) == len(self.series):
+            return
+        for name, ring in channels.items():
+            if name not in self.series:
+                color = self._colors[len(self.series) % len(self._colors)]
+                self.series[name] = Series(name, ring, color)
+                self._layout_changed = True
+                if self.on_series:
+                    self.on_series(name)
+
+    def _layout(self):
+        # fixed margins: a layout engine costs more than the rest of a full
+        # draw once there are a dozen axes
+        self.figure.clear()
+        self.figure.subplots_adjust(left=0.09, right=0.98, top=0.97, bottom=0.1, hspace=0.08)
+        shown = [s for s in self.series.values() if s.visible]
+        for s in self.series.values():
+            s.ax = s.line = s.band = s.artist = None
+        if self.stacked and len(shown) > 1:
+            axes = list(self.figure.subplots(len(shown), 1, sharex=True))
+            for ax, s in zip(axes, shown):
+                s.ax = ax
+                # name inside the axes: there is no room for a label per axes
+                ax.text(0.005, 0.95, s.name, transform=ax.transAxes, va="top",
+                        fontsize="small", color=s.color)
+                ax.yaxis.set_major_locator(MaxNLocator(3))
+                ax.tick_params(labelsize="small")
+        else:
+            axes = [self.figure.add_subplot(111)]
+            for s in shown:
+                s.ax = axes[0]
+            if len(shown) == 1:
+                axes[0].set_ylabel(shown[0].name)
+        for s in shown:
+            # drawn by us, not by the normal draw pass
+            s.line, = s.ax.plot([], [], color=s.color, label=s.name, animated=True)
+            s.band = Polygon(np.empty((0, 2)), closed=True, animated=True,
+                             facecolor=s.color, edgecolor=s.color, linewidth=1)
+            s.ax.add_patch(s.band)
+        if len(shown) > 1 and not self.stacked:
+            axes[0].legend(loc="upper left", fontsize="small")
+        axes[-1].set_xlabel("Samples")
+        self.axes = axes
+        self._fit = True
+
+    # ---- View ----
+    def following(self):
+        return self.end is None
+
+    def follow(self):
+        self.end = None
+        self._view_changed = True
+
+    def set_view(self, span, end=None):
+        # span samples ending at absolute sample end (None: follow the newest)
+        total = self.store.t.total
+        self.span = int(min(max(span, MIN_SPAN), self.store.capacity))
+        if end is not None and end >= total:
+            end = None   # panned up to the newest: follow again
+        if end is not None and self.end is None:
+            self._anchor = total
+        self.end = None if end is None else int(max(end, self.span))
+        self._view_changed = True
+
+    def _on_scroll(self, event):
+        if event.inaxes not in self.axes:
+            return
+        factor = ZOOM_STEP ** -event.step   # wheel up zooms in
+        span = min(max(self.span * factor, MIN_SPAN), self.store.capacity)
+        if self.end is None:
+            self.set_view(span)
+        else:
+            # keep the sample under the cursor where it is
+            at = self._anchor + event.xdata
+            self.set_view(span, at + (self.end - at) * span / self.span)
+
+    def _on_press(self, event):
+        if event.inaxes not in self.axes or event.button != 1:
+            return
+        if event.dblclick:
+            self.follow()
+            return
+        end = self.store.t.total if self.end is None else self.end
+        self._drag = (event.x, end)
+
+    def _on_motion(self, event):
+        if self._drag is None or event.x is None:
+            return
+        x, end = self._drag
+        shift = (event.x - x) / max(self.axes[0].bbox.width, 1) * self.span
+        self.set_view(self.span, end - shift)
+
+    def _on_release(self, event):
+        self._drag = None
+
+    def _apply_view(self):
+        if self.end is None:
+            x0, x1 = -self.span, 0
+        else:
+            x0, x1 = self.end - self.span - self._anchor, self.end - self._anchor
+        self.axes[0].set_xlim(x0, x1)   # shared by the stacked axes
+        self._background = None
+
+    def _rescale(self, ax, lo, hi):
+        # new y limits if lo..hi left the old ones or uses too little of them
+        y0, y1 = ax.get_ylim()
+        if not self._fit and y0 <= lo and hi <= y1 and hi - lo >= (y1 - y0) * SHRINK:
+            return False
+        pad = (hi - lo) * MARGIN or abs(hi) * MARGIN or 1.0
+        ax.set_ylim(lo - pad, hi + pad)
+        return True
+
+    # ---- Drawing ----
+    def _on_draw(self, event):
+        # full draw happened (first show, resize, redraw()): cache background
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for s in self.series.values():
+            if s.artist is not None:
+                s.ax.draw_artist(s.artist)
+
+    def update(self):
+        self._discover()
+        version = self.store.version
+        due = self._rescale_due and time.perf_counter() - self._rescaled >= RESCALE_EVERY
+        if version == self._seen_version and not (self._view_changed or self._layout_changed
+                                                  or due):
+            return   # no new samples, nothing to draw
+        self._seen_version = version
+        if self.end is not None and not (self._view_changed or self._layout_changed):
+            for s in self.series.values():
+                s.pyramid.sync()   # new samples are off screen, keep up without drawing
+            return
+        t0 = time.perf_counter_ns()
+
+        if self._layout_changed:
+            self._layout_changed = False
+            self._layout()
+            self._view_changed = True
+        moved = self._view_changed
+        if moved:
+            self._view_changed = False
+            self._apply_view()
+
+        total = self.store.t.total
+        end = total if self.end is None else self.end
+        origin = total if self.end is None else self._anchor
+        width = self.axes[0].bbox.width
+        points = 0
+        ranges = {}   # ax -> [lo, hi] of what is drawn on it
+        for s in self.series.values():
+            if s.line is None:
+                s.pyramid.sync()
+                continue
+            x, lo, hi = s.pyramid.envelope(end - self.span, end, width)
+            if lo is hi or self.mode == "lttb":
+                if lo is not hi:
+                    # the envelope as a min/max line, the pyramid is walked once
+                    x, y = lttb(*interleave(x, lo, hi), int(width))
+                else:
+                    y = lo
+                s.line.set_data(x - origin, y)
+                s.artist = s.line
+            else:
+                # hi forward, lo back: one filled outline, however dense
+                x = x - origin
+                s.band.set_xy(np.column_stack((np.concatenate((x, x[::-1])),
+                                               np.concatenate((hi, lo[::-1])))))
+                s.artist = s.band
+            points += len(x)
+            if len(x):
+                lo, hi = float(lo.min()), float(hi.max())
+                r = ranges.get(s.ax)
+                ranges[s.ax] = [lo, hi] if r is None else [min(r[0], lo), max(r[1], hi)]
+        self.points = points
+
+        # a zoom or pan rescales right away, new samples at most every RESCALE_EVERY
+        now = time.perf_counter()
+        self._rescale_due = False
+        if self._fit or (self.autoscale and (moved or now - self._rescaled >= RESCALE_EVERY)):
+            for ax, (lo, hi) in ranges.items():
+                if self._rescale(ax, lo, hi):
+                    self._background = None
+                    self._rescaled = now
+            if ranges:
+                self._fit = False
+        elif self.autoscale:
+            self._rescale_due = True
+
+        if self._background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_lines()
+            self.canvas.blit(self.figure.bbox)
+        self.frames += 1
+        self.frame_ns += time.perf_counter_ns() - t0
@@ -0,0 +1,294 @@
+# log_index.py
+# Search / filter index over a session log, built on a worker thread.
+#
+# Lines get absolute numbers (seq) as they are added. For every word
+# (lowercase, starting with a letter, so no plain numbers) the index keeps
+# the seqs of the lines that contain it. Words found in a large share of the
+# lines ("temp" in "temp=21.5" on every line) are marked common and their
+# lists dropped: they would not narrow a search down anyway. A query knows
+# which words a matching line must contain, intersects their lists and
+# checks only those lines, so rare words (an error, a key name) come back
+# in milliseconds even over millions of lines. Queries without such words
+# (a number, a regex, a common word) check every line, still off the GUI
+# thread.
+#
+# While a query is set, new lines are matched as they are indexed and the
+# matches go out right away, so a filter stays applied to the live stream.
+#
+#   index = LogIndex(capacity=1_000_000, on_results=callback)
+#   index.start()
+#   index.add(first_seq, lines)                       # any thread
+#   gen = index.set_query(make_query("level", "warn"))
+#   callback(gen, seqs, reset)    # worker thread: reset=True is the full
+#                                 # result, then reset=False per new batch
+#
+# Query kinds (make_query(kind, text)):
+#   text   case-insensitive substring
+#   regex  re.search
+#   level  log level at least: trace debug info warn error fatal
+#   field  key=value, key!=value, key>value (numeric when both are
+#          numbers), key~part (substring of the value) or just key
+
+import queue
+import re
+import threading
+from array import array
+from bisect import bisect_left
+
+
+COMMON_SHARE = 16    # a word in more than 1/16 of the lines is common...
+COMMON_MIN = 4096    # ...once it is in this many
+MAX_GROUP = 2000     # vocabulary words one query word may stand for before it stops narrowing
+
+WORD = re.compile(r"[a-z_][a-z0-9_]*")
+WORD_CHAR = re.compile(r"[a-z0-9_]")
+LEVELS = {
+    "trace": 0, "debug": 1, "dbg": 1, "info": 2, "warn": 3, "warning": 3,
+    "error": 4, "err": 4, "fatal": 5, "critical": 5,
+}
+LEVEL_WORD = re.compile(r"\b(" + "|".join(LEVELS) + r")\b", re.I)
+FIELD_QUERY = re.compile(r"^\s*([A-Za-z_]\w*)\s*(==|!=|>=|<=|=|>|<|~)?\s*(.*?)\s*$")
+
+
+def _number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+# ---------------- Queries ----------------
+# groups(vocab): word sets; a line can only match if it has a word of every
+# group. match(line): the exact test.
+
+class TextQuery:
+    def __init__(self, text):
+        self.text = text.lower()
+
+    def groups(self, vocab):
+        q = self.text
+        out = []
+        for m in WORD.finditer(q):
+            word = m.group()
+            # may be the tail of a longer word: at the start of the query, or
+            # after a digit ("2c" is the end of "i2c")
+            open_start = m.start() == 0 or WORD_CHAR.match(q[m.start() - 1]) is not None
+            open_end = m.end() == len(q)  # may be the head of a longer word
+            if not open_start and not open_end:
+                out.append({word})
+                continue
+            if open_start and open_end:
+                group = {w for w in vocab if word in w}
+            elif open_start:
+                group = {w for w in vocab if w.endswith(word)}
+            else:
+                group = {w for w in vocab if w.startswith(word)}
+            if len(group) <= MAX_GROUP:
+                out.append(group)
+        return out
+
+    def match(self, line):
+        return self.text in line.lower()
+
+
+class RegexQuery:
+    def __init__(self, pattern):
+        try:
+            self.rx = re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"bad regex: {e}") from None
+
+    def groups(self, vocab):
+        return []
+
+    def match(self, line):
+        return self.rx.search(line) is not None
+
+
+class LevelQuery:
+    def __init__(self, level):
+        level = level.strip().lower()
+        if level not in LEVELS:
+            raise ValueError(f"unknown level {level!r} (use {', '.join(sorted(set(LEVELS)))})")
+        self.min = LEVELS[level]
+
+    def groups(self, vocab):
+        return [{w for w, rank in LEVELS.items() if rank >= self.min}]
+
+    def match(self, line):
+        # the first level word of a line is its level
+        m = LEVEL_WORD.search(line)
+        return m is not None and LEVELS[m.group(1).lower()] >= self.min
+
+
+class FieldQuery:
+    OPS = {
+        "=": lambda a, b: a == b, "==": lambda a, b: a == b, "!=": lambda a, b: a != b,
+        ">": lambda a, b: a > b, "<": lambda a, b: a < b,
+        ">=": lambda a, b: a >= b, "<=": lambda a, b: a <= b,
+    }
+
+    def __init__(self, expr):
+        m = FIELD_QUERY.match(expr)
+        if not m or (m.group(2) and not m.group(3)):
+            raise ValueError(f"bad field filter {expr!r}, use key, key=value, key>value ...")
+        self.key, self.op, self.value = m.group(1), m.group(2), m.group(3)
+        self.number = _number(self.value) if self.op else None
+        if self.op in (">", "<", ">=", "<=") and self.number is None:
+            raise ValueError(f"{self.op} needs a number")
+        self.rx = re.compile(r"(?<!\w)" + self.key + r"\s*[=:]\s*([^\s,;]+)")
+
+    def groups(self, vocab):
+        return [{self.key.lower()}]
+
+    def match(self, line):
+        for m in self.rx.finditer(line):
+            value = m.group(1)
+            op = self.op
+            if op is None:
+                return True
+            if op == "~":
+                if self.value in value:
+                    return True
+                continue
+            if self.number is not None:
+                v = _number(value)
+                if v is not None and self.OPS[op](v, self.number):
+                    return True
+            elif self.OPS[op](value, self.value):
+                return True
+        return False
+
+
+QUERY_KINDS = {"text": TextQuery, "regex": RegexQuery, "level": LevelQuery, "field": FieldQuery}
+
+
+def make_query(kind, text):
+    # raises ValueError for a query that cannot work
+    return QUERY_KINDS[kind](text)
+
+
+# ---------------- Index (own thread) ----------------
+class LogIndex(threading.Thread):
+    def __init__(self, capacity=1_000_000, on_results=None):
+        super().__init__(daemon=True)
+        self.capacity = capacity       # lines kept, the oldest go first
+        self.on_results = on_results   # (gen, seqs, reset), called in the worker
+        self.common = set()            # words too frequent to keep lists for
+        self._postings = {}            # word -> array of seqs, may start with evicted ones
+        self._lines = []               # _lines[i] is line seq _base + i
+        self._base = 0
+        self._queue = queue.SimpleQueue()
+        self._gen = 0
+        self._query = None             # (gen, query) in the worker
+
+    @property
+    def lines(self):
+        return len(self._lines)
+
+    @property
+    def vocab(self):
+        return self._postings.keys() | self.common
+
+    # ---- Any thread ----
+    def add(self, first_seq, lines):
+        if lines:
+            self._queue.put(("add", first_seq, list(lines)))
+
+    def set_query(self, query):
+        # None clears; returns the generation results will carry
+        self._gen += 1
+        self._queue.put(("query", self._gen, query))
+        return self._gen
+
+    def clear(self):
+        self._queue.put(("clear",))
+
+    def stop(self):
+        self._queue.put(None)
+        self.join()
+
+    # ---- Worker ----
+    def run(self):
+        while True:
+            op = self._queue.get()
+            if op is None:
+                return
+            if op[0] == "add":
+                self._index(op[1], op[2])
+            elif op[0] == "query":
+                self._query = (op[1], op[2]) if op[2] is not None else None
+                if self._query:
+                    self._search(*self._query)
+            else:
+                self._reset(self._base + len(self._lines))
+
+    def _reset(self, base):
+        self._lines = []
+        self._base = base
+        self._postings = {}
+        self.common = set()
+
+    def _index(self, first_seq, lines):
+        if first_seq != self._base + len(self._lines):
+            self._reset(first_seq)   # not where the last batch ended: start over
+        postings = self._postings
+        common = self.common
+        findall = WORD.findall
+        seq = first_seq
+        for line in lines:
+            for word in set(findall(line.lower())):
+                p = postings.get(word)
+                if p is not None:
+                    p.append(seq)
+                elif word not in common:
+                    postings[word] = array("q", (seq,))
+            seq += 1
+        self._lines.extend(lines)
+
+        limit = max(COMMON_MIN, len(self._lines) // COMMON_SHARE)
+        for word in [w for w, p in postings.items() if len(p) > limit]:
+            del postings[word]
+            common.add(word)
+
+        excess = len(self._lines) - self.capacity
+        if excess > self.capacity // 8:   # evict in steps, not per batch
+            del self._lines[:excess]
+            self._base += excess
+            for p in postings.values():
+                del p[:bisect_left(p, self._base)]
+
+        if self._query:
+            gen, query = self._query
+            match = query.match
+            seqs = array("q", [first_seq + i for i, line in enumerate(lines) if match(line)])
+            if seqs and self.on_results:
+                self.on_results(gen, seqs, False)
+
+    def _candidates(self, query):
+        # seqs that can match (sorted), None = every line
+        vocab = self.vocab
+        found = None
+        for group in query.groups(vocab):
+            group = group & vocab
+            if group & self.common:
+                continue   # no help narrowing down
+            seqs = set()
+            for word in group:
+                seqs.update(self._postings[word])
+            found = seqs if found is None else found & seqs
+            if not found:
+                break
+        return None if found is None else sorted(found)
+
+    def _search(self, gen, query):
+        match = query.match
+        lines, base = self._lines, self._base
+        candidates = self._candidates(query)
+        if candidates is None:
+            seqs = array("q", [base + i for i, line in enumerate(lines) if match(line)])
+        else:
+            start = bisect_left(candidates, base)
+            seqs = array("q", [seq for seq in candidates[start:] if match(lines[seq - base])])
+        if self.on_results:
+            self.on_results(gen, seqs, True)
@@ -0,0 +1,327 @@
+# log_view.py
+# Bounded, virtualized replacement for a read-only QTextEdit log.
+#
+# QTextEdit keeps every appended line as a rich-text block forever, so long
+# sessions get slower and slower. Here lines live in a fixed size ring
+# (oldest lines fall off at max_lines) and the view only paints the rows
+# that are on screen. Appends are collected and pushed to the model once
+# per repaint tick.
+#
+# The view is a one-column QTableView with fixed row heights rather than a
+# QListView: QListView lays out every row again after each insert (asking
+# the Python model about each one, ~0.7 s at 200k lines), a table with a
+# fixed-size vertical header does not look at rows off screen at all.
+#
+# Lines that come with read stamps (latency.Lines) can be shown with their
+# read time (show_timestamps) and, if latency is set to a LatencyHistogram,
+# record read -> model latency at each flush. Plain lists are stamped
+# when they are appended.
+#
+# LogView(indexed=True) also feeds every line to a LogIndex (log_index.py)
+# on a worker thread. set_filter(query) then shows only the matching lines
+# through a FilterModel; the index keeps matching new lines, so the filter
+# stays applied while lines stream in. Lines are numbered from the start
+# of the session (seq), which is what the index and the filter use.
+
+import time
+from array import array
+from bisect import bisect_left
+
+from PySide6.QtWidgets import (
+    QTableView, QAbstractItemView, QApplication, QHeaderView, QStyledItemDelegate,
+    QStyleOptionViewItem,
+)
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer, Signal
+from PySide6.QtGui import QFontDatabase, QKeySequence
+
+from latency import wall_clock
+from log_index import LogIndex
+
+
+# Roles the views ask for text they may show elsewhere (tooltip, status
+# bar). "" means none, like None, but see LineDelegate for why not None.
+NO_TEXT_ROLES = (Qt.ToolTipRole, Qt.StatusTipRole, Qt.WhatsThisRole)
+
+
+class LogModel(QAbstractListModel):
+    def __init__(self, max_lines=200_000, parent=None):
+        super().__init__(parent)
+        self.max_lines = max_lines
+        self._buf = [None] * max_lines
+        self._start = 0   # ring index of row 0
+        self._count = 0
+        self.total = 0    # lines ever appended; seq of the next line
+
+    # ---- Qt model interface ----
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid():
+            if role == Qt.DisplayRole:
+                return self._buf[(self._start + index.row()) % self.max_lines]
+            if role in NO_TEXT_ROLES:
+                return ""
+        return None
+
+    # ---- Ring buffer ----
+    def line(self, row):
+        return self._buf[(self._start + row) % self.max_lines]
+
+    @property
+    def first_seq(self):
+        # seq of row 0
+        return self.total - self._count
+
+    def line_at(self, seq):
+        # line by seq, None once it fell off the ring
+        row = seq - self.first_seq
+        return self.line(row) if 0 <= row < self._count else None
+
+    def append_lines(self, lines):
+        cap = self.max_lines
+        if not lines:
+            return
+        self.total += len(lines)
+        if len(lines) >= cap:
+            # the batch alone fills the ring, start over
+            self.beginResetModel()
+            self._buf[:] = lines[-cap:]
+            self._start = 0
+            self._count = cap
+            self.endResetModel()
+            return
+
+        overflow = self._count + len(lines) - cap
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            self._start = (self._start + overflow) % cap
+            self._count -= overflow
+            self.endRemoveRows()
+
+        first = self._count
+        self.beginInsertRows(QModelIndex(), first, first + len(lines) - 1)
+        pos = (self._start + first) % cap
+        head = min(len(lines), cap - pos)
+        self._buf[pos:pos + head] = lines[:head]
+        if head < len(lines):
+            self._buf[:len(lines) - head] = lines[head:]
+        self._count += len(lines)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._buf = [None] * self.max_lines
+        self._start = 0
+        self._count = 0
+        self.endResetModel()
+
+
+class FilterModel(QAbstractListModel):
+    # the lines of a LogModel whose seqs are listed, in order
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.seqs = array("q")
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.seqs)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid():
+            if role == Qt.DisplayRole:
+                return self.line(index.row())
+            if role in NO_TEXT_ROLES:
+                return ""
+        return None
+
+    def line(self, row):
+        return self.source.line_at(self.seqs[row]) or ""
+
+    def set_seqs(self, seqs):
+        self.beginResetModel()
+        self.seqs = array("q", seqs)
+        self.endResetModel()
+        self._trim()
+
+    def extend(self, seqs):
+        self._trim()
+        first = len(self.seqs)
+        self.beginInsertRows(QModelIndex(), first, first + len(seqs) - 1)
+        self.seqs.extend(seqs)
+        self.endInsertRows()
+
+    def _trim(self):
+        # drop matches that fell off the source ring
+        gone = bisect_left(self.seqs, self.source.first_seq)
+        if gone:
+            self.beginRemoveRows(QModelIndex(), 0, gone - 1)
+            del self.seqs[:gone]
+            self.endRemoveRows()
+
+
+class LineDelegate(QStyledItemDelegate):
+    # Paints a row from its text alone. The default delegate also asks the
+    # model for font, colors, icon, alignment and check state on every
+    # paint, and PySide6 (6.12) drops a reference to None each time a
+    # Python data() answers one of those with None, until the interpreter
+    # aborts ("none_dealloc"). It is also seven Python calls less per row.
+    def initStyleOption(self, option, index):
+        option.index = index
+        option.text = index.data(Qt.DisplayRole) or ""
+        option.features |= QStyleOptionViewItem.HasDisplay
+        option.displayAlignment = Qt.AlignLeft | Qt.AlignVCenter
+
+
+class LogView(QTableView):
+    filter_results = Signal(int, object, bool)   # from the index thread
+    filter_updated = Signal(int)                 # matching lines shown
+
+    def __init__(self, max_lines=200_000, tick_ms=16, parent=None, indexed=False):
+        super().__init__(parent)
+        self.log_model = LogModel(max_lines, self)
+        self.setModel(self.log_model)
+
+        # every row has the same height -> scrolling and painting only
+        # look at the visible rows, no matter how many lines are stored
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        rows = self.verticalHeader()
+        rows.hide()
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(self.fontMetrics().height() + 2)
+        self.horizontalHeader().hide()
+        self.horizontalHeader().setStretchLastSection(True)
+        self.setShowGrid(False)
+        self.setWordWrap(False)
+        self.setItemDelegate(LineDelegate(self))
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+
+        self.autoscroll = True
+        self.show_timestamps = False   # prefix new lines with their read time
+        self.latency = None            # LatencyHistogram for the display stage
+        self._incoming = []
+        self._stamps = []              # read stamp per incoming line
+
+        # coalesce appends, flushed once per repaint tick
+        self._tick = QTimer(self)
+        self._tick.setSingleShot(True)
+        self._tick.setInterval(tick_ms)
+        self._tick.timeout.connect(self.flush)
+
+        # search / filter
+        self.index = None
+        self.filter_model = None
+        self._filter_gen = 0   # 0 = no filter
+        if indexed:
+            self.filter_model = FilterModel(self.log_model, self)
+            self.filter_results.connect(self._filter_results)
+            self.index = LogIndex(max_lines, on_results=self.filter_results.emit)
+            self.index.start()
+
+    # ---- QTextEdit-like API ----
+    def append(self, text):
+        self._incoming.append(text)
+        self._stamps.append(time.perf_counter_ns())
+        if not self._tick.isActive():
+            self._tick.start()
+
+    def append_lines(self, lines):
+        self._incoming.extend(lines)
+        stamps = getattr(lines, "stamps", None)
+        if stamps is None:
+            stamps = [time.perf_counter_ns()] * len(lines)
+        self._stamps.extend(stamps)
+        if not self._tick.isActive():
+            self._tick.start()
+
+    def pending(self):
+        # lines waiting for the next flush
+        return len(self._incoming)
+
+    def clear(self):
+        self._incoming = []
+        self._stamps = []
+        self.log_model.clear()
+        if self.index is not None:
+            self.index.clear()
+            self.filter_model.set_seqs([])
+
+    # ---- Flush ----
+    def flush(self):
+        if not self._incoming:
+            return
+        lines, self._incoming = self._incoming, []
+        stamps, self._stamps = self._stamps, []
+        if self.show_timestamps:
+            lines = [f"{wall_clock(t)}  {line}" for t, line in zip(stamps, lines)]
+
+        bar = self.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum()
+        self.log_model.append_lines(lines)
+        if self.index is not None:
+            self.index.add(self.log_model.total - len(lines), lines)
+        if self.autoscroll and at_bottom and not self._filter_gen:
+            self.scrollToBottom()
+        if self.latency is not None:
+            self.latency.record_stamps(stamps)
+
+    # ---- Filter (indexed=True) ----
+    def set_filter(self, query):
+        # a log_index query to show only matching lines, None for all lines
+        if query is None:
+            self.index.set_query(None)
+            self._filter_gen = 0
+            self.setModel(self.log_model)
+            self.scrollToBottom()
+        else:
+            self._filter_gen = self.index.set_query(query)
+            self.filter_model.set_seqs([])
+            self.setModel(self.filter_model)
+
+    def filtering(self):
+        return bool(self._filter_gen)
+
+    def _filter_results(self, gen, seqs, reset):
+        if gen != self._filter_gen:
+            return   # for a filter that is no longer set
+        bar = self.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum()
+        if reset:
+            self.filter_model.set_seqs(seqs)
+        elif seqs:
+            self.filter_model.extend(seqs)
+        if self.autoscroll and (at_bottom or reset):
+            self.scrollToBottom()
+        self.filter_updated.emit(len(self.filter_model.seqs))
+
+    def seq_at(self, row):
+        # seq of a row of what is shown now
+        if self._filter_gen:
+            return self.filter_model.seqs[row]
+        return self.log_model.first_seq + row
+
+    def show_seq(self, seq):
+        # scroll the full log to a line and select it
+        row = seq - self.log_model.first_seq
+        if 0 <= row < self.log_model.rowCount():
+            index = self.log_model.index(row)
+            self.scrollTo(index, QAbstractItemView.PositionAtCenter)
+            self.setCurrentIndex(index)
+
+    def stop_index(self):
+        if self.index is not None:
+            self.index.stop()
+            self.index = None
+
+    # ---- Copy selected lines ----
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            rows = sorted(i.row() for i in self.selectedIndexes())
+            model = self.model()
+            text = "\n".join(model.line(r) for r in rows)
+            QApplication.clipboard().setText(text)
+            return
+        super().keyPressEvent(event)
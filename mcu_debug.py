@@ -1,51 +1,50 @@
 import sys
-import serial
-import serial.tools.list_ports
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QTextEdit, QComboBox, QLabel, QMessageBox
+    QPushButton, QComboBox, QLabel, QMessageBox, QCheckBox,
+    QFileDialog, QSlider, QLineEdit
 )
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import Qt, QTimer
 
-#set myngoal to complete this code soon, for school and my self.
-class SerialReader(QThread):
-    data_received = Signal(str)
-    disconnected = Signal(str)
+from serial_reader import SerialReader, AsyncSerialReader
+from replay import ReplaySerial, REPLAY_PREFIX, replay_port
+from log_view import LogView
+from log_index import make_query
+from framing import BINARY_NAMES, BINARY_FRAMING
+from latency import LatencyStages
+from perf_overlay import PerfCounters, PerfOverlay
+from handoff import Handoff, POLICIES, DROP_OLDEST
+from startup import after_first_paint, mark, report_when_shown
+from port_registry import PortRegistry, PortChooser
 
-    def __init__(self, port, baudrate=115200):
-        super().__init__()
-        self.port = port
-        self.baudrate = baudrate
-        self.serial = None
-        self.running = True
 
-    def run(self):
-        try:
-            self.serial = serial.Serial(self.port, self.baudrate, timeout=1)
-            while self.running:
-                line = self.serial.readline().decode("utf-8", errors="ignore").strip()
-                if line:
-                    self.data_received.emit(line)
-        except Exception as e:
-            self.disconnected.emit(f"Serial error: {e}")
-        finally:
-            if self.serial and self.serial.is_open:
-                self.serial.close()
-
-    def stop(self):
-        self.running = False
-        self.wait()
+CAPTURE_DIR = "captures"
+LOG_LINES = 1_000_000      # lines kept (and indexed) for the log view
+DISPLAY_BACKLOG = 50_000   # lines waiting for the log view before the policy kicks in
 
 
+#set myngoal to complete this code soon, for school and my self.
 class SerialMonitor(QWidget):
-    def __init__(self):
+    def __init__(self, backend=None):
         super().__init__()
         self.setWindowTitle("MCU Debug Console")
         self.setGeometry(200, 200, 650, 450)
 
+        self.backend = backend   # AsyncioBackend, or None for a reader thread
         self.reader_thread = None
+        self.samples = None   # SampleStore, built on first connect
+        # read -> batch emitted -> in the log view, per line
+        self.latency = LatencyStages("batch", "display")
+        self.counters = PerfCounters()
+        # reader -> log view; capture, sample store and UDP never go through it
+        self.display = Handoff(DISPLAY_BACKLOG, DROP_OLDEST)
         self.init_ui()
-        self.refresh_ports()
+
+        # port list maintained in the background, filled in once the window is up
+        self.registry = PortRegistry()
+        self.port_chooser = PortChooser(self.combo, self.registry)
+        self.port_chooser.reconnect.connect(self.auto_reconnect)
+        after_first_paint(self, self.registry.start)
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -61,6 +60,17 @@ class SerialMonitor(QWidget):
         self.refresh_button.clicked.connect(self.refresh_ports)
         port_row.addWidget(self.refresh_button)
 
+        self.auto_check = QCheckBox("Auto-reconnect")
+        self.auto_check.setChecked(True)
+        port_row.addWidget(self.auto_check)
+
+        port_row.addWidget(QLabel("Mode:"))
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem("Text", "text")
+        self.mode_combo.addItem(f"Binary ({BINARY_FRAMING.upper()})", "binary")
+        self.mode_combo.currentIndexChanged.connect(self.change_mode)
+        port_row.addWidget(self.mode_combo)
+
         layout.addLayout(port_row)
 
         # ---- Connect / Disconnect buttons ----
@@ -71,23 +81,127 @@ class SerialMonitor(QWidget):
         btn_row.addWidget(self.connect_button)
 
         self.disconnect_button = QPushButton("Disconnect")
-        self.disconnect_button.clicked.connect(self.disconnect_serial)
+        self.disconnect_button.clicked.connect(self.user_disconnect)
         self.disconnect_button.setEnabled(False)
         btn_row.addWidget(self.disconnect_button)
 
+        self.record_check = QCheckBox("● Record")
+        self.record_check.toggled.connect(self.toggle_record)
+        btn_row.addWidget(self.record_check)
+
+        self.stamp_check = QCheckBox("Timestamps")
+        self.stamp_check.toggled.connect(self.toggle_timestamps)
+        btn_row.addWidget(self.stamp_check)
+
+        self.perf_check = QCheckBox("Perf")
+        btn_row.addWidget(self.perf_check)
+
+        btn_row.addWidget(QLabel("Log behind:"))
+        self.policy_combo = QComboBox()
+        for policy in POLICIES:
+            self.policy_combo.addItem(policy, policy)
+        self.policy_combo.setCurrentText(self.display.policy)
+        self.policy_combo.setToolTip("What the log view gives up when it cannot keep up")
+        self.policy_combo.currentIndexChanged.connect(self.change_policy)
+        btn_row.addWidget(self.policy_combo)
+
         layout.addLayout(btn_row)
 
+        # ---- Replay row ----
+        replay_row = QHBoxLayout()
+
+        self.replay_button = QPushButton("Replay…")
+        self.replay_button.clicked.connect(self.choose_replay)
+        replay_row.addWidget(self.replay_button)
+
+        replay_row.addWidget(QLabel("Speed:"))
+        self.speed_combo = QComboBox()
+        for label, speed in [("1x", 1), ("10x", 10), ("100x", 100), ("Max", 0)]:
+            self.speed_combo.addItem(label, speed)
+        self.speed_combo.currentIndexChanged.connect(self.change_replay)
+        replay_row.addWidget(self.speed_combo)
+
+        self.loop_check = QCheckBox("Loop")
+        self.loop_check.toggled.connect(self.change_replay)
+        replay_row.addWidget(self.loop_check)
+
+        self.seek_slider = QSlider(Qt.Horizontal)
+        self.seek_slider.setRange(0, 1000)
+        self.seek_slider.sliderReleased.connect(self.seek_replay)
+        replay_row.addWidget(self.seek_slider, stretch=1)
+
+        layout.addLayout(replay_row)
+
+        self.replay_timer = QTimer()
+        self.replay_timer.timeout.connect(self.update_replay_position)
+        self.replay_timer.start(250)
+
+        # ---- Filter row ----
+        filter_row = QHBoxLayout()
+        filter_row.addWidget(QLabel("Filter:"))
+        self.filter_kind = QComboBox()
+        for label, kind in [("Text", "text"), ("Regex", "regex"),
+                            ("Level ≥", "level"), ("Field", "field")]:
+            self.filter_kind.addItem(label, kind)
+        self.filter_kind.currentIndexChanged.connect(self.change_filter)
+        filter_row.addWidget(self.filter_kind)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.setPlaceholderText("e.g. timeout, ^ERR.*, warn, temp>30  (Enter on a match shows it in the log)")
+        self.filter_edit.textChanged.connect(lambda: self.filter_timer.start())
+        filter_row.addWidget(self.filter_edit, stretch=1)
+
+        self.filter_label = QLabel("")
+        filter_row.addWidget(self.filter_label)
+        layout.addLayout(filter_row)
+
+        # apply once typing pauses, not per keystroke
+        self.filter_timer = QTimer()
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(self.change_filter)
+
         # ---- Output box ----
-        self.text_box = QTextEdit()
-        self.text_box.setReadOnly(True)
+        self.text_box = LogView(max_lines=LOG_LINES, indexed=True)
+        self.text_box.latency = self.latency["display"]
+        self.text_box.filter_updated.connect(self.update_filter_count)
+        self.text_box.activated.connect(self.show_in_log)
         layout.addWidget(self.text_box)
 
+        # ---- Perf overlay (over the log, sampled only while shown) ----
+        c = self.counters
+        self.perf = PerfOverlay(self.text_box)
+        self.perf.add_rate("bytes/s", lambda: c.bytes)
+        self.perf.add_rate("lines/s", lambda: c.lines)
+        self.perf.add_rate("records/s", lambda: c.records)
+        self.perf.add_level("log queue", lambda: self.display.depth)
+        self.perf.add_level("log dropped", lambda: self.display.dropped)
+        self.perf.add_level("reader blocked", lambda: self.display.blocked_ns / 1e6, "{:,.0f} ms")
+        self.perf.add_level("log backlog", self.text_box.pending)
+        self.perf.add_level("bad frames", self.bad_frames)
+        self.perf.add_lag()
+        self.perf_check.toggled.connect(self.perf.setVisible)
+
+        # ---- Latency row ----
+        latency_row = QHBoxLayout()
+        self.latency_label = QLabel(self.latency.summary())
+        latency_row.addWidget(self.latency_label, stretch=1)
+
+        self.latency_button = QPushButton("Save latency")
+        self.latency_button.clicked.connect(self.save_latency)
+        latency_row.addWidget(self.latency_button)
+
+        layout.addLayout(latency_row)
+
+        self.latency_timer = QTimer()
+        self.latency_timer.timeout.connect(self.update_latency)
+        self.latency_timer.start(1000)
+
     # ===== Refresh =====
     def refresh_ports(self):
-        self.combo.clear()
-        ports = serial.tools.list_ports.comports()
-        for port in ports:
-            self.combo.addItem(port.device)
+        # the registry keeps the list current; this forces a rescan
+        self.registry.refresh()
 
         # Always allow connecting after refresh
         self.connect_button.setEnabled(True)
@@ -103,43 +217,202 @@ class SerialMonitor(QWidget):
             QMessageBox.warning(self, "No Port Selected", "Choose a serial port.")
             return
 
-        self.reader_thread = SerialReader(port)
+        if port.startswith(REPLAY_PREFIX):
+            port += f"?speed={self.speed_combo.currentData()}&loop={int(self.loop_check.isChecked())}"
+
+        if self.samples is None:
+            # numpy and the sample buffers are not needed before this
+            from sample_store import SampleStore
+            self.samples = SampleStore(BINARY_NAMES, capacity=1_000_000)
+
+        self.latency.reset()
+        settings = dict(mode=self.mode_combo.currentData(), store=self.samples,
+                        latency=self.latency, counters=self.counters, display=self.display)
+        if self.backend:
+            self.reader_thread = AsyncSerialReader(self.backend, port, **settings)
+        else:
+            self.reader_thread = SerialReader(port, **settings)
         self.reader_thread.data_received.connect(self.update_output)
+        self.reader_thread.lines_ready.connect(self.take_display)
         self.reader_thread.disconnected.connect(self.handle_disconnect)
+        self.toggle_record()
         self.reader_thread.start()
+        self.port_chooser.remember(port)
 
         self.connect_button.setEnabled(False)
         self.disconnect_button.setEnabled(True)
 
         self.text_box.append(f"Connected to {port}")
 
+    # ===== Replay =====
+    def choose_replay(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Replay capture", CAPTURE_DIR,
+                                              "Captures (*.cap)")
+        if not path:
+            return
+        self.combo.addItem(replay_port(path))
+        self.combo.setCurrentIndex(self.combo.count() - 1)
+
+    def replay_source(self):
+        # the running ReplaySerial, if we are replaying
+        serial_port = self.reader_thread.serial if self.reader_thread else None
+        return serial_port if isinstance(serial_port, ReplaySerial) else None
+
+    def change_replay(self):
+        replay = self.replay_source()
+        if replay:
+            replay.set_speed(self.speed_combo.currentData())
+            replay.set_loop(self.loop_check.isChecked())
+
+    def seek_replay(self):
+        replay = self.replay_source()
+        if replay:
+            replay.seek_fraction(self.seek_slider.value() / 1000)
+
+    def update_replay_position(self):
+        replay = self.replay_source()
+        if replay and not self.seek_slider.isSliderDown():
+            self.seek_slider.setValue(int(replay.progress() * 1000))
+
+    # ===== Recording =====
+    def toggle_record(self):
+        if not self.reader_thread:
+            return
+        recording = self.reader_thread.capture is not None
+        if self.record_check.isChecked() and not recording:
+            base = self.reader_thread.start_capture(CAPTURE_DIR)
+            self.text_box.append(f"Recording to {base}.*.cap")
+        elif not self.record_check.isChecked() and recording:
+            self.stop_record()
+
+    def stop_record(self):
+        capture = self.reader_thread.stop_capture() if self.reader_thread else None
+        if capture is not None:
+            self.text_box.append(f"Recorded {capture.summary()}")
+
+    # ===== Latency =====
+    def toggle_timestamps(self, on):
+        # applies to lines appended from now on
+        self.text_box.show_timestamps = on
+
+    def update_latency(self):
+        self.latency_label.setText(self.latency.summary())
+
+    def save_latency(self):
+        path = self.latency.save(CAPTURE_DIR)
+        self.text_box.append(f"Latency histograms saved to {path}")
+
+    def bad_frames(self):
+        return self.reader_thread.decoder.bad_frames if self.reader_thread else 0
+
+    # ===== Filter =====
+    def change_filter(self):
+        self.filter_timer.stop()
+        text = self.filter_edit.text()
+        if not text.strip():
+            self.text_box.set_filter(None)
+            self.filter_label.setText("")
+            return
+        try:
+            query = make_query(self.filter_kind.currentData(), text)
+        except ValueError as e:
+            self.filter_label.setText(f"⚠ {e}")
+            return
+        self.filter_label.setText("searching…")
+        self.text_box.set_filter(query)
+
+    def update_filter_count(self, count):
+        self.filter_label.setText(f"{count:,} lines")
+
+    def show_in_log(self, index):
+        # a filtered line: drop the filter and show it in context
+        if not self.text_box.filtering():
+            return
+        seq = self.text_box.seq_at(index.row())
+        self.filter_edit.clear()
+        self.change_filter()
+        self.text_box.show_seq(seq)
+
+    # ===== Log view overflow policy =====
+    def change_policy(self):
+        self.display.policy = self.policy_combo.currentData()
+
+    # ===== Text / binary switch =====
+    def change_mode(self):
+        if self.reader_thread:
+            self.reader_thread.set_mode(self.mode_combo.currentData())
+
     # ===== Disconnect =====
     def disconnect_serial(self):
         if self.reader_thread:
+            bad = self.reader_thread.decoder.bad_frames
+            if bad:
+                self.text_box.append(f"[Binary] {bad} bad frames dropped")
             self.reader_thread.stop()
+            self.take_display()   # the last lines the reader queued
+            self.display.notify = None
+            self.stop_record()
             self.reader_thread = None
             self.text_box.append("Disconnected")
 
         self.connect_button.setEnabled(True)
         self.disconnect_button.setEnabled(False)
 
+    def user_disconnect(self):
+        self.port_chooser.forget()
+        self.disconnect_serial()
+
     # ===== Auto‑disconnect handler =====
     def handle_disconnect(self, msg):
         self.text_box.append(msg)
         self.disconnect_serial()
+        if self.auto_check.isChecked() and self.port_chooser.wanted is not None:
+            self.text_box.append("Waiting for the device to come back...")
+            self.port_chooser.lost()
+
+    def auto_reconnect(self, device):
+        # the remembered board is back, possibly under a new name
+        if self.reader_thread or not self.auto_check.isChecked():
+            return
+        self.combo.setCurrentText(device)
+        self.connect_serial()
 
     # ===== Append text safely =====
     def update_output(self, text):
         self.text_box.append(text)
 
+    def take_display(self):
+        # everything the reader queued since the last wake-up, text lines and
+        # binary records (already in self.samples) as key=value alike
+        lines = self.display.take()
+        if lines:
+            self.text_box.append_lines(lines)
+
     # ===== Cleanup on close =====
     def closeEvent(self, event):
+        self.replay_timer.stop()
+        self.latency_timer.stop()
         self.disconnect_serial()
+        self.text_box.stop_index()
+        self.registry.stop()
         event.accept()
 
 
 if __name__ == "__main__":
+    mark("imports")
+    # --asyncio: all port I/O on one asyncio loop instead of a reader thread
+    backend = None
+    if "--asyncio" in sys.argv:
+        from aio_transport import AsyncioBackend
+        backend = AsyncioBackend()
+        backend.start()
+
     app = QApplication(sys.argv)
-    window = SerialMonitor()
+    window = SerialMonitor(backend)
+    mark("window built")
     window.show()
-    sys.exit(app.exec())
+    report_when_shown(window)
+    code = app.exec()
+    if backend:
+        backend.stop()
+    sys.exit(code)
@@ -0,0 +1,351 @@
+# mcu_debug_cli.py
+# Headless mcu_debug: serial port in, raw or parsed lines out, no GUI.
+#
+# Meant for CI and rack machines. Imports no Qt and no matplotlib, only the
+# plain I/O modules of this repo. The port is read with one selector and
+# whatever is waiting goes out in one piece; outputs are block buffered and
+# flushed on a timer, never per line. Throughput stats go to stderr.
+#
+#   python mcu_debug_cli.py /dev/ttyUSB0 -b 2000000                  # raw to stdout
+#   python mcu_debug_cli.py /dev/ttyUSB0 -f kv -o run.csv --stats 5
+#   python mcu_debug_cli.py /dev/ttyACM0 -f "csv:t,temp,hum" --udp 10.0.0.5:9000
+#   python mcu_debug_cli.py /dev/ttyACM0 -f binary -o frames.csv --record captures/run1
+#   python mcu_debug_cli.py "replay:captures/run1?speed=0" -f kv -o -
+#
+# Formats: raw (bytes as received), kv (key=value), csv:<names>,
+# template:<printf template> (see line_parser.py) and binary (framed
+# records, see framing.py). Parsed formats are written as CSV; a new header
+# line follows whenever a new key shows up.
+
+import argparse
+import selectors
+import sys
+import time
+
+from capture import CaptureWriter
+from framing import (
+    FrameDecoder, FRAMINGS, CRCS, BINARY_LAYOUT, BINARY_NAMES, BINARY_FRAMING, BINARY_CRC,
+)
+from line_batcher import LineBatcher
+from line_parser import LineParser, KeyValueFormat, CsvFormat, TemplateFormat
+from replay import open_port
+from udp_sink import UdpForwarder
+
+
+# ---------------- Formats ----------------
+# feed(chunk) -> bytes to write (whole lines only), finish() -> the rest
+
+class RawOutput:
+    def __init__(self):
+        self.lines = 0
+        self.records = 0
+        self.errors = 0
+        self._partial = b""
+
+    def feed(self, chunk):
+        data = self._partial + chunk if self._partial else chunk
+        cut = data.rfind(b"\n") + 1
+        self._partial = data[cut:]
+        n = data.count(b"\n", 0, cut)
+        self.lines += n
+        self.records += n
+        return data[:cut]
+
+    def finish(self):
+        data, self._partial = self._partial, b""
+        return data + b"\n" if data else b""
+
+
+class ParsedOutput:
+    def __init__(self, parser):
+        self.parser = parser
+        self.batcher = LineBatcher(flush_interval=0)
+        self.columns = []
+        self._known = set()
+        self.lines = 0
+        self.records = 0
+
+    @property
+    def errors(self):
+        return self.parser.malformed
+
+    def feed(self, chunk):
+        self.batcher.feed(chunk)
+        return self._rows()
+
+    def finish(self):
+        self.batcher.flush_partial()
+        return self._rows()
+
+    def _rows(self):
+        out = []
+        rows = 0
+        parse = self.parser.parse
+        while self.batcher.pending():
+            lines = self.batcher.take()
+            self.lines += len(lines)
+            for line in lines:
+                row = parse(line)
+                if row is None:
+                    continue
+                if not self._known.issuperset(row):
+                    for name in row:
+                        if name not in self._known:
+                            self._known.add(name)
+                            self.columns.append(name)
+                    out.append(",".join(self.columns))
+                out.append(",".join("" if (v := row.get(c)) is None else str(v)
+                                    for c in self.columns))
+                rows += 1
+        self.records += rows
+        return ("\n".join(out) + "\n").encode() if out else b""
+
+
+class BinaryOutput:
+    def __init__(self, decoder):
+        self.decoder = decoder
+        self.header = (",".join(decoder.names) + "\n").encode()
+        self.lines = 0
+
+    @property
+    def records(self):
+        return self.decoder.records
+
+    @property
+    def errors(self):
+        return self.decoder.bad_frames
+
+    def feed(self, chunk):
+        out, self.header = self.header, b""
+        rows = self.decoder.feed(chunk)
+        if rows:
+            out += ("\n".join(",".join(map(str, r)) for r in rows) + "\n").encode()
+        return out
+
+    def finish(self):
+        return b""
+
+
+def make_output(args):
+    fmt = args.format
+    if fmt == "raw":
+        return RawOutput()
+    if fmt == "binary":
+        if args.names:
+            names = args.names.split(",")
+        else:
+            names = BINARY_NAMES if args.layout == BINARY_LAYOUT else None
+        return BinaryOutput(FrameDecoder(args.layout, names, args.framing,
+                                         None if args.crc == "none" else args.crc))
+    if fmt == "kv":
+        return ParsedOutput(LineParser(KeyValueFormat()))
+    kind, _, spec = fmt.partition(":")
+    if kind == "csv" and spec:
+        return ParsedOutput(LineParser(CsvFormat(spec.split(","))))
+    if kind == "template" and spec:
+        return ParsedOutput(LineParser(TemplateFormat(spec)))
+    raise ValueError(f"unknown format {fmt!r}")
+
+
+# ---------------- Sinks ----------------
+class FileSink:
+    def __init__(self, path, buffer_size=1 << 20):
+        self.path = path
+        if path == "-":
+            self.file = open(sys.stdout.fileno(), "wb", buffering=buffer_size, closefd=False)
+        else:
+            self.file = open(path, "wb", buffering=buffer_size)
+        self.bytes = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.bytes += len(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def open_udp(dest):
+    host, _, port = dest.rpartition(":")
+    forwarder = UdpForwarder(mtu=1400, flush_interval=0.01)
+    try:
+        forwarder.set_destination(host, port)
+    except Exception:
+        forwarder.sock.close()
+        raise
+    forwarder.start()
+    return forwarder
+
+
+def open_outputs(args):
+    # (sinks, forwarder, capture); whatever was opened is closed again if
+    # a later one fails
+    sinks, forwarder, capture = [], None, None
+    try:
+        for path in args.out or ["-"]:
+            sinks.append(FileSink(path))
+        forwarder = open_udp(args.udp) if args.udp else None
+        capture = CaptureWriter(args.record) if args.record else None
+    except Exception:
+        close_outputs(sinks, forwarder, capture)
+        raise
+    return sinks, forwarder, capture
+
+
+def close_outputs(sinks, forwarder, capture):
+    for sink in sinks:
+        try:
+            sink.close()
+        except BrokenPipeError:
+            pass
+    if forwarder:
+        forwarder.stop()
+    if capture is not None:
+        capture.close()
+
+
+# ---------------- Stats ----------------
+class Stats:
+    def __init__(self, fmt, forwarder=None):
+        self.fmt = fmt
+        self.forwarder = forwarder
+        self.start = self.last = time.monotonic()
+        self.bytes = 0
+        self._last = (0, 0, 0, 0)
+
+    def report(self, now, final=False):
+        fmt = self.fmt
+        sent = self.forwarder.sent if self.forwarder else 0
+        current = (self.bytes, fmt.lines, fmt.records, sent)
+        if final:
+            span, delta = now - self.start, current
+        else:
+            span = now - self.last
+            delta = [c - p for c, p in zip(current, self._last)]
+        self.last, self._last = now, current
+        span = span or 1e-9
+
+        text = (f"[{now - self.start:7.1f}s] {delta[0] / span:>11.0f} B/s  "
+                f"{delta[1] / span:>8.0f} lines/s  {delta[2] / span:>8.0f} records/s  "
+                f"errors {fmt.errors}")
+        if self.forwarder:
+            text += (f"  udp {delta[3] / span:.0f} dgram/s  dropped {self.forwarder.dropped_lines} lines"
+                     f"  send errors {self.forwarder.errors}"
+                     f"  truncated {self.forwarder.truncated} lines")
+        if final:
+            text += f"  | total {self.bytes} B, {fmt.records} records"
+        print(text, file=sys.stderr, flush=True)
+
+
+# ---------------- Main loop ----------------
+def run(args, fmt):
+    # outputs before the port: a bad --out, --udp or --record leaves nothing open
+    try:
+        sinks, forwarder, capture = open_outputs(args)
+    except Exception as e:
+        print(f"Output error: {e}", file=sys.stderr)
+        return 1
+    try:
+        ser = open_port(args.port, args.baud, timeout=0)
+    except Exception as e:
+        print(f"Serial error: {e}", file=sys.stderr)
+        close_outputs(sinks, forwarder, capture)
+        return 1
+    stats = Stats(fmt, forwarder)
+
+    sel = selectors.DefaultSelector()
+    sel.register(ser.fileno(), selectors.EVENT_READ)
+    now = time.monotonic()
+    end = now + args.duration if args.duration else None
+    next_flush = now + args.flush
+    next_stats = now + args.stats if args.stats else None
+
+    def emit(data):
+        if not data:
+            return
+        for sink in sinks:
+            sink.write(data)
+        if forwarder:
+            forwarder.send_lines(data.decode("utf-8", errors="ignore").splitlines())
+
+    code = 0
+    try:
+        while True:
+            now = time.monotonic()
+            if end is not None and now >= end:
+                break
+            if now >= next_flush:
+                for sink in sinks:
+                    sink.flush()
+                next_flush = now + args.flush
+            if next_stats is not None and now >= next_stats:
+                stats.report(now)
+                next_stats += args.stats
+
+            wait = next_flush - now
+            if next_stats is not None:
+                wait = min(wait, next_stats - now)
+            if end is not None:
+                wait = min(wait, end - now)
+            if not sel.select(max(wait, 0)):
+                # a replay that played to the end and was drained: done
+                if getattr(ser, "finished", False) and not ser.in_waiting:
+                    break
+                continue
+
+            chunk = ser.read(ser.in_waiting or 1)
+            if capture is not None:
+                capture.write(chunk)
+            stats.bytes += len(chunk)
+            emit(fmt.feed(chunk))
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        sinks = [s for s in sinks if s.path != "-"]   # reader of stdout went away
+    except Exception as e:
+        print(f"Serial error: {e}", file=sys.stderr)
+        code = 1
+    finally:
+        try:
+            emit(fmt.finish())
+        except BrokenPipeError:
+            pass
+        sel.close()
+        ser.close()
+        close_outputs(sinks, forwarder, capture)
+        if args.stats:
+            stats.report(time.monotonic(), final=True)
+    return code
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless MCU serial reader")
+    parser.add_argument("port", help="serial port, or replay:<capture base>[?speed=..]")
+    parser.add_argument("-b", "--baud", type=int, default=115200)
+    parser.add_argument("-f", "--format", default="raw",
+                        help="raw | kv | csv:<name,...> | template:<template> | binary")
+    parser.add_argument("-o", "--out", action="append",
+                        help="output file, '-' for stdout (repeatable, default stdout)")
+    parser.add_argument("--udp", metavar="HOST:PORT", help="also forward lines over UDP")
+    parser.add_argument("--record", metavar="BASE", help="record the raw bytes (capture.py)")
+    parser.add_argument("--stats", type=float, default=1.0,
+                        help="seconds between stats lines on stderr, 0 = off")
+    parser.add_argument("--flush", type=float, default=0.1, help="output flush interval (s)")
+    parser.add_argument("--duration", type=float, default=0, help="stop after N seconds")
+    parser.add_argument("--layout", default=BINARY_LAYOUT, help="binary: struct layout")
+    parser.add_argument("--names", help="binary: comma separated field names")
+    parser.add_argument("--framing", choices=sorted(FRAMINGS), default=BINARY_FRAMING)
+    parser.add_argument("--crc", choices=[c or "none" for c in CRCS], default=BINARY_CRC)
+    args = parser.parse_args(argv)
+    try:
+        fmt = make_output(args)
+    except ValueError as e:
+        parser.error(str(e))
+    return run(args, fmt)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
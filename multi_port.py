@@ -0,0 +1,307 @@
+# multi_port.py
+# Monitor many serial ports from one process.
+#
+# One PortHub thread services every open port through a single selector:
+# it sleeps until any port has bytes, reads what is waiting, splits lines
+# and parses them per port, and emits one batch per port per flush. There
+# is no thread, reader or Qt runtime per port, so CPU follows the total
+# byte rate, not the number of ports. Each port gets its own tab with its
+# own log view, parser, sample store and counters.
+#
+#   python multi_port.py /dev/ttyUSB0 /dev/ttyUSB1 ...
+
+import os
+import queue
+import selectors
+import sys
+import time
+
+from PySide6.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout,
+    QPushButton, QComboBox, QLabel, QTabWidget
+)
+from PySide6.QtCore import QThread, Signal, QTimer
+
+from line_batcher import LineBatcher
+from line_parser import LineParser, KeyValueFormat
+from log_view import LogView
+from replay import open_port
+from sample_store import SampleStore
+from startup import after_first_paint, mark, report_when_shown
+from port_registry import PortRegistry, PortChooser
+
+
+PORT_HISTORY = 100_000   # parsed samples kept per port
+
+
+class PortState:
+    def __init__(self, name, port, flush_interval, max_batch):
+        self.name = name
+        self.port = port
+        self.batcher = LineBatcher(flush_interval, max_batch)
+        self.parser = LineParser(KeyValueFormat())
+        self.samples = SampleStore(capacity=PORT_HISTORY)
+        # counters, written by the hub thread only
+        self.bytes = 0
+        self.lines = 0
+
+
+# ---------------- I/O thread ----------------
+class PortHub(QThread):
+    lines_received = Signal(str, list)   # port name, lines
+    port_opened = Signal(str)
+    port_closed = Signal(str, str)       # port name, reason ("" = closed by user)
+
+    def __init__(self, baudrate=115200, flush_interval=0.02, max_batch=500):
+        super().__init__()
+        self.baudrate = baudrate
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.ports = {}
+        self.running = True
+
+        self.sel = selectors.DefaultSelector()
+        self._commands = queue.SimpleQueue()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self.sel.register(self._wake_r, selectors.EVENT_READ, None)
+
+    # ---- Commands (GUI thread) ----
+    def add_port(self, name):
+        self._command(("add", name))
+
+    def remove_port(self, name):
+        self._command(("remove", name))
+
+    def stop(self):
+        self.running = False
+        self._command(("stop", None))
+        self.wait()
+
+    def _command(self, cmd):
+        self._commands.put(cmd)
+        os.write(self._wake_w, b"\0")
+
+    # ---- Loop ----
+    def run(self):
+        try:
+            while self.running:
+                pending = any(p.batcher.pending() for p in self.ports.values())
+                events = self.sel.select(self.flush_interval if pending else None)
+                for key, _ in events:
+                    if key.data is None:
+                        self._handle_commands()
+                    else:
+                        self._read(key.data)
+                self._flush()
+        finally:
+            for name in list(self.ports):
+                self._close(name, "")
+            self.sel.close()
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+
+    def _handle_commands(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        while True:
+            try:
+                cmd, name = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if cmd == "add" and name not in self.ports:
+                try:
+                    port = open_port(name, self.baudrate, timeout=0)
+                except Exception as e:
+                    self.port_closed.emit(name, f"Serial error: {e}")
+                    continue
+                state = PortState(name, port, self.flush_interval, self.max_batch)
+                self.ports[name] = state
+                self.sel.register(port.fileno(), selectors.EVENT_READ, state)
+                self.port_opened.emit(name)
+            elif cmd == "remove" and name in self.ports:
+                self._close(name, "")
+
+    def _read(self, state):
+        try:
+            chunk = state.port.read(state.port.in_waiting or 1)
+        except Exception as e:
+            self._close(state.name, f"Serial error: {e}")
+            return
+        state.bytes += len(chunk)
+        state.batcher.feed(chunk)
+
+    def _flush(self):
+        now = time.monotonic()
+        for state in self.ports.values():
+            while state.batcher.ready(now):
+                lines = state.batcher.take(now)
+                state.lines += len(lines)
+                batch = state.parser.parse_batch(lines)
+                if batch.rows:
+                    state.samples.extend(batch.columns)
+                self.lines_received.emit(state.name, lines)
+
+    def _close(self, name, reason):
+        state = self.ports.pop(name)
+        self.sel.unregister(state.port.fileno())
+        try:
+            state.port.close()
+        except Exception:
+            pass
+        self.port_closed.emit(name, reason)
+
+
+# ---------------- GUI ----------------
+class PortPane(QWidget):
+    def __init__(self, name):
+        super().__init__()
+        layout = QVBoxLayout(self)
+        self.stats = QLabel("0 B/s | 0 lines/s")
+        layout.addWidget(self.stats)
+        self.log = LogView(max_lines=100_000)
+        layout.addWidget(self.log)
+
+        self.name = name
+        self.last_bytes = 0
+        self.last_lines = 0
+
+
+class MultiPortMonitor(QWidget):
+    def __init__(self, ports=()):
+        super().__init__()
+        self.setWindowTitle("MCU Multi-Port Monitor")
+        self.setGeometry(200, 200, 900, 600)
+
+        self.panes = {}
+        self.hub = PortHub()
+        self.hub.lines_received.connect(self.update_lines)
+        self.hub.port_opened.connect(self.port_opened)
+        self.hub.port_closed.connect(self.port_closed)
+        self.hub.start()
+
+        self.init_ui()
+        self.registry = PortRegistry()
+        self.port_chooser = PortChooser(self.combo, self.registry)
+        after_first_paint(self, self.registry.start)
+        for name in ports:
+            self.hub.add_port(name)
+
+        self.stats_timer = QTimer()
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(1000)
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        # ---- Port row ----
+        port_row = QHBoxLayout()
+        port_row.addWidget(QLabel("Serial Port:"))
+        self.combo = QComboBox()
+        port_row.addWidget(self.combo)
+
+        self.refresh_button = QPushButton("🔄 Refresh")
+        self.refresh_button.clicked.connect(self.refresh_ports)
+        port_row.addWidget(self.refresh_button)
+
+        self.open_button = QPushButton("Open")
+        self.open_button.clicked.connect(self.open_selected)
+        port_row.addWidget(self.open_button)
+
+        self.open_all_button = QPushButton("Open all")
+        self.open_all_button.clicked.connect(self.open_all)
+        port_row.addWidget(self.open_all_button)
+        layout.addLayout(port_row)
+
+        # ---- One tab per port ----
+        self.tabs = QTabWidget()
+        self.tabs.setTabsClosable(True)
+        self.tabs.tabCloseRequested.connect(self.close_tab)
+        layout.addWidget(self.tabs)
+
+        self.total = QLabel("0 ports")
+        layout.addWidget(self.total)
+
+    # ===== Ports =====
+    def refresh_ports(self):
+        self.registry.refresh()
+
+    def open_selected(self):
+        name = self.combo.currentText()
+        if name and name not in self.panes:
+            self.hub.add_port(name)
+
+    def open_all(self):
+        for i in range(self.combo.count()):
+            name = self.combo.itemText(i)
+            if name not in self.panes:
+                self.hub.add_port(name)
+
+    def close_tab(self, index):
+        pane = self.tabs.widget(index)
+        if pane.name in self.panes:
+            self.hub.remove_port(pane.name)
+        else:
+            # port already gone (error), just drop the tab
+            self.tabs.removeTab(index)
+            pane.deleteLater()
+
+    def port_opened(self, name):
+        pane = PortPane(name)
+        self.panes[name] = pane
+        self.tabs.addTab(pane, os.path.basename(name))
+        pane.log.append(f"Connected to {name}")
+
+    def port_closed(self, name, reason):
+        pane = self.panes.pop(name, None)
+        if pane is None:
+            if reason:
+                self.total.setText(f"{name}: {reason}")
+            return
+        if reason:
+            # keep the tab so the log stays readable, just mark it
+            pane.log.append(reason)
+            self.tabs.setTabText(self.tabs.indexOf(pane), f"{os.path.basename(name)} ✕")
+        else:
+            self.tabs.removeTab(self.tabs.indexOf(pane))
+            pane.deleteLater()
+
+    # ===== Data =====
+    def update_lines(self, name, lines):
+        pane = self.panes.get(name)
+        if pane:
+            pane.log.append_lines(lines)
+
+    def update_stats(self):
+        total_bytes = total_lines = 0
+        for name, pane in self.panes.items():
+            state = self.hub.ports.get(name)
+            if state is None:
+                continue
+            rate_b = state.bytes - pane.last_bytes
+            rate_l = state.lines - pane.last_lines
+            pane.last_bytes, pane.last_lines = state.bytes, state.lines
+            pane.stats.setText(
+                f"{rate_b} B/s | {rate_l} lines/s | parse errors {state.parser.malformed}")
+            total_bytes += rate_b
+            total_lines += rate_l
+        self.total.setText(f"{len(self.panes)} ports | {total_bytes} B/s | {total_lines} lines/s")
+
+    def closeEvent(self, event):
+        self.stats_timer.stop()
+        self.hub.stop()
+        self.registry.stop()
+        event.accept()
+
+
+if __name__ == "__main__":
+    mark("imports")
+    app = QApplication(sys.argv)
+    window = MultiPortMonitor([a for a in sys.argv[1:] if not a.startswith("--")])
+    mark("window built")
+    window.show()
+    report_when_shown(window)
+    sys.exit(app.exec())
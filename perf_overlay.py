@@ -0,0 +1,152 @@
+# perf_overlay.py
+# Performance panel for the serial monitors, drawn over the log view.
+#
+# The hot paths only add to plain int attributes of a PerfCounters (each
+# counter has exactly one writing thread, so no locks). The panel samples
+# whatever it was given once a second and shows rates and levels, plus how
+# late the GUI event loop runs a timer. While the panel is hidden none of
+# its timers run; the counters alone cost an addition per chunk or batch.
+#
+#   overlay = PerfOverlay(log_view)
+#   overlay.add_rate("bytes/s", lambda: counters.bytes)
+#   overlay.add_level("log queue", lambda: handoff.depth)
+#   overlay.add_lag()
+#   overlay.setVisible(True)
+
+import time
+
+from PySide6.QtCore import QEvent, QObject, Qt, QTimer
+from PySide6.QtWidgets import QFrame, QGridLayout, QLabel
+
+
+class PerfCounters:
+    def __init__(self):
+        # reader thread
+        self.bytes = 0           # bytes read from the port
+        self.lines = 0           # text lines emitted
+        self.records = 0         # binary records emitted
+
+
+class LoopLag(QObject):
+    # how late a timer fires on this thread's event loop, worst since take()
+    def __init__(self, interval_ms=50, parent=None):
+        super().__init__(parent)
+        self.interval = interval_ms / 1000
+        self.worst = 0.0
+        self._expected = None
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._tick)
+
+    def start(self):
+        self.worst = 0.0
+        self._expected = time.perf_counter() + self.interval
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        lag = now - self._expected
+        if lag > self.worst:
+            self.worst = lag
+        self._expected = now + self.interval
+
+    def take(self):
+        worst, self.worst = self.worst, 0.0
+        return worst
+
+
+class PerfOverlay(QFrame):
+    def __init__(self, host, interval_ms=1000):
+        # host: the widget to float over (top right corner)
+        super().__init__(host)
+        self.host = host
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("PerfOverlay { background: rgba(0, 0, 0, 170); border-radius: 4px; }"
+                           "QLabel { color: #e0e0e0; font-family: monospace; }")
+        self.grid = QGridLayout(self)
+        self.grid.setContentsMargins(8, 6, 8, 6)
+        self.grid.setVerticalSpacing(1)
+        self._rows = []   # (value QLabel, sample() -> text)
+        self._lag = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.sample)
+        host.installEventFilter(self)
+        self.hide()
+
+    # ---- Rows ----
+    def _add(self, name, sample):
+        row = len(self._rows)
+        value = QLabel("-")
+        value.setAlignment(Qt.AlignRight)
+        self.grid.addWidget(QLabel(name), row, 0)
+        self.grid.addWidget(value, row, 1)
+        self._rows.append((value, sample))
+
+    def add_rate(self, name, total):
+        # total() is a running count; shows its increase per second
+        last = [None, 0.0]
+
+        def sample(now):
+            value = total()
+            prev, t = last
+            last[0], last[1] = value, now
+            if prev is None or value < prev:   # first sample, or counter restarted
+                return "-"
+            return f"{(value - prev) / (now - t):,.0f}"
+        self._add(name, sample)
+
+    def add_level(self, name, value, fmt="{:,}"):
+        # value() is shown as it is right now
+        self._add(name, lambda now: fmt.format(value()))
+
+    def add_mean_ms(self, name, count, total_ns):
+        # mean of a duration over the interval: total_ns() / count() deltas
+        last = [None, None]
+
+        def sample(now):
+            n, t = count(), total_ns()
+            prev_n, prev_t = last
+            last[0], last[1] = n, t
+            if prev_n is None or n <= prev_n:
+                return "-"
+            return f"{(t - prev_t) / (n - prev_n) / 1e6:.2f} ms"
+        self._add(name, sample)
+
+    def add_lag(self, name="event-loop lag"):
+        self._lag = LoopLag(parent=self)
+        self._add(name, lambda now: f"{self._lag.take() * 1000:.1f} ms")
+
+    # ---- Sampling, only while shown ----
+    def setVisible(self, visible):
+        super().setVisible(visible)
+        if visible:
+            if self._lag:
+                self._lag.start()
+            self.sample()
+            self.timer.start()
+            self.raise_()
+        else:
+            self.timer.stop()
+            if self._lag:
+                self._lag.stop()
+
+    def sample(self):
+        now = time.perf_counter()
+        for value, sample in self._rows:
+            value.setText(sample(now))
+        self._place()
+
+    def _place(self):
+        self.adjustSize()
+        self.move(self.host.width() - self.width() - 24, 8)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Resize and self.isVisible():
+            self._place()
+        return False
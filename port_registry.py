@@ -0,0 +1,216 @@
+# port_registry.py
+# Serial port list kept up to date in the background.
+#
+# PortRegistry enumerates ports (serial.tools.list_ports) on its own thread,
+# keeps the result, and enumerates again only when something changes: on
+# Linux it watches /dev with inotify for tty nodes coming and going, elsewhere
+# it polls. Changes go out as port_added / port_removed, one per port, so
+# combo boxes are updated in place instead of cleared and refilled.
+#
+# PortChooser ties a QComboBox to a registry and remembers the device a tool
+# connected to by USB VID/PID/serial number. When that device shows up
+# again (re-plugged, re-flashed, maybe under a new /dev name) it emits
+# reconnect(device). A board that resets faster than a rescan notices is
+# caught by lost(), which retries while the device is listed.
+
+import ctypes
+import os
+import selectors
+import struct
+import time
+
+from PySide6.QtCore import QObject, QThread, QTimer, Qt, Signal
+
+
+# inotify(7)
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_EVENT = struct.Struct("iIII")   # wd, mask, cookie, len + name
+
+# /dev entries that can be serial ports
+PORT_PREFIXES = (b"tty", b"cu.", b"rfcomm")
+
+
+def port_identity(info):
+    # what stays the same when a board is re-plugged: USB VID/PID/serial
+    # number; the device name for anything else
+    if info.vid is not None:
+        return (info.vid, info.pid, info.serial_number)
+    return info.device
+
+
+def _watch_dev():
+    # non-blocking inotify fd watching /dev, or None where there is none
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    mask = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+    if libc.inotify_add_watch(fd, b"/dev", mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _ports_touched(data):
+    # True if any inotify event in data names a possible serial port
+    offset = 0
+    while offset + IN_EVENT.size <= len(data):
+        _, _, _, length = IN_EVENT.unpack_from(data, offset)
+        name = data[offset + IN_EVENT.size:offset + IN_EVENT.size + length]
+        if name.startswith(PORT_PREFIXES):
+            return True
+        offset += IN_EVENT.size + length
+    return False
+
+
+# ---------------- Registry (own thread) ----------------
+class PortRegistry(QThread):
+    port_added = Signal(object)     # ListPortInfo
+    port_removed = Signal(object)   # ListPortInfo as last seen
+
+    def __init__(self, poll_interval=2.0, settle=0.3):
+        super().__init__()
+        self.poll_interval = poll_interval  # s between scans without inotify
+        self.settle = settle                # s to let udev finish after an event
+        self.ports = {}   # device -> ListPortInfo, replaced whole on each scan
+        self.scans = 0
+        self.running = True
+        self._refresh = False
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+
+    # ---- Any thread ----
+    def refresh(self):
+        # enumerate again now (the Refresh button)
+        if self.running:
+            self._refresh = True
+            os.write(self._wake_w, b"\0")
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        os.write(self._wake_w, b"\0")
+        self.wait()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    # ---- Thread ----
+    def run(self):
+        from serial.tools import list_ports
+
+        inotify = _watch_dev()
+        sel = selectors.DefaultSelector()
+        sel.register(self._wake_r, selectors.EVENT_READ)
+        if inotify is not None:
+            sel.register(inotify, selectors.EVENT_READ)
+
+        due = time.monotonic()   # next scan, None = nothing pending
+        try:
+            while self.running:
+                now = time.monotonic()
+                if due is not None and now >= due:
+                    due = None
+                    self._scan(list_ports.comports())
+                    continue
+
+                if due is not None:
+                    timeout = due - now
+                elif inotify is None:
+                    timeout = self.poll_interval
+                else:
+                    timeout = None
+                events = sel.select(timeout)
+                if not events and inotify is None:
+                    due = now
+                for key, _ in events:
+                    if key.fd == inotify:
+                        if _ports_touched(os.read(inotify, 65536)) and due is None:
+                            due = time.monotonic() + self.settle
+                    else:
+                        self._drain()
+                        if self._refresh:
+                            self._refresh = False
+                            due = time.monotonic()
+        finally:
+            sel.close()
+            if inotify is not None:
+                os.close(inotify)
+
+    def _drain(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _scan(self, found):
+        self.scans += 1
+        new = {info.device: info for info in found}
+        old, self.ports = self.ports, new
+        for device in sorted(old):
+            info = old[device]
+            if device not in new or port_identity(new[device]) != port_identity(info):
+                self.port_removed.emit(info)
+        for device in sorted(new):
+            info = new[device]
+            if device not in old or port_identity(old[device]) != port_identity(info):
+                self.port_added.emit(info)
+
+
+# ---------------- Combo box side (GUI thread) ----------------
+class PortChooser(QObject):
+    reconnect = Signal(str)   # the remembered device is back, under this name
+
+    def __init__(self, combo, registry, retry_interval=1.0):
+        super().__init__(combo)
+        self.combo = combo
+        self.registry = registry
+        self.retry_interval = retry_interval
+        self.wanted = None   # port_identity() to reconnect to, None = don't
+        registry.port_added.connect(self.port_added)
+        registry.port_removed.connect(self.port_removed)
+        for device in sorted(registry.ports):
+            self.port_added(registry.ports[device])
+
+    def remember(self, device):
+        # call on connect; only devices the registry knows can come back
+        info = self.registry.ports.get(device)
+        self.wanted = port_identity(info) if info else None
+
+    def forget(self):
+        # call when the user disconnects
+        self.wanted = None
+
+    def lost(self):
+        # call when the connection dropped on its own
+        if self.wanted is not None:
+            QTimer.singleShot(int(self.retry_interval * 1000), self._retry)
+
+    def _retry(self):
+        for device in sorted(self.registry.ports):
+            if port_identity(self.registry.ports[device]) == self.wanted:
+                self.reconnect.emit(device)
+                return
+
+    def port_added(self, info):
+        combo = self.combo
+        if combo.findText(info.device) < 0:
+            i = 0
+            while i < combo.count() and combo.itemText(i) < info.device:
+                i += 1
+            combo.insertItem(i, info.device)
+            combo.setItemData(i, info.description, Qt.ToolTipRole)
+        if self.wanted is not None and port_identity(info) == self.wanted:
+            self.reconnect.emit(info.device)
+
+    def port_removed(self, info):
+        i = self.combo.findText(info.device)
+        if i >= 0:
+            self.combo.removeItem(i)
@@ -0,0 +1,321 @@
+# replay.py
+# Play a recorded capture (see capture.py) back into the tools.
+#
+# ReplaySerial stands in for serial.Serial: a pump thread writes the
+# recorded chunks into a pipe at the recorded pace (or N times faster, or
+# as fast as the reader takes them) and read()/readline()/in_waiting/
+# fileno() work on the other end. Readers, selectors and parsers downstream
+# cannot tell it from a real port.
+# ReplayUdp sends recorded datagrams to a UDP address the same way.
+#
+# Both support seek(), set_speed() and loop. speed=0 means no waiting.
+# Sources built with the same ReplayClock (clock=other.clock) share one
+# time anchor, so the streams of one capture stay in step through seeks,
+# speed changes and loops.
+#
+#   open_port("replay:captures/run1?speed=10&loop=1", 115200, timeout=1)
+#   open_port(replay_port("captures/run1.000.cap"))
+
+import fcntl
+import os
+import re
+import select
+import socket
+import termios
+import threading
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import parse_qs
+
+from capture import CaptureReader, SOURCE_SERIAL, SOURCE_UDP
+
+
+REPLAY_PREFIX = "replay:"
+
+
+def replay_port(path):
+    # open_port() name for the capture a segment file (.cap / .idx) belongs to
+    return REPLAY_PREFIX + re.sub(r"\.\d{3}\.(cap|idx)$", "", path)
+
+
+def open_port(port, baudrate=115200, timeout=1):
+    # serial.Serial, or a ReplaySerial for "replay:<capture base>[?speed=..&loop=..]"
+    if port.startswith(REPLAY_PREFIX):
+        base, _, query = port[len(REPLAY_PREFIX):].partition("?")
+        opts = {k: v[-1] for k, v in parse_qs(query).items()}
+        return ReplaySerial(base, speed=float(opts.get("speed", 1)),
+                            loop=opts.get("loop", "0") not in ("0", "false"),
+                            timeout=timeout)
+    import serial
+    return serial.Serial(port, baudrate, timeout=timeout)
+
+
+# ---------------- Clock ----------------
+class ReplayClock:
+    # Recorded time -> wall time for the sources replaying one capture.
+    # Sources given the same clock share seek, speed and loop: a seek
+    # restarts all of them at the new time, and a loop starts over once
+    # every source has played to the end.
+    def __init__(self, start_ns, end_ns, speed=1.0, loop=False):
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.speed = speed
+        self.loop = loop
+        self.position_ns = start_ns   # time of the last record any source sent
+        self.generation = 0           # bumped by every seek and loop restart
+        self.seek_ns = start_ns       # where the current generation starts
+        self._anchor = (start_ns, time.monotonic_ns(), speed)   # (recorded, wall, speed)
+        self._cond = threading.Condition()
+        self._sources = 0
+        self._finished = 0            # sources at the end in this generation
+
+    # ---- Controls (any thread) ----
+    def seek(self, t_ns):
+        with self._cond:
+            self._restart(min(max(t_ns, self.start_ns), self.end_ns))
+
+    def set_speed(self, speed):
+        with self._cond:
+            # re-anchor at the current replay time so speed changes do not jump
+            self._anchor = (self._now(), time.monotonic_ns(), speed)
+            self.speed = speed
+            self._cond.notify_all()
+
+    def set_loop(self, loop):
+        with self._cond:
+            self.loop = loop
+            self._check_loop()
+
+    def progress(self):
+        span = self.end_ns - self.start_ns
+        return (self.position_ns - self.start_ns) / span if span else 1.0
+
+    def wake(self):
+        # let waiting sources check whether they were stopped
+        with self._cond:
+            self._cond.notify_all()
+
+    # ---- Sources (pump threads) ----
+    def attach(self):
+        with self._cond:
+            self._sources += 1
+
+    def detach(self):
+        with self._cond:
+            self._sources -= 1
+            self._check_loop()
+
+    def current(self):
+        # (generation, start time) to play from
+        with self._cond:
+            return self.generation, self.seek_ns
+
+    def wait_until(self, t_ns, generation, stopped):
+        # sleep until recorded time t_ns is due; False if a seek or stop came first
+        with self._cond:
+            while True:
+                if self.generation != generation or stopped():
+                    return False
+                rec, wall, speed = self._anchor
+                if speed <= 0:
+                    return True
+                wait = (wall + (t_ns - rec) / speed - time.monotonic_ns()) / 1e9
+                if wait <= 0:
+                    return True
+                self._cond.wait(wait)
+
+    def sent(self, t_ns):
+        if t_ns > self.position_ns:
+            self.position_ns = t_ns
+
+    def finish(self, generation, stopped):
+        # a source played to the end: idle until the next seek or loop
+        with self._cond:
+            if generation == self.generation:
+                self._finished += 1
+                self._check_loop()
+            while self.generation == generation and not stopped():
+                self._cond.wait()
+
+    def _now(self):
+        rec, wall, speed = self._anchor
+        if speed <= 0:
+            return self.position_ns
+        return int(rec + (time.monotonic_ns() - wall) * speed)
+
+    def _restart(self, t_ns):
+        self.generation += 1
+        self.seek_ns = self.position_ns = t_ns
+        self._finished = 0
+        self._anchor = (t_ns, time.monotonic_ns(), self.speed)
+        self._cond.notify_all()
+
+    def _check_loop(self):
+        if self.loop and self._sources and self._finished >= self._sources:
+            self._restart(self.start_ns)
+
+
+# ---------------- Pump ----------------
+class ReplaySource(ABC):
+    def __init__(self, base, source, speed=1.0, loop=False, clock=None):
+        self.base = base
+        self.capture = CaptureReader(base)
+        self.source = source
+        # pass another source's clock to replay in step with it
+        self.clock = clock or ReplayClock(self.capture.start_ns, self.capture.end_ns,
+                                          speed, loop)
+        self.clock.attach()
+
+        self.start_ns = self.clock.start_ns
+        self.end_ns = self.clock.end_ns
+        self.finished = False   # this source played to the end (and does not loop)
+
+        self._running = True
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+
+    @property
+    def speed(self):
+        return self.clock.speed
+
+    @property
+    def loop(self):
+        return self.clock.loop
+
+    @property
+    def position_ns(self):
+        return self.clock.position_ns
+
+    # ---- Controls (any thread) ----
+    def seek(self, t_ns):
+        self.clock.seek(t_ns)
+
+    def seek_fraction(self, fraction):
+        self.seek(self.start_ns + int(fraction * (self.end_ns - self.start_ns)))
+
+    def set_speed(self, speed):
+        self.clock.set_speed(speed)
+
+    def set_loop(self, loop):
+        self.clock.set_loop(loop)
+
+    def progress(self):
+        return self.clock.progress()
+
+    def stop(self):
+        self._running = False
+        self.clock.wake()
+
+    # ---- Pump thread ----
+    def _stopped(self):
+        return not self._running
+
+    def _pump(self):
+        try:
+            while self._running:
+                generation, start = self.clock.current()
+                self.finished = False
+                if self._play(generation, start):
+                    self.finished = not self.clock.loop
+                    self.clock.finish(generation, self._stopped)
+        except OSError:
+            pass   # consumer side closed
+        finally:
+            self.clock.detach()
+            self.capture.close()
+
+    def _play(self, generation, start_ns):
+        # True if it played to the end, False on seek / stop
+        for t_ns, source, payload in self.capture.records(start_ns=start_ns):
+            if source != self.source:
+                continue
+            if not self.clock.wait_until(t_ns, generation, self._stopped):
+                return False
+            self._emit(payload)
+            self.clock.sent(t_ns)
+        return True
+
+    @abstractmethod
+    def _emit(self, payload):
+        # hand one recorded chunk / datagram to the consumer
+        ...
+
+
+# ---------------- Serial stand-in ----------------
+class ReplaySerial(ReplaySource):
+    def __init__(self, base, speed=1.0, loop=False, timeout=1, source=SOURCE_SERIAL,
+                 clock=None):
+        super().__init__(base, source, speed, loop, clock)
+        self.port = REPLAY_PREFIX + base
+        self.timeout = timeout
+        self.is_open = True
+        self._rfd, self._wfd = os.pipe()
+        self._buf = b""
+        self._thread.start()
+
+    def _emit(self, payload):
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(self._wfd, view):]
+
+    # ---- serial.Serial interface ----
+    def fileno(self):
+        return self._rfd
+
+    @property
+    def in_waiting(self):
+        buf = bytearray(4)
+        fcntl.ioctl(self._rfd, termios.FIONREAD, buf)
+        return int.from_bytes(buf, "little") + len(self._buf)
+
+    def _fill(self, deadline):
+        # read whatever the pipe has, waiting until deadline for the first byte
+        wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not select.select([self._rfd], [], [], wait)[0]:
+            return False
+        data = os.read(self._rfd, 65536)
+        self._buf += data
+        return bool(data)
+
+    def read(self, size=1):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while len(self._buf) < size:
+            if not self._fill(deadline):
+                break
+        data, self._buf = self._buf[:size], self._buf[size:]
+        return data
+
+    def readline(self):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while b"\n" not in self._buf:
+            if not self._fill(deadline):
+                data, self._buf = self._buf, b""
+                return data
+        end = self._buf.index(b"\n") + 1
+        data, self._buf = self._buf[:end], self._buf[end:]
+        return data
+
+    def close(self):
+        if not self.is_open:
+            return
+        self.is_open = False
+        self.stop()
+        os.close(self._rfd)   # unblocks a pump stuck in os.write
+        self._thread.join()
+        os.close(self._wfd)
+
+
+# ---------------- UDP ----------------
+class ReplayUdp(ReplaySource):
+    def __init__(self, base, dest, speed=1.0, loop=False, source=SOURCE_UDP, clock=None):
+        super().__init__(base, source, speed, loop, clock)
+        self.dest = dest
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._thread.start()
+
+    def _emit(self, payload):
+        self.sock.sendto(payload, self.dest)
+
+    def close(self):
+        self.stop()
+        self._thread.join()
+        self.sock.close()
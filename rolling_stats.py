@@ -0,0 +1,173 @@
+# rolling_stats.py
+# Statistics over the last N samples of a stream, without keeping history.
+#
+#   delta       last - previous                      O(1)
+#   mean / var  sliding Welford update               O(1)
+#   min / max   monotonic deques                     O(1) amortized
+#   median      two heaps, lazy removal              O(log N) amortized
+#
+# The median is exact over the window. The lower half of the window sits in
+# a max-heap, the upper half in a min-heap, both keyed (value, index) so
+# equal values stay distinct. A sample leaving the window is only counted
+# out of its half and popped once it reaches the top; a heap that is more
+# than half stale is rebuilt, so memory stays O(N) whatever the data does.
+
+import heapq
+import math
+from collections import deque
+
+
+class RollingStats:
+    def __init__(self, window=1000):
+        self.window = window
+        self._values = deque()
+        self._low = []        # (-value, -index): max-heap, lower half
+        self._high = []       # (value, index): min-heap, upper half
+        self._n_low = 0       # window samples in each half (stale ones excluded)
+        self._n_high = 0
+        self._min = deque()   # (index, value), values increasing
+        self._max = deque()   # (index, value), values decreasing
+        self._index = 0       # samples seen so far
+
+        self._mean = 0.0
+        self._m2 = 0.0        # sum of squared deviations from the mean
+        self.last = None
+        self.delta = None
+        self.count = 0        # samples in the window
+
+    def push(self, x):
+        if self.last is not None:
+            self.delta = x - self.last
+        self.last = x
+
+        i = self._index
+        self._index += 1
+        lo = i - self.window   # samples with index <= lo left the window
+
+        values = self._values
+        values.append(x)
+        self._insert(x, i)
+
+        if len(values) > self.window:
+            old = values.popleft()
+            self._remove(old, lo)
+            # replace old by x, count stays the same
+            n = self.count
+            mean = self._mean + (x - old) / n
+            self._m2 += (x - old) * (x - mean + old - self._mean)
+            self._mean = mean
+        else:
+            self.count += 1
+            d = x - self._mean
+            self._mean += d / self.count
+            self._m2 += d * (x - self._mean)
+        self._balance(lo)
+
+        mins = self._min
+        while mins and mins[-1][1] >= x:
+            mins.pop()
+        mins.append((i, x))
+        if mins[0][0] <= lo:
+            mins.popleft()
+
+        maxs = self._max
+        while maxs and maxs[-1][1] <= x:
+            maxs.pop()
+        maxs.append((i, x))
+        if maxs[0][0] <= lo:
+            maxs.popleft()
+
+    # ---- Median heaps ----
+    # Every entry of _low is below every entry of _high, stale ones included,
+    # so the top of _low tells which half any sample went to.
+    def _in_low(self, x, i):
+        return bool(self._low) and (x, i) <= (-self._low[0][0], -self._low[0][1])
+
+    def _insert(self, x, i):
+        if self._in_low(x, i):
+            heapq.heappush(self._low, (-x, -i))
+            self._n_low += 1
+        else:
+            heapq.heappush(self._high, (x, i))
+            self._n_high += 1
+
+    def _remove(self, x, i):
+        # counted out now, popped when it gets to the top
+        if self._in_low(x, i):
+            self._n_low -= 1
+        else:
+            self._n_high -= 1
+
+    def _balance(self, lo):
+        # _low holds the middle sample of an odd window
+        low, high = self._low, self._high
+        self._prune(lo)
+        while self._n_low > self._n_high + 1:
+            x, i = heapq.heappop(low)
+            heapq.heappush(high, (-x, -i))
+            self._n_low -= 1
+            self._n_high += 1
+            self._prune(lo)
+        while self._n_low < self._n_high:
+            x, i = heapq.heappop(high)
+            heapq.heappush(low, (-x, -i))
+            self._n_high -= 1
+            self._n_low += 1
+            self._prune(lo)
+
+        if len(low) > 2 * self._n_low + 16:
+            self._low = [e for e in low if -e[1] > lo]
+            heapq.heapify(self._low)
+        if len(high) > 2 * self._n_high + 16:
+            self._high = [e for e in high if e[1] > lo]
+            heapq.heapify(self._high)
+
+    def _prune(self, lo):
+        # pop samples that left the window off both tops
+        low, high = self._low, self._high
+        while low and -low[0][1] <= lo:
+            heapq.heappop(low)
+        while high and high[0][1] <= lo:
+            heapq.heappop(high)
+
+    # ---- Results ----
+    @property
+    def mean(self):
+        return self._mean if self.count else None
+
+    @property
+    def variance(self):
+        # sample variance
+        return max(self._m2, 0.0) / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def std(self):
+        var = self.variance
+        return None if var is None else math.sqrt(var)
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+    @property
+    def median(self):
+        if not self.count:
+            return None
+        mid = -self._low[0][0]
+        return mid if self._n_low > self._n_high else (mid + self._high[0][0]) / 2
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "last": self.last,
+            "delta": self.delta,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+            "median": self.median,
+        }
@@ -0,0 +1,74 @@
+# sample_ring.py
+# Preallocated NumPy ring buffer for live samples.
+#
+# Every sample is written twice: at i and at i + capacity. That way the
+# last n samples are always one contiguous slice of the array, so view()
+# hands out a NumPy view without copying or reordering anything.
+
+import numpy as np
+
+
+class SampleRing:
+    def __init__(self, capacity, dtype=np.float64):
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        self._head = 0     # next write position in [0, capacity)
+        self._count = 0
+        self.version = 0   # bumped on every write, lets readers skip unchanged frames
+        self.total = 0     # samples written since creation / clear(): index of the next one
+
+    def __len__(self):
+        return self._count
+
+    # ---- Writing ----
+    def append(self, value):
+        cap = self.capacity
+        h = self._head
+        self._data[h] = value
+        self._data[h + cap] = value
+        self._head = (h + 1) % cap
+        if self._count < cap:
+            self._count += 1
+        self.total += 1
+        self.version += 1
+
+    def extend(self, values):
+        cap = self.capacity
+        values = np.asarray(values, dtype=self._data.dtype)
+        n = len(values)
+        if n == 0:
+            return
+        self.total += n
+        if n > cap:
+            values = values[-cap:]
+            n = cap
+
+        h = self._head
+        first = min(n, cap - h)
+        self._data[h:h + first] = values[:first]
+        self._data[h + cap:h + cap + first] = values[:first]
+        rest = n - first
+        if rest:
+            self._data[:rest] = values[first:]
+            self._data[cap:cap + rest] = values[first:]
+
+        self._head = (h + n) % cap
+        self._count = min(self._count + n, cap)
+        self.version += 1
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+        self.total = 0
+        self.version += 1
+
+    # ---- Reading ----
+    def view(self, n=None):
+        # last n samples, oldest first. This is a view into the ring:
+        # copy it if you need it to survive later writes.
+        n = self._count if n is None else min(n, self._count)
+        end = self._head + self.capacity
+        return self._data[end - n:end]
+
+    def last(self):
+        return self._data[self._head + self.capacity - 1] if self._count else None
@@ -0,0 +1,90 @@
+# sample_store.py
+# Columnar store for parsed telemetry.
+#
+# One SampleRing per channel plus one shared timestamp column, all with
+# the same capacity and written in lockstep, so row i of every column
+# belongs to the same sample. Appends are O(1), windows are zero-copy
+# NumPy views (see sample_ring.py). Missing values are stored as NaN.
+
+import time
+
+import numpy as np
+
+from sample_ring import SampleRing
+
+
+class SampleStore:
+    def __init__(self, channels=(), capacity=1_000_000, dtype=np.float64):
+        self.capacity = capacity
+        self.dtype = dtype
+        self.t = SampleRing(capacity, np.float64)   # time.monotonic() seconds
+        self.channels = {}
+        for name in channels:
+            self.add_channel(name)
+
+    def __len__(self):
+        return len(self.t)
+
+    @property
+    def version(self):
+        return self.t.version
+
+    def add_channel(self, name):
+        if name in self.channels:
+            return self.channels[name]
+        ring = SampleRing(self.capacity, self.dtype)
+        if len(self.t):
+            # earlier rows have no value for the new channel
+            ring.extend(np.full(len(self.t), np.nan))
+            ring.total = self.t.total   # row numbers line up with the other columns
+        self.channels[name] = ring
+        return ring
+
+    # ---- Writing ----
+    def append(self, values, t=None):
+        # values: {channel: value}, unknown channels are added on the fly
+        for name in values:
+            if name not in self.channels:
+                self.add_channel(name)
+        for name, ring in self.channels.items():
+            ring.append(values.get(name, np.nan))
+        # timestamp last: its version bump marks the row as complete
+        self.t.append(time.monotonic() if t is None else t)
+
+    def extend(self, columns, t=None):
+        # columns: {channel: sequence}, all the same length
+        if not columns:
+            return
+        n = len(next(iter(columns.values())))
+        if n == 0:
+            return
+        for name in columns:
+            if name not in self.channels:
+                self.add_channel(name)
+        for name, ring in self.channels.items():
+            col = columns.get(name)
+            ring.extend(np.full(n, np.nan) if col is None else col)
+        if t is None:
+            t = np.full(n, time.monotonic())
+        self.t.extend(t)
+
+    def clear(self):
+        for ring in self.channels.values():
+            ring.clear()
+        self.t.clear()
+
+    # ---- Reading ----
+    def ring(self, name):
+        return self.channels[name]
+
+    def column(self, name, n=None):
+        return self.channels[name].view(n)
+
+    def window(self, n=None):
+        # (timestamps, {channel: values}) for the last n rows, all views
+        return self.t.view(n), {name: ring.view(n) for name, ring in self.channels.items()}
+
+    def since(self, t0):
+        # number of trailing rows with timestamp >= t0 (timestamps are monotonic)
+        t = self.t.view()
+        return len(t) - int(np.searchsorted(t, t0, side="left"))
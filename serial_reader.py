@@ -0,0 +1,287 @@
+# serial_reader.py
+# The serial reader thread shared by the monitors.
+#
+# Batch mode (the default) drains whatever is waiting in one read() of at
+# most chunk_size bytes, splits complete lines with a LineBatcher and emits
+# them as one lines_received per flush_interval or max_batch lines. In
+# binary mode the same chunks go through a FrameDecoder (framing.py) and
+# come out as frames_received({field: values}). batch=False keeps the old
+# readline() loop with one data_received per line.
+#
+# Besides the signals the reader can feed, from its own thread:
+#   display   a Handoff to the GUI (handoff.py); lines_ready is emitted
+#             when it has lines, the GUI take()s them
+#   queues    other Handoffs the reader may block on through DirectConnection
+#             sinks (a UdpForwarder's queue); stop() releases them with display
+#   capture   a CaptureWriter getting every raw chunk (start_capture(),
+#             set_capture()); replay it with open_port("replay:<base>")
+#   store     a SampleStore getting the binary records
+#   latency   LatencyStages, "batch" stage stamped per emitted line
+#   counters  PerfCounters (bytes, lines, records)
+#
+# AsyncSerialReader has the same signals and settings but runs on the
+# shared asyncio loop (aio_transport.py) instead of a thread of its own.
+#
+#   reader = SerialReader("/dev/ttyUSB0", display=Handoff(50_000))
+#   reader.disconnected.connect(on_error)
+#   reader.start()
+
+import os
+import re
+import threading
+import time
+
+from PySide6.QtCore import QThread, Signal
+
+from capture import CaptureWriter
+from framing import FrameDecoder, BINARY_LAYOUT, BINARY_NAMES, BINARY_FRAMING, BINARY_CRC
+from line_batcher import LineBatcher
+from perf_overlay import PerfCounters
+from replay import open_port
+
+
+class SerialReader(QThread):
+    data_received = Signal(str)       # line mode: one signal per line
+    lines_received = Signal(object)   # batch mode: latency.Lines (lines + read stamps) per batch
+    frames_received = Signal(object)  # binary mode: {field: values} per batch
+    lines_ready = Signal()            # the display Handoff has lines, take() them
+    disconnected = Signal(str)
+
+    def __init__(self, port, baudrate=115200, batch=True,
+                 flush_interval=0.02, max_batch=500, chunk_size=65536,
+                 mode="text", decoder=None, store=None, capture=None, latency=None,
+                 counters=None, display=None, queues=()):
+        super().__init__()
+        self.port = port
+        self.baudrate = baudrate
+        self.serial = None
+        self.running = True
+
+        # batch mode settings
+        self.batch = batch
+        self.flush_interval = flush_interval  # seconds
+        self.max_batch = max_batch            # lines per signal
+        self.chunk_size = chunk_size          # max bytes per read()
+
+        # "text" or "binary", can be switched while running (batch mode only)
+        self.mode = mode
+        self.decoder = decoder or FrameDecoder(BINARY_LAYOUT, BINARY_NAMES,
+                                               BINARY_FRAMING, BINARY_CRC)
+        self.store = store   # binary records go straight in here if given
+        self.capture = capture   # CaptureWriter recording the raw bytes, or None
+        self._capture_lock = threading.Lock()   # see set_capture()
+        self.latency = latency   # LatencyStages with a "batch" stage, or None
+        self.counters = counters or PerfCounters()
+        # bounded queue to the GUI; lines_received / frames_received are
+        # unbounded and meant for DirectConnection sinks
+        self.display = display
+        if display is not None:
+            display.notify = self.lines_ready.emit
+        self.queues = [q for q in (display, *queues) if q is not None]
+
+    def set_mode(self, mode):
+        self.mode = mode
+
+    def set_capture(self, capture):
+        # swap the CaptureWriter (or None), from any thread. Returns the old
+        # one, which the reader no longer writes to once this returns, so it
+        # can be closed without losing chunks.
+        with self._capture_lock:
+            old, self.capture = self.capture, capture
+        return old
+
+    def record(self, chunk):
+        with self._capture_lock:
+            capture = self.capture
+            if chunk and capture is not None:
+                capture.write(chunk)
+
+    def start_capture(self, folder):
+        # record from now on to folder/<port>_<date>_<time>.*.cap, returns the base
+        name = re.sub(r"\W+", "_", os.path.basename(self.port))
+        base = os.path.join(folder, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+        old = self.set_capture(CaptureWriter(base))
+        if old is not None:
+            old.close()
+        return base
+
+    def stop_capture(self):
+        # detach first, so close() flushes every chunk the reader gave it;
+        # returns the closed CaptureWriter, or None if not recording
+        capture = self.set_capture(None)
+        if capture is not None:
+            capture.close()
+        return capture
+
+    def run(self):
+        try:
+            timeout = self.flush_interval if self.batch else 1
+            self.serial = open_port(self.port, self.baudrate, timeout=timeout)
+            if self.batch:
+                self.read_batches()
+            else:
+                self.read_lines()
+        except Exception as e:
+            self.disconnected.emit(f"Serial error: {e}")
+        finally:
+            if self.serial and self.serial.is_open:
+                self.serial.close()
+
+    # ---- Line mode ----
+    def read_lines(self):
+        while self.running:
+            raw = self.serial.readline()
+            self.record(raw)
+            self.counters.bytes += len(raw)
+            line = raw.decode("utf-8", errors="ignore").strip()
+            if line:
+                self.counters.lines += 1
+                self.data_received.emit(line)
+
+    # ---- Batch mode ----
+    def read_batches(self):
+        # drain everything waiting in one read, emit complete lines as a list
+        self.start_batching()
+        while self.running:
+            waiting = self.serial.in_waiting
+            chunk = self.serial.read(min(max(waiting, 1), self.chunk_size))
+            self.handle_chunk(chunk, time.perf_counter_ns())
+        self.finish_batching()
+
+    def start_batching(self):
+        self._batcher = LineBatcher(self.flush_interval, self.max_batch, stamped=True)
+        self._mode = self.mode
+        self._rows = []
+        self._last_emit = time.monotonic()
+
+    def handle_chunk(self, chunk, t_ns=None):
+        # one read worth of bytes, read at t_ns (perf_counter_ns); b"" just
+        # checks the flush deadlines
+        self.record(chunk)
+        self.counters.bytes += len(chunk)
+
+        if self.mode != self._mode:
+            # switched on the fly: half lines / frames belong to the old mode
+            self._mode = self.mode
+            self._batcher = LineBatcher(self.flush_interval, self.max_batch, stamped=True)
+            self.decoder.reset()
+
+        if self._mode == "binary":
+            self._rows.extend(self.decoder.feed(chunk))
+            now = time.monotonic()
+            if self._rows and (len(self._rows) >= self.max_batch
+                               or now - self._last_emit >= self.flush_interval):
+                self.emit_frames(self._rows)
+                self._rows = []
+                self._last_emit = now
+            return
+
+        batcher = self._batcher
+        batcher.feed(chunk, t_ns)
+        while batcher.ready():
+            self.emit_lines(batcher.take())
+
+    def has_pending(self):
+        return bool(self._rows) or self._batcher.pending() > 0
+
+    def finish_batching(self):
+        if self._rows:
+            self.emit_frames(self._rows)
+            self._rows = []
+        self._batcher.flush_partial()
+        while self._batcher.pending():
+            self.emit_lines(self._batcher.take())
+
+    def emit_lines(self, lines):
+        if self.latency is not None:
+            self.latency.record_stamps("batch", lines.stamps)
+        self.counters.lines += len(lines)
+        self.lines_received.emit(lines)
+        if self.display is not None:
+            self.display.put(lines)
+
+    def emit_frames(self, rows):
+        columns = dict(zip(self.decoder.names, zip(*rows)))
+        if self.store is not None:
+            self.store.extend(columns)
+        self.counters.records += len(rows)
+        self.frames_received.emit(columns)
+        if self.display is not None:
+            # shown as key=value, formatted here rather than in the GUI thread
+            names = self.decoder.names
+            self.display.put([" ".join(f"{n}={v}" for n, v in zip(names, row))
+                              for row in rows])
+
+    def release_queues(self):
+        # a reader blocked on a full queue would never stop
+        for queue in self.queues:
+            queue.release()
+
+    def stop(self):
+        self.running = False
+        # a release only lasts until the consumer's next take(), so repeat
+        # it until the reader is out
+        self.release_queues()
+        while not self.wait(50):
+            self.release_queues()
+
+
+class AsyncSerialReader(SerialReader):
+    # Same signals and settings as SerialReader, but driven by the shared
+    # asyncio loop (aio_transport.py) instead of a thread of its own:
+    # the port fd is watched with add_reader, no read timeouts anywhere.
+    def __init__(self, backend, port, **kwargs):
+        super().__init__(port, **kwargs)
+        self.backend = backend
+        self._fd = None
+        self._flush_handle = None
+
+    def start(self):
+        self.backend.call(self._open)
+
+    def stop(self):
+        self.release_queues()
+        self.backend.call_wait(self._close)
+
+    # ---- Loop thread ----
+    def _open(self):
+        try:
+            self.serial = open_port(self.port, self.baudrate, timeout=0)
+            self.start_batching()
+            self._fd = self.serial.fileno()
+            self.backend.loop.add_reader(self._fd, self._readable)
+        except Exception as e:
+            self._close()
+            self.disconnected.emit(f"Serial error: {e}")
+
+    def _readable(self):
+        try:
+            waiting = self.serial.in_waiting
+            chunk = self.serial.read(min(max(waiting, 1), self.chunk_size))
+        except Exception as e:
+            self._close()
+            self.disconnected.emit(f"Serial error: {e}")
+            return
+        self.handle_chunk(chunk, time.perf_counter_ns())
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        # pending lines go out after flush_interval even if no more bytes come
+        if self._flush_handle is None and self.has_pending():
+            self._flush_handle = self.backend.loop.call_later(self.flush_interval, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        self.handle_chunk(b"")
+        self._schedule_flush()
+
+    def _close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._fd is not None:
+            self.backend.loop.remove_reader(self._fd)
+            self._fd = None
+            self.finish_batching()
+        if self.serial and self.serial.is_open:
+            self.serial.close()
@@ -0,0 +1,83 @@
+# startup.py
+# Startup timing for the GUI tools, and a hook to defer work until the
+# window is on screen.
+#
+# Marks are perf_counter stamps reported relative to process start (taken
+# from /proc/self/stat, so interpreter start-up and imports count too).
+# Run a tool with --startup-report (or MCU_STARTUP_REPORT=1) to get the
+# report on stderr once the main window has painted for the first time:
+#
+#   startup  (ms since process start)
+#      212.4  (+212.4)  imports
+#      231.0  ( +18.6)  window built
+#      238.9  (  +7.9)  first paint
+#
+# after_first_paint() is what the tools use to build plots, enumerate ports
+# and the like only after the window is visible.
+
+import os
+import sys
+import time
+
+from PySide6.QtCore import QObject, QEvent, QTimer
+
+
+ENABLED = "--startup-report" in sys.argv or bool(os.environ.get("MCU_STARTUP_REPORT"))
+
+
+def _process_start():
+    # perf_counter() value at process start, best effort
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rpartition(")")[2].split()
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")   # s after boot
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - started
+        return time.perf_counter() - age
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.perf_counter()
+
+
+T0 = _process_start()
+_marks = []
+
+
+def mark(name):
+    _marks.append((name, time.perf_counter()))
+
+
+def report(out=None):
+    lines = ["startup  (ms since process start)"]
+    prev = T0
+    for name, t in _marks:
+        lines.append(f"  {(t - T0) * 1000:7.1f}  ({(t - prev) * 1000:+6.1f})  {name}")
+        prev = t
+    print("\n".join(lines), file=out or sys.stderr, flush=True)
+
+
+# ---------------- First paint ----------------
+class _FirstPaint(QObject):
+    def __init__(self, widget, callback, name=None):
+        super().__init__(widget)
+        self.callback = callback
+        self.name = name   # mark taken at the paint itself
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            if self.name:
+                mark(self.name)
+            obj.removeEventFilter(self)
+            # run after the paint, not inside it
+            QTimer.singleShot(0, self.callback)
+            self.deleteLater()
+        return False
+
+
+def after_first_paint(widget, callback):
+    # call callback() once, right after widget has painted for the first time
+    _FirstPaint(widget, callback)
+
+
+def report_when_shown(window):
+    # mark the first paint of window and print the report, if enabled
+    _FirstPaint(window, report if ENABLED else lambda: None, name="first paint")
@@ -0,0 +1,55 @@
+# state_store.py
+# Versioned state shared between writer threads and readers.
+#
+# A writer publishes all the values that belong together in one call; the
+# store builds a new snapshot dict, bumps the sequence number and wakes the
+# readers. A snapshot is never changed after it is published, so whatever a
+# reader holds is consistent, and reading one takes no lock. Publishing
+# values that are already current changes nothing and wakes nobody.
+#
+#   state = StateStore(distance=0, status="init")
+#   state.publish(distance=42, status="OK")      # writer
+#   seq, values = state.wait(seen)                # reader, blocks until seq != seen
+
+import threading
+
+
+class StateStore:
+    def __init__(self, **values):
+        self._cond = threading.Condition()
+        self._current = (0, dict(values))   # (seq, snapshot), swapped whole
+        self.closed = False
+
+    @property
+    def seq(self):
+        return self._current[0]
+
+    def snapshot(self):
+        # (seq, values) of the newest snapshot; do not modify values
+        return self._current
+
+    def publish(self, **changes):
+        # make changes visible together; returns the (possibly new) seq
+        with self._cond:
+            seq, values = self._current
+            if all(k in values and values[k] == v for k, v in changes.items()):
+                return seq
+            values = dict(values)
+            values.update(changes)
+            self._current = (seq + 1, values)
+            self._cond.notify_all()
+            return seq + 1
+
+    def wait(self, seen, timeout=None):
+        # block until the seq differs from seen; (seq, values), None once closed
+        with self._cond:
+            self._cond.wait_for(lambda: self._current[0] != seen or self.closed, timeout)
+            if self.closed:
+                return None
+            return self._current
+
+    def close(self):
+        # wake all readers for good
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
@@ -0,0 +1,108 @@
+# test_capture.py
+# CaptureWriter -> CaptureReader round trips, segments and the time index.
+
+import os
+
+import pytest
+
+from capture import (HEADER, INDEX, RECORD, CaptureReader, CaptureWriter,
+                     SOURCE_SERIAL, SOURCE_UDP, segment_path)
+from replay import REPLAY_PREFIX, replay_port
+
+
+def _record(base, n, size=100, **kwargs):
+    # n chunks 1 ms apart, every third one from the UDP source
+    w = CaptureWriter(base, **kwargs)
+    expected = []
+    for i in range(n):
+        t_ns = 1_000_000_000 + i * 1_000_000
+        source = SOURCE_UDP if i % 3 == 0 else SOURCE_SERIAL
+        data = bytes([i % 256]) * (size + i % 7)
+        w.write(data, source, t_ns)
+        expected.append((t_ns, source, data))
+    w.close()
+    return w, expected
+
+
+def test_round_trip(tmp_path):
+    base = str(tmp_path / "run")
+    w, expected = _record(base, 500)
+    assert (w.records, w.bytes, w.lost) == (500, sum(len(d) for _, _, d in expected), 0)
+
+    r = CaptureReader(base)
+    assert [(t, s, bytes(p)) for t, s, p in r.records()] == expected
+    assert (r.start_ns, r.end_ns) == (expected[0][0], expected[-1][0])
+    r.close()
+
+
+def test_segment_rollover(tmp_path):
+    base = str(tmp_path / "run")
+    _, expected = _record(base, 1000, segment_bytes=10_000, index_every=1000)
+    segments = sorted(p for p in os.listdir(tmp_path) if p.endswith(".cap"))
+    assert len(segments) > 5
+    for n in range(len(segments)):
+        # a record starts a new segment once the old one reached segment_bytes
+        size = os.path.getsize(segment_path(base, n, "cap"))
+        assert size < 10_000 + RECORD.size + 200
+
+    r = CaptureReader(base)
+    assert len(r.segments) == len(segments)
+    assert [(t, s, bytes(p)) for t, s, p in r.records()] == expected
+    assert r.end_ns == expected[-1][0]
+    r.close()
+
+
+def test_sparse_index_seek(tmp_path):
+    base = str(tmp_path / "run")
+    _, expected = _record(base, 2000, segment_bytes=50_000, index_every=4096)
+    r = CaptureReader(base)
+    entries = sum(len(seg.index) for seg in r.segments)
+    total = sum(os.path.getsize(segment_path(base, n, "cap")) for n in range(len(r.segments)))
+    assert entries <= total // 4096 + 2 * len(r.segments)   # sparse: one per index_every bytes
+    for seg in r.segments:
+        assert seg.index == sorted(seg.index)
+        assert seg.index[0][1] == HEADER.size
+
+    for i in (0, 1, 137, 1000, 1999):
+        t_ns = expected[i][0]
+        segment, offset = r.seek(t_ns)
+        first = next(r.segments[segment].records(offset))
+        assert first[0] <= t_ns   # the scan starts at or before the wanted time
+        assert [t for t, _, _ in r.records(t_ns)] == [t for t, _, _ in expected[i:]]
+    assert list(r.records(expected[-1][0] + 1)) == []
+    r.close()
+
+
+def test_torn_tail_and_index(tmp_path):
+    # a crash leaves half a record and half an index entry behind
+    base = str(tmp_path / "run")
+    _, expected = _record(base, 50, index_every=500)
+    cap, idx = segment_path(base, 0, "cap"), segment_path(base, 0, "idx")
+    with open(cap, "ab") as f:
+        f.write(RECORD.pack(2_000_000_000, SOURCE_SERIAL, 100) + b"x" * 10)
+    with open(idx, "ab") as f:
+        f.write(INDEX.pack(2_000_000_000, 123)[:7])
+
+    r = CaptureReader(base)
+    assert [(t, s, bytes(p)) for t, s, p in r.records()] == expected
+    assert r.end_ns == expected[-1][0]
+    r.close()
+
+
+def test_write_after_close_is_counted(tmp_path):
+    w = CaptureWriter(str(tmp_path / "run"))
+    w.write(b"kept")
+    w.close()
+    w.write(b"late")
+    assert (w.records, w.lost) == (1, 1)
+    assert "1 chunks after close" in w.summary()
+
+
+def test_missing_capture(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        CaptureReader(str(tmp_path / "nothing"))
+
+
+def test_replay_port():
+    assert replay_port("captures/run_1.003.cap") == REPLAY_PREFIX + "captures/run_1"
+    assert replay_port("captures/run_1.000.idx") == REPLAY_PREFIX + "captures/run_1"
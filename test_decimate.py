@@ -0,0 +1,112 @@
+# test_decimate.py
+# MinMaxPyramid envelopes against plain min/max over the samples.
+
+import numpy as np
+import pytest
+
+from decimate import MinMaxPyramid, interleave, lttb, minmax
+from sample_ring import SampleRing
+
+
+def _check_envelope(pyramid, data, x0, x1, width):
+    # every block's lo/hi is the min/max of the samples it covers; the
+    # blocks follow each other from x0 (a multiple of every block size)
+    x, lo, hi = pyramid.envelope(x0, x1, width)
+    if lo is hi:
+        assert np.array_equal(x, np.arange(x0, x1))
+        assert np.array_equal(lo, data[x0:x1])
+        return
+    # a block or two per pixel, unless the top level is finer than that
+    coarsest = pyramid.sizes[-1]
+    assert len(x) <= max(2 * width, -(-(x1 - x0) // coarsest)) + 1
+    start = x0
+    for c, l, h in zip(x, lo, hi):
+        end = int(2 * c - start) + 1
+        assert (l, h) == (data[start:end].min(), data[start:end].max()), (start, end)
+        start = end
+    assert start >= x1
+
+
+@pytest.mark.parametrize("width", [100, 333, 800, 5000])
+def test_envelope_matches_brute_force(width):
+    rng = np.random.default_rng(width)
+    ring = SampleRing(1 << 16)
+    pyramid = MinMaxPyramid(ring)
+    data = np.empty(0)
+    for n in (1000, 1, 20_000, 7, 50_000, 60_000):   # the last batches wrap the ring
+        chunk = rng.normal(size=n).cumsum()
+        chunk[rng.integers(n)] += 1000   # a spike the envelope must keep
+        ring.extend(chunk)
+        data = np.append(data, chunk)
+        first = ring.total - len(ring)
+        x0 = -(-first // 4096) * 4096
+        for x1 in (ring.total, ring.total - 1, x0 + 5000, x0 + 123):
+            _check_envelope(pyramid, data, x0, min(x1, ring.total), width)
+
+        x, lo, hi = pyramid.envelope(first, ring.total, width)
+        assert hi.max() == data[first:].max()
+        assert lo.min() == data[first:].min()
+
+
+def test_envelope_skips_nan():
+    ring = SampleRing(4096)
+    pyramid = MinMaxPyramid(ring, min_blocks=16)
+    y = np.arange(4096, dtype=np.float64)
+    y[1000:3000] = np.nan
+    ring.extend(y)
+    x, lo, hi = pyramid.envelope(0, 4096, 64)
+    assert not np.isnan(lo).any() and not np.isnan(hi).any()
+    assert lo.min() == 0 and hi.max() == 4095
+    assert not ((x > 1024) & (x < 2944)).any()   # blocks of 64 with no value
+
+
+def test_envelope_after_clear():
+    ring = SampleRing(10_000)
+    pyramid = MinMaxPyramid(ring)
+    ring.extend(np.ones(10_000))
+    pyramid.sync()
+    ring.clear()
+    ring.extend(np.arange(5000, dtype=np.float64))
+    x, lo, hi = pyramid.envelope(0, ring.total, 100)
+    assert (lo.min(), hi.max()) == (0, 4999)
+
+
+def test_minmax_keeps_extremes():
+    rng = np.random.default_rng(3)
+    x = np.arange(100_000, dtype=np.float64)
+    y = rng.normal(size=len(x))
+    y[12_345] = 50
+    y[67_890] = -50
+    xs, ys = minmax(x, y, 500)
+    assert len(ys) == 1000
+    assert ys.max() == 50 and ys.min() == -50
+    assert np.all(np.diff(xs) >= 0)
+
+    short = np.arange(10, dtype=np.float64)
+    assert minmax(short, short, 500)[1] is short
+
+
+def test_lttb():
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 500)
+    y[5000] = 10
+    xs, ys = lttb(x, y, 200)
+    assert len(xs) == 200
+    assert (xs[0], xs[-1]) == (0, 9999)
+    assert np.all(np.diff(xs) > 0)
+    assert 10 in ys   # a lone spike is the largest triangle of its bucket
+
+    y[10] = np.nan
+    xs, ys = lttb(x, y, 10_000)
+    assert len(xs) == 9999 and not np.isnan(ys).any()
+
+
+def test_query_is_the_interleaved_envelope():
+    ring = SampleRing(1 << 14)
+    ring.extend(np.random.default_rng(5).normal(size=40_000))
+    pyramid = MinMaxPyramid(ring)
+    x, lo, hi = pyramid.envelope(ring.total - 10_000, ring.total, 300)
+    qx, qy = pyramid.query(ring.total - 10_000, ring.total, 300)
+    ix, iy = interleave(x, lo, hi)
+    assert np.array_equal(qx, ix) and np.array_equal(qy, iy)
+    assert len(iy) == 2 * len(lo)
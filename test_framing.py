@@ -0,0 +1,78 @@
+# test_framing.py
+# Byte stuffing round trips and what FrameDecoder rejects.
+
+import random
+
+import pytest
+
+from framing import FrameDecoder, cobs_decode, cobs_encode, slip_decode, slip_encode
+
+
+def _payloads():
+    rng = random.Random(1)
+    yield b""
+    yield b"\x00"
+    yield b"\x00\x00\x00"
+    yield b"\xc0\xdb\xdc\xdd"
+    for n in (253, 254, 255, 508, 1000):
+        yield bytes(rng.randrange(1, 256) for _ in range(n))   # no zeros: 0xFF blocks
+        yield bytes(rng.randrange(256) for _ in range(n))
+
+
+@pytest.mark.parametrize("data", list(_payloads()))
+def test_cobs_round_trip(data):
+    encoded = cobs_encode(data)
+    assert b"\x00" not in encoded
+    assert cobs_decode(encoded) == data
+
+
+@pytest.mark.parametrize("data", list(_payloads()))
+def test_slip_round_trip(data):
+    encoded = slip_encode(data)
+    assert b"\xc0" not in encoded[1:-1]
+    assert slip_decode(encoded[1:-1]) == data
+
+
+@pytest.mark.parametrize("framing", ["cobs", "slip"])
+@pytest.mark.parametrize("crc", ["crc16", "crc32", None])
+def test_decoder_split_chunks(framing, crc):
+    dec = FrameDecoder("<Ihh", framing=framing, crc=crc)
+    rows = [(i, i - 3, -i) for i in range(20)]
+    stream = b"".join(dec.encode(rows[i:i + 4]) for i in range(0, 20, 4))
+
+    got = []
+    for i in range(0, len(stream), 7):   # frames cut at every possible place
+        got += dec.feed(stream[i:i + 7])
+    assert got == rows
+    assert (dec.frames, dec.records, dec.bad_frames) == (5, 20, 0)
+
+
+@pytest.mark.parametrize("framing", ["cobs", "slip"])
+@pytest.mark.parametrize("crc", ["crc16", "crc32"])
+def test_decoder_drops_corrupted_frames(framing, crc):
+    dec = FrameDecoder("<Ihh", framing=framing, crc=crc)
+    good = dec.encode([(1, 2, 3)])
+    rng = random.Random(2)
+    for _ in range(50):
+        frame = bytearray(good)
+        i = rng.randrange(1, len(frame) - 1)   # leave the delimiters alone
+        frame[i] ^= 1 << rng.randrange(8)
+        if framing == "cobs" and frame[i] == 0:
+            continue   # an extra delimiter, a different frame
+        assert dec.feed(bytes(frame)) == []
+    assert dec.frames == 0
+    assert dec.bad_frames > 0
+
+    # the stream stays in sync after bad frames
+    assert dec.feed(good) == [(1, 2, 3)]
+
+
+def test_decoder_checks_length_and_columns():
+    dec = FrameDecoder("<Ihh", names=["t", "a", "b"], crc=None)
+    assert dec.feed(cobs_encode(b"\x01\x02\x03") + b"\x00") == []   # not a whole record
+    assert dec.bad_frames == 1
+    assert dec.feed_columns(dec.encode([(1, 2, 3), (4, 5, 6)])) == {
+        "t": (1, 4), "a": (2, 5), "b": (3, 6)}
+
+    with pytest.raises(ValueError):
+        FrameDecoder("<Ihh", names=["t"])
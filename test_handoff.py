@@ -0,0 +1,111 @@
+# test_handoff.py
+# What each Handoff policy keeps when the consumer falls behind.
+
+import threading
+
+import pytest
+
+from handoff import BLOCK, DECIMATE, DROP_NEWEST, DROP_OLDEST, Handoff
+from latency import Lines
+
+
+def test_drop_oldest_keeps_newest():
+    h = Handoff(10, DROP_OLDEST)
+    for i in range(0, 25, 5):
+        h.put(list(range(i, i + 5)))
+    assert h.take() == list(range(15, 25))
+    assert (h.lines_in, h.dropped, h.depth) == (25, 15, 0)
+
+
+def test_drop_newest_keeps_oldest():
+    h = Handoff(10, DROP_NEWEST)
+    for i in range(0, 25, 5):
+        h.put(list(range(i, i + 5)))
+    h.put([99])
+    assert h.take() == list(range(10))
+    assert (h.lines_in, h.dropped) == (26, 16)
+
+
+def test_decimate_keeps_the_time_span():
+    h = Handoff(100, DECIMATE)
+    for i in range(0, 1000, 10):
+        h.put(list(range(i, i + 10)))
+    lines = h.take()
+    assert len(lines) <= 100
+    assert lines == sorted(lines)
+    assert lines[0] < 100 and lines[-1] >= 900   # first and last part both there
+    assert h.dropped == 1000 - len(lines)
+
+    # the next batch after take() comes through whole
+    h.put(list(range(5)))
+    assert h.take() == list(range(5))
+
+
+def test_batch_larger_than_queue():
+    for policy in (DROP_OLDEST, DROP_NEWEST, DECIMATE):
+        h = Handoff(10, policy)
+        h.put(list(range(30)))
+        assert len(h.take()) <= 10, policy
+    h = Handoff(10, BLOCK)
+    h.put(list(range(30)))   # nothing queued: goes through instead of waiting forever
+    assert h.take() == list(range(30))
+
+
+def _put_in_thread(h, lines):
+    t = threading.Thread(target=h.put, args=(lines,), daemon=True)
+    t.start()
+    return t
+
+
+def test_block_waits_for_take():
+    h = Handoff(10, BLOCK)
+    h.put(list(range(8)))
+    t = _put_in_thread(h, list(range(8, 12)))
+    t.join(0.2)
+    assert t.is_alive()   # waits for room
+    assert h.take() == list(range(8))
+    t.join(1)
+    assert not t.is_alive()
+    assert h.take() == list(range(8, 12))
+    assert h.dropped == 0
+    assert h.blocked_ns > 0
+
+
+def test_block_release():
+    h = Handoff(10, BLOCK)
+    h.put(list(range(10)))
+    t = _put_in_thread(h, [10, 11])
+    t.join(0.2)
+    assert t.is_alive()
+    h.release()
+    t.join(1)
+    assert not t.is_alive()
+    h.put([12])   # released until the next take()
+    assert h.take() == list(range(13))
+    assert h.dropped == 0
+
+    # take() ends the release
+    h.put(list(range(10)))
+    t = _put_in_thread(h, [10])
+    t.join(0.2)
+    assert t.is_alive()
+    h.close()
+    t.join(1)
+    assert not t.is_alive()
+
+
+def test_stamps_and_notify():
+    woken = []
+    h = Handoff(10, DROP_OLDEST, notify=lambda: woken.append(1))
+    h.put(Lines(["a", "b", "c"], [1, 2, 3]))
+    h.put(Lines(["d"], [4]))
+    assert len(woken) == 1   # one wake-up until the consumer takes
+    lines = h.take()
+    assert (lines, lines.stamps) == (["a", "b", "c", "d"], [1, 2, 3, 4])
+    h.put(["e"])
+    assert len(woken) == 2
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        Handoff(10, "drop-random")
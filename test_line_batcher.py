@@ -0,0 +1,57 @@
+# test_line_batcher.py
+# Line splitting across chunks, flush timing and read stamps.
+
+from line_batcher import LineBatcher
+
+
+def test_partial_line_carried_over():
+    b = LineBatcher(flush_interval=0, max_batch=100)
+    b.feed(b"one\ntw")
+    assert b.take() == ["one"]
+    b.feed(b"o\r\nthr")
+    b.feed(b"ee\n\n  \nfour")
+    assert b.take() == ["two", "three"]   # blank lines dropped, \r stripped
+    assert b.pending() == 0
+
+    b.flush_partial()
+    assert b.take() == ["four"]
+    b.flush_partial()
+    assert b.pending() == 0
+
+
+def test_multibyte_split_between_chunks():
+    b = LineBatcher(flush_interval=0)
+    data = "température=21°C\n".encode("utf-8")
+    b.feed(data[:3])
+    b.feed(data[3:])
+    assert b.take() == ["température=21°C"]
+
+
+def test_flush_interval_and_max_batch():
+    b = LineBatcher(flush_interval=1.0, max_batch=3)
+    b.take(now=100.0)   # start the timer at a known time
+    b.feed(b"a\nb\n")
+    assert not b.ready(now=100.5)
+    assert b.ready(now=101.0)
+
+    b.feed(b"c\nd\ne\nf\ng\n")
+    assert b.ready(now=100.0)   # max_batch reached, no waiting
+    assert b.take(now=100.0) == ["a", "b", "c"]
+    assert b.take(now=100.0) == ["d", "e", "f"]
+    assert not b.ready(now=100.5)
+    assert b.take(now=101.0) == ["g"]
+    assert not b.ready(now=200.0)   # nothing pending
+
+
+def test_stamps_follow_their_chunk():
+    b = LineBatcher(flush_interval=0, max_batch=2, stamped=True)
+    b.feed(b"a\nb", t_ns=10)
+    b.feed(b"\nc\n", t_ns=20)   # "b" is completed by the second chunk
+    first = b.take()
+    assert (first, first.stamps) == (["a", "b"], [10, 20])
+    second = b.take()
+    assert (second, second.stamps) == (["c"], [20])
+
+    b.feed(b"tail", t_ns=30)
+    b.flush_partial()
+    assert b.take() == ["tail"]
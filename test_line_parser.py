@@ -0,0 +1,58 @@
+# test_line_parser.py
+# What LineParser counts as parsed, skipped and malformed.
+
+from line_parser import CsvFormat, KeyValueFormat, LineParser, TemplateFormat
+
+
+def test_template_rejects_trailing_text():
+    fmt = TemplateFormat("raw value = %(raw)d")
+    parser = LineParser(fmt)
+    assert parser.parse("raw value = 12") == {"raw": 12}
+    assert parser.parse("[00:01] raw value = 7  ") == {"raw": 7}
+    assert parser.parse("raw value = 12.5") is None
+    assert parser.parse("hello") is None
+    assert (parser.parsed, parser.malformed, parser.skipped) == (2, 1, 1)
+
+    parser = LineParser(TemplateFormat("t=%d"))
+    assert parser.parse("t=1,2") is None
+    assert parser.malformed == 1
+
+
+def test_template_fields():
+    fmt = TemplateFormat("T:%f H:%f 100%% id=%x")
+    assert fmt.parse("T:21.5 H:40 100% id=ff") == {"f0": 21.5, "f1": 40.0, "f2": 255}
+
+
+def test_key_value_filter_skips_lines_without_wanted_keys():
+    parser = LineParser(KeyValueFormat(fields=["temp"]))
+    assert parser.parse("hum=40 rssi=-70") is None
+    assert parser.parse("temp=21.5 hum=40") == {"temp": 21.5}
+    assert parser.parse("temp=abc") is None
+    assert (parser.parsed, parser.skipped, parser.malformed) == (1, 1, 1)
+
+
+def test_next_format_takes_a_failed_line():
+    parser = LineParser(CsvFormat(["a", "b"]), KeyValueFormat())
+    assert parser.parse("1,2") == {"a": 1, "b": 2}
+    assert parser.parse("x=3") == {"x": 3}      # CsvFormat fails, KeyValueFormat takes it
+    assert parser.parse("1,2,3") is None        # nobody takes it
+    assert (parser.parsed, parser.malformed, parser.skipped) == (2, 1, 0)
+
+
+def test_template_keeps_its_lines_from_later_formats():
+    # a template miss must not come back as a key=value pair named "value"
+    parser = LineParser(TemplateFormat("raw value = %(raw)d"), KeyValueFormat())
+    assert parser.parse("raw value = 7") == {"raw": 7}
+    assert parser.parse("raw value = 12.5") is None
+    assert parser.parse("[00:01]  raw  value =oops") is None
+    assert parser.parse("temp=21.5 hum=40") == {"temp": 21.5, "hum": 40}
+    assert parser.parse("raw reading=3") == {"reading": 3}   # only "raw": not the template's
+    assert (parser.parsed, parser.malformed, parser.skipped) == (3, 2, 0)
+
+
+def test_parse_batch_columns():
+    parser = LineParser(KeyValueFormat())
+    batch = parser.parse_batch(["a=1", "junk", "a=2 b=5", "b=6", "a=oops"])
+    assert batch.rows == 3
+    assert batch.columns == {"a": [1, 2, None], "b": [None, 5, 6]}
+    assert batch.skipped == 2
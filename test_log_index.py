@@ -0,0 +1,83 @@
+# test_log_index.py
+# LogIndex search against a plain scan with query.match over every line.
+
+import random
+
+import pytest
+
+import log_index
+from log_index import LogIndex, make_query
+
+
+WORDS = ["i2c", "x1abc", "error", "warn", "info", "temp", "hum", "spi0", "adc_12",
+         "ok", "fail", "retry", "_tmp", "abc", "2c"]
+
+
+def _lines(n, seed=1):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        parts = rng.sample(WORDS, 3) + [f"{rng.choice(['t', 'v', 'temp'])}={rng.randint(0, 99)}"]
+        out.append(" ".join(parts).upper() if rng.random() < 0.1 else " ".join(parts))
+    return out
+
+
+def _search(index, query):
+    found = []
+    index.on_results = lambda gen, seqs, reset: found.append(list(seqs))
+    index._search(0, query)
+    return found[-1]
+
+
+def _scan(lines, query, first=0):
+    return [first + i for i, line in enumerate(lines) if query.match(line)]
+
+
+@pytest.mark.parametrize("common_min", [4096, 50])
+def test_search_matches_scan(monkeypatch, common_min):
+    # common_min=50 makes frequent words common, so the index skips them
+    monkeypatch.setattr(log_index, "COMMON_MIN", common_min)
+    lines = _lines(2000)
+    index = LogIndex()
+    for start in range(0, len(lines), 300):
+        index._index(start, lines[start:start + 300])
+
+    rng = random.Random(2)
+    texts = ["2c", "1abc", "i2c err", "c e", "abc", "ror", "temp=", "=4", "_tm", "OK"]
+    for _ in range(100):
+        line = rng.choice(lines).lower()
+        a = rng.randrange(len(line))
+        texts.append(line[a:a + rng.randint(1, 8)])
+    for text in texts:
+        query = make_query("text", text)
+        assert _search(index, query) == _scan(lines, query), text
+
+    for kind, text in [("regex", r"spi\d"), ("level", "warn"), ("field", "temp>50"),
+                       ("field", "t~1"), ("field", "v")]:
+        query = make_query(kind, text)
+        assert _search(index, query) == _scan(lines, query), (kind, text)
+
+
+def test_search_after_eviction():
+    lines = _lines(3000, seed=3)
+    index = LogIndex(capacity=1000)
+    for start in range(0, len(lines), 100):
+        index._index(start, lines[start:start + 100])
+    base = index._base
+    assert base > 0
+    for text in ["2c", "error", "x1abc ok"]:
+        query = make_query("text", text)
+        assert _search(index, query) == _scan(lines[base:], query, base), text
+
+
+def test_live_matches_history():
+    # what a set query sends for new lines is what a search finds later
+    lines = _lines(500, seed=4)
+    index = LogIndex()
+    query = make_query("text", "2c")
+    index._query = (1, query)
+    live = []
+    index.on_results = lambda gen, seqs, reset: live.extend(seqs)
+    for start in range(0, len(lines), 50):
+        index._index(start, lines[start:start + 50])
+    assert live == _search(index, query) == _scan(lines, query)
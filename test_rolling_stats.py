@@ -0,0 +1,56 @@
+# test_rolling_stats.py
+# RollingStats against the statistics module over the same sliding window.
+
+import math
+import random
+import statistics
+from collections import deque
+
+import pytest
+
+from rolling_stats import RollingStats
+
+
+def _streams():
+    rng = random.Random(7)
+    yield "ties", [rng.randrange(5) for _ in range(600)]
+    yield "floats", [rng.gauss(100, 15) for _ in range(600)]
+    yield "rising", list(range(600))
+    yield "falling", list(range(600, 0, -1))
+    yield "sawtooth", [i % 37 for i in range(600)]
+
+
+@pytest.mark.parametrize("window", [1, 2, 3, 10, 101])
+@pytest.mark.parametrize("name, data", list(_streams()))
+def test_matches_statistics(name, data, window):
+    stats = RollingStats(window)
+    recent = deque(maxlen=window)
+    for n, x in enumerate(data):
+        stats.push(x)
+        recent.append(x)
+        assert stats.count == len(recent)
+        assert stats.last == x
+        assert stats.delta == (x - data[n - 1] if n else None)
+        assert stats.min == min(recent)
+        assert stats.max == max(recent)
+        assert stats.median == statistics.median(recent)
+        assert math.isclose(stats.mean, statistics.fmean(recent), rel_tol=1e-9, abs_tol=1e-9)
+        if len(recent) > 1:
+            assert math.isclose(stats.std, statistics.stdev(recent), rel_tol=1e-6, abs_tol=1e-6)
+        else:
+            assert stats.std is None
+
+
+def test_empty():
+    snap = RollingStats(10).snapshot()
+    assert snap["count"] == 0
+    assert all(snap[k] is None for k in ("last", "delta", "mean", "std", "min", "max", "median"))
+
+
+@pytest.mark.parametrize("data", [range(100_000), range(100_000, 0, -1)])
+def test_memory_stays_bounded(data):
+    # samples that left the window must not pile up under the heap tops
+    stats = RollingStats(100)
+    for x in data:
+        stats.push(x)
+        assert len(stats._low) + len(stats._high) <= 2 * 100 + 32
@@ -0,0 +1,94 @@
+# test_sample_ring.py
+# SampleRing wraparound, contiguous views and the write counters.
+
+import numpy as np
+
+from sample_ring import SampleRing
+
+
+def test_empty():
+    r = SampleRing(4)
+    assert len(r) == 0
+    assert r.last() is None
+    assert len(r.view()) == 0
+    assert r.total == 0
+
+
+def test_append_wraps_around():
+    r = SampleRing(4)
+    for i in range(10):
+        r.append(i)
+    assert len(r) == 4
+    assert r.view().tolist() == [6, 7, 8, 9]
+    assert r.view(2).tolist() == [8, 9]
+    assert r.view(100).tolist() == [6, 7, 8, 9]
+    assert r.last() == 9
+    assert (r.total, r.version) == (10, 10)
+
+
+def test_view_is_contiguous_at_every_head():
+    # whatever the head position, view() is one slice of the array, no copy
+    r = SampleRing(5)
+    for i in range(17):
+        r.append(i)
+        v = r.view()
+        assert v.flags["C_CONTIGUOUS"]
+        assert np.shares_memory(v, r._data)
+        assert v.tolist() == list(range(max(0, i - 4), i + 1))
+
+
+def test_extend_across_the_end():
+    r = SampleRing(8)
+    r.extend(np.arange(6))
+    r.extend(np.arange(6, 11))   # wraps: 2 at the end, 3 at the start
+    assert r.view().tolist() == list(range(3, 11))
+    assert r.last() == 10
+    assert r.total == 11
+    assert r.version == 2
+
+
+def test_extend_longer_than_capacity():
+    r = SampleRing(4)
+    r.append(-1)
+    r.extend(range(10))
+    assert r.view().tolist() == [6, 7, 8, 9]
+    assert r.total == 11
+
+
+def test_extend_matches_append():
+    a, b = SampleRing(7), SampleRing(7)
+    rng = np.random.default_rng(1)
+    for n in rng.integers(0, 12, 50):
+        values = rng.random(n)
+        a.extend(values)
+        for v in values:
+            b.append(v)
+        assert np.array_equal(a.view(), b.view())
+        assert a.total == b.total
+
+
+def test_view_survives_until_overwritten():
+    r = SampleRing(4)
+    r.extend([1, 2, 3, 4])
+    v = r.view()
+    r.append(5)
+    # a view, not a copy: the mirrored half is rewritten in place
+    assert v.tolist() == [5, 2, 3, 4]
+    assert r.view().tolist() == [2, 3, 4, 5]
+
+
+def test_clear():
+    r = SampleRing(4)
+    r.extend(range(6))
+    version = r.version
+    r.clear()
+    assert (len(r), r.total, r.last()) == (0, 0, None)
+    assert r.version > version
+    r.append(7)
+    assert r.view().tolist() == [7]
+
+
+def test_dtype():
+    r = SampleRing(3, np.int32)
+    r.extend([1, 2, 3, 4])
+    assert r.view().dtype == np.int32
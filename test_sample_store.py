@@ -0,0 +1,84 @@
+# test_sample_store.py
+# SampleStore columns stay row-aligned across appends, extends and new channels.
+
+import math
+
+import numpy as np
+
+from sample_store import SampleStore
+
+
+def test_append_rows():
+    s = SampleStore(["a", "b"], capacity=8)
+    s.append({"a": 1, "b": 2}, t=10.0)
+    s.append({"a": 3}, t=11.0)
+    t, cols = s.window()
+    assert t.tolist() == [10.0, 11.0]
+    assert cols["a"].tolist() == [1, 3]
+    assert cols["b"][0] == 2 and math.isnan(cols["b"][1])
+    assert len(s) == 2
+
+
+def test_new_channel_is_backfilled_with_nan():
+    s = SampleStore(["a"], capacity=8)
+    s.append({"a": 1}, t=0.0)
+    s.append({"a": 2}, t=1.0)
+    s.append({"a": 3, "c": 30}, t=2.0)
+    c = s.column("c")
+    assert np.isnan(c[:2]).all() and c[2] == 30
+    assert s.ring("c").total == s.t.total == 3
+
+
+def test_extend_columns():
+    s = SampleStore(capacity=8)
+    s.extend({"x": [1, 2, 3], "y": [4, 5, 6]}, t=[0.0, 1.0, 2.0])
+    s.extend({"x": [7]}, t=[3.0])
+    t, cols = s.window(2)
+    assert t.tolist() == [2.0, 3.0]
+    assert cols["x"].tolist() == [3, 7]
+    assert cols["y"][0] == 6 and math.isnan(cols["y"][1])
+
+
+def test_extend_nothing():
+    s = SampleStore(["x"], capacity=8)
+    version = s.version
+    s.extend({})
+    s.extend({"x": []})
+    assert len(s) == 0 and s.version == version
+
+
+def test_columns_wrap_together():
+    s = SampleStore(["a", "b"], capacity=5)
+    for i in range(12):
+        s.append({"a": i, "b": -i}, t=float(i))
+    t, cols = s.window()
+    assert t.tolist() == [7, 8, 9, 10, 11]
+    assert cols["a"].tolist() == [7, 8, 9, 10, 11]
+    assert cols["b"].tolist() == [-7, -8, -9, -10, -11]
+    assert len(s) == 5
+
+
+def test_since():
+    s = SampleStore(["a"], capacity=16)
+    s.extend({"a": range(10)}, t=np.arange(10) * 0.5)
+    assert s.since(3.0) == 4      # 3.0, 3.5, 4.0, 4.5
+    assert s.since(100.0) == 0
+    assert s.since(-1.0) == 10
+
+
+def test_version_bumps_once_the_row_is_complete():
+    s = SampleStore(["a"], capacity=4)
+    v = s.version
+    s.append({"a": 1})
+    assert s.version == v + 1
+    s.extend({"a": [2, 3]})
+    assert s.version == v + 2
+
+
+def test_clear():
+    s = SampleStore(["a"], capacity=4)
+    s.extend({"a": [1, 2]}, t=[0.0, 1.0])
+    s.clear()
+    assert len(s) == 0 and len(s.column("a")) == 0
+    s.append({"a": 5}, t=2.0)
+    assert s.column("a").tolist() == [5]
@@ -0,0 +1,119 @@
+# test_state_store.py
+# StateStore snapshot versioning and waking readers.
+
+import threading
+
+from state_store import StateStore
+
+
+def test_initial_snapshot():
+    s = StateStore(distance=0, status="init")
+    assert s.snapshot() == (0, {"distance": 0, "status": "init"})
+    assert s.seq == 0
+
+
+def test_publish_bumps_the_seq_once_per_call():
+    s = StateStore(distance=0, status="init")
+    assert s.publish(distance=42, status="OK") == 1
+    assert s.snapshot() == (1, {"distance": 42, "status": "OK"})
+    assert s.publish(distance=43) == 2
+    assert s.snapshot()[1] == {"distance": 43, "status": "OK"}
+
+
+def test_publishing_current_values_changes_nothing():
+    s = StateStore(distance=5)
+    before = s.snapshot()
+    assert s.publish(distance=5) == 0
+    assert s.publish() == 0
+    assert s.snapshot() is before
+
+
+def test_new_key_is_a_change():
+    s = StateStore()
+    assert s.publish(extra=None) == 1
+    assert s.snapshot()[1] == {"extra": None}
+
+
+def test_published_snapshots_are_never_modified():
+    s = StateStore(a=1, b=2)
+    _, old = s.snapshot()
+    s.publish(a=10)
+    assert old == {"a": 1, "b": 2}
+    assert s.snapshot()[1] is not old
+
+
+def test_constructor_copies_the_values():
+    values = {"a": 1}
+    s = StateStore(**values)
+    values["a"] = 2
+    assert s.snapshot()[1] == {"a": 1}
+
+
+def test_wait_returns_at_once_if_behind():
+    s = StateStore(a=1)
+    s.publish(a=2)
+    assert s.wait(0, timeout=0) == (1, {"a": 2})
+
+
+def test_wait_times_out_with_the_same_seq():
+    s = StateStore(a=1)
+    assert s.wait(0, timeout=0.01) == (0, {"a": 1})
+
+
+def test_wait_wakes_on_publish():
+    s = StateStore(a=0)
+    got = []
+    waiting = threading.Event()
+
+    def reader():
+        waiting.set()
+        got.append(s.wait(0, timeout=5))
+
+    t = threading.Thread(target=reader)
+    t.start()
+    waiting.wait()
+    s.publish(a=1)
+    t.join(5)
+    assert got == [(1, {"a": 1})]
+
+
+def test_reader_sees_every_value_published_together():
+    # whatever snapshot a reader gets, x and y were published as a pair
+    s = StateStore(x=0, y=0)
+    torn = []
+    done = threading.Event()
+
+    def reader():
+        seen = 0
+        while not done.is_set():
+            got = s.wait(seen, timeout=0.1)
+            if got is None:
+                return
+            seen, values = got
+            if values["y"] != -values["x"]:
+                torn.append(values)
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    for t in readers:
+        t.start()
+    for i in range(1, 5000):
+        s.publish(x=i, y=-i)
+    done.set()
+    s.close()
+    for t in readers:
+        t.join(5)
+    assert torn == []
+    assert s.seq == 4999
+
+
+def test_close_wakes_readers_for_good():
+    s = StateStore(a=0)
+    got = []
+
+    t = threading.Thread(target=lambda: got.append(s.wait(0)))
+    t.start()
+    s.close()
+    t.join(5)
+    assert not t.is_alive()
+    assert got == [None]
+    assert s.wait(0) is None
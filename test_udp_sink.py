@@ -0,0 +1,119 @@
+# test_udp_sink.py
+# UdpForwarder datagram packing, truncation and the counters, over loopback.
+
+import socket
+import time
+
+import pytest
+
+from latency import LatencyHistogram, Lines
+from udp_sink import UdpForwarder
+
+
+@pytest.fixture
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(2)
+    yield sock
+    sock.close()
+
+
+def _forwarder(receiver, **kwargs):
+    f = UdpForwarder(**kwargs)
+    f.set_destination(*receiver.getsockname())
+    return f
+
+
+def _drain(sock):
+    # every datagram waiting on sock
+    datagrams = []
+    sock.settimeout(0.2)
+    try:
+        while True:
+            datagrams.append(sock.recv(65536))
+    except socket.timeout:
+        return datagrams
+
+
+def test_lines_are_packed_up_to_the_mtu(receiver):
+    f = _forwarder(receiver, mtu=100, flush_interval=10)
+    f.start()
+    lines = [f"line {i:04d}" for i in range(50)]   # 9 bytes + "\n"
+    f.send_lines(lines)
+    f.stop()   # sends the partly filled last datagram
+    datagrams = _drain(receiver)
+    assert [len(d) for d in datagrams] == [100] * 5
+    assert b"".join(datagrams).decode().splitlines() == lines
+    assert (f.sent, f.dropped, f.errors, f.truncated) == (5, 0, 0, 0)
+
+
+def test_lines_never_straddle_datagrams(receiver):
+    f = _forwarder(receiver, mtu=25, flush_interval=10)
+    f.start()
+    f.send_lines(["a" * 9, "b" * 9, "c" * 9])   # 10 bytes each
+    f.stop()
+    datagrams = _drain(receiver)
+    assert datagrams == [b"a" * 9 + b"\n" + b"b" * 9 + b"\n", b"c" * 9 + b"\n"]
+
+
+def test_long_line_is_truncated(receiver):
+    f = _forwarder(receiver, mtu=16, flush_interval=10)
+    f.start()
+    f.send_lines(["short", "x" * 40, "end"])
+    f.stop()
+    datagrams = _drain(receiver)
+    assert datagrams == [b"short\n", b"x" * 15 + b"\n", b"end\n"]
+    assert all(len(d) <= 16 for d in datagrams)
+    assert f.truncated == 1
+
+
+def test_flush_interval_sends_a_partial_datagram(receiver):
+    f = _forwarder(receiver, mtu=1400, flush_interval=0.02)
+    f.start()
+    try:
+        t0 = time.monotonic()
+        f.send_lines(["ping"])
+        assert receiver.recv(65536) == b"ping\n"   # before stop()
+        assert time.monotonic() - t0 < 1
+    finally:
+        f.stop()
+
+
+def test_lines_are_ignored_while_disabled():
+    f = UdpForwarder()
+    f.start()
+    f.send_lines(["nowhere"])
+    f.stop()
+    assert f.queue.lines_in == 0 and f.sent == 0
+
+
+def test_disabled_with_lines_queued_counts_dropped(receiver):
+    f = _forwarder(receiver, mtu=10, flush_interval=10)
+    f.send_lines(["1234", "5678", "abcd"])   # queued before the worker runs
+    f.disable()
+    f.start()
+    f.stop()
+    assert _drain(receiver) == []
+    assert (f.sent, f.dropped) == (0, 2)
+
+
+def test_bad_destination_raises():
+    f = UdpForwarder()
+    try:
+        with pytest.raises(ValueError):
+            f.set_destination("127.0.0.1", "port")
+        assert f.dest is None
+    finally:
+        f.sock.close()
+
+
+def test_latency_records_each_sent_line(receiver):
+    hist = LatencyHistogram()
+    f = _forwarder(receiver, flush_interval=10, latency=hist)
+    f.start()
+    now = time.perf_counter_ns()
+    f.send_lines(Lines(["a", "b", "c"], [now, now, now + 1]))
+    f.stop()
+    assert _drain(receiver) == [b"a\nb\nc\n"]
+    assert hist.count == 3
@@ -0,0 +1,117 @@
+# udp_sink.py
+# UDP forwarding of serial lines, off the GUI thread.
+#
+# send_lines() only puts the batch on a bounded queue (handoff.py), so it is
+# cheap enough to be called straight from the serial reader thread. With
+# policy="block" nothing is ever dropped: a reader that outruns the network
+# waits instead. The default drops the oldest lines. The forwarder thread packs
+# lines ("\n" separated) into datagrams of up to mtu bytes and sends a
+# datagram when it is full or flush_interval after its first line. A line
+# longer than mtu is cut to fit (newline kept) and counted in truncated.
+# The destination is resolved once, in set_destination().
+# Given a LatencyHistogram as latency, batches that carry read stamps
+# (latency.Lines) record read -> sent for every line.
+
+import socket
+import threading
+import time
+
+from handoff import Handoff, DROP_OLDEST
+
+
+class UdpForwarder(threading.Thread):
+    def __init__(self, mtu=1400, flush_interval=0.01, max_backlog=100_000,
+                 policy=DROP_OLDEST, latency=None):
+        super().__init__(daemon=True)
+        self.mtu = mtu                        # max datagram payload (bytes)
+        self.flush_interval = flush_interval  # max time a line waits (s)
+        self.latency = latency                # LatencyHistogram, None = off
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.dest = None   # resolved (ip, port), None = forwarding off
+        self.running = True
+        self.queue = Handoff(max_backlog, policy)   # max_backlog: queued lines
+
+        # datagram counters, read by the GUI
+        self.sent = 0
+        self.dropped = 0   # packed while forwarding was off
+        self.errors = 0
+        self.truncated = 0   # lines cut to mtu bytes
+
+    # ---- Settings (GUI thread) ----
+    def set_destination(self, ip, port):
+        # raises (socket.gaierror / ValueError) on bad settings
+        info = socket.getaddrinfo(ip, int(port), socket.AF_INET, socket.SOCK_DGRAM)
+        self.dest = info[0][4]
+
+    def disable(self):
+        self.dest = None
+
+    # ---- Input (any thread) ----
+    def send_lines(self, lines):
+        if self.dest is not None:
+            self.queue.put(lines)
+
+    def backlog(self):
+        # lines queued for the worker
+        return self.queue.depth
+
+    @property
+    def dropped_lines(self):
+        # lines the queue policy threw away
+        return self.queue.dropped
+
+    def stop(self):
+        # sends what is queued, then stops
+        self.running = False
+        self.queue.close()
+        self.join()
+        self.sock.close()
+
+    # ---- Worker ----
+    def run(self):
+        buf = bytearray()
+        stamps = []   # read stamps of the lines in buf
+        deadline = None
+        while self.running or self.queue.depth:
+            timeout = 0.5 if deadline is None else max(0.0, deadline - time.monotonic())
+            lines = self.queue.take(timeout)
+
+            if lines:
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                line_stamps = lines.stamps if self.latency else None
+                for i, line in enumerate(lines):
+                    data = line.encode("utf-8") + b"\n"
+                    if buf and len(buf) + len(data) > self.mtu:
+                        self._send(buf, stamps)
+                        buf = bytearray()
+                        deadline = time.monotonic() + self.flush_interval
+                    if len(data) > self.mtu:
+                        data = data[:self.mtu - 1] + b"\n"
+                        self.truncated += 1
+                    buf += data
+                    if line_stamps is not None:
+                        stamps.append(line_stamps[i])
+
+            if buf and time.monotonic() >= deadline:
+                self._send(buf, stamps)
+                buf = bytearray()
+                deadline = None
+
+        if buf:
+            self._send(buf, stamps)
+
+    def _send(self, buf, stamps):
+        dest = self.dest
+        if dest is None:
+            self.dropped += 1
+        else:
+            try:
+                self.sock.sendto(buf, dest)
+                self.sent += 1
+                if stamps:
+                    self.latency.record_stamps(stamps)
+            except OSError:
+                self.errors += 1
+        stamps.clear()
@@ -0,0 +1,470 @@
+# xy_chart.py
+# Streaming XY chart on QtCharts.
+#
+# QXYSeries.append(x, y) per point makes the chart recompute and repaint
+# for every single point. Here points collect in two SampleRings (x and y,
+# the rolling window: the oldest points roll out) and once per frame the
+# whole window goes to the series in one replaceNp() call, straight from
+# the NumPy buffers. A frame costs one pass over the window in C++, however
+# many points came in since the last one; frames without new points are
+# skipped.
+#
+# opengl=True draws the series through QtCharts' OpenGL path, which keeps
+# up with hundreds of thousands of points. Without it QtCharts manages a
+# few tens of thousands: a raster QScatterSeries makes a graphics item per
+# marker (slower than quadratic as it grows), so a raster scatter is a
+# line series with markers and no pen, and a raster line whose x only goes
+# up (rows, time) is reduced to min/max per pixel column (decimate.py)
+# before it goes to the series.
+#
+# Axes follow the data incrementally: new points widen the running min/max
+# with one min()/max() over the batch, the whole window is only scanned
+# again when points that held an extreme roll out. As in live_plot, the
+# limits only change when the data leaves them or uses less than SHRINK of
+# them.
+#
+#   chart = StreamingXYChart(window=100_000, kind="line", opengl=True)
+#   chart.replace(x, y)      # whole arrays
+#   chart.append(x, y)       # arrays or single values
+#   chart.start()
+#
+# XYPlotWindow is the XY plot tool (plotXY.py, GUI_PLOTXY.py): points typed
+# in by hand or two fields of "name=value" serial lines, on a chart built
+# once the window is up. numpy (and with it decimate / sample_ring) is only
+# imported by the chart, so the window shows before it loads (startup.py).
+
+import math
+import time
+
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QPainter, QPen
+from PySide6.QtCharts import QChart, QChartView, QLineSeries, QScatterSeries, QValueAxis
+from PySide6.QtWidgets import (
+    QWidget, QPushButton, QLineEdit, QLabel, QComboBox, QCheckBox, QSpinBox
+)
+
+from serial_reader import SerialReader
+from line_parser import LineParser, KeyValueFormat
+from startup import after_first_paint
+from port_registry import PortRegistry, PortChooser
+
+
+KINDS = ("scatter", "line")
+MARGIN = 0.05   # autoscale: room around the data
+SHRINK = 0.5    # autoscale: tighten once the data uses less than this of the range
+ROW = "(row)"   # XYPlotWindow x field: running number of the parsed line
+
+
+class StreamingXYChart(QChartView):
+    def __init__(self, parent=None, window=100_000, kind="scatter", opengl=False,
+                 fps=20, title=None):
+        from sample_ring import SampleRing
+
+        super().__init__(QChart(), parent)
+        self.setRenderHint(QPainter.Antialiasing, False)   # too slow for dense series
+        chart = self.chart()
+        if title:
+            chart.setTitle(title)
+        chart.legend().hide()
+
+        self.x = SampleRing(window)
+        self.y = SampleRing(window)
+        self.autoscale = True
+        self.marker_size = 6.0
+        self.series = None
+        self._opengl = opengl
+        self._dirty = False
+        self._sorted = True   # x never went down: the line can be decimated
+        self._stale = False   # an extreme rolled out, scan the window again
+        self._lo = [math.inf, math.inf]     # running x, y minimum of the window
+        self._hi = [-math.inf, -math.inf]   # running x, y maximum of the window
+
+        self.ax_x = QValueAxis()
+        self.ax_y = QValueAxis()
+        chart.addAxis(self.ax_x, Qt.AlignBottom)
+        chart.addAxis(self.ax_y, Qt.AlignLeft)
+        self.set_kind(kind)
+
+        # frames pushed to the series, the time they took and the points of
+        # the last one
+        self.frames = 0
+        self.frame_ns = 0
+        self.points = 0
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_series)
+        self.set_fps(fps)
+
+    # ---- Control ----
+    def set_fps(self, fps):
+        self.fps = fps
+        self.timer.setInterval(max(1, int(1000 / fps)))
+
+    def set_kind(self, kind):
+        if kind not in KINDS:
+            raise ValueError(f"unknown kind {kind!r}")
+        self.kind = kind
+        self._make_series()
+
+    def set_opengl(self, on):
+        self._opengl = on
+        self._make_series()
+
+    def _make_series(self):
+        chart = self.chart()
+        if self.series is not None:
+            chart.removeSeries(self.series)
+        if self.kind == "line":
+            series = QLineSeries()
+        elif self._opengl:
+            series = QScatterSeries()
+            series.setMarkerSize(self.marker_size)
+        else:
+            # same look as a scatter, drawn as one path instead of an item per point
+            series = QLineSeries()
+            series.setPen(QPen(Qt.NoPen))
+            series.setPointsVisible(True)
+            series.setMarkerSize(self.marker_size)
+        series.setUseOpenGL(self._opengl)
+        chart.addSeries(series)
+        series.attachAxis(self.ax_x)
+        series.attachAxis(self.ax_y)
+        self.series = series
+        self._dirty = True
+
+    def set_autoscale(self, on):
+        self.autoscale = on
+        self._dirty = True
+
+    def set_window(self, window):
+        from sample_ring import SampleRing
+
+        # keep the newest points that fit
+        x, y = self.x.view(window).copy(), self.y.view(window).copy()
+        self.x = SampleRing(window)
+        self.y = SampleRing(window)
+        self.x.extend(x)
+        self.y.extend(y)
+        self._stale = True
+        self._dirty = True
+
+    @property
+    def window(self):
+        return self.x.capacity
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    # ---- Data ----
+    def replace(self, x, y):
+        # the whole data set at once (only the last `window` points are kept)
+        self.clear()
+        self.append(x, y)
+
+    def append(self, x, y):
+        # arrays, lists or single values; pairs with a NaN are dropped
+        import numpy as np
+
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        if len(x) != len(y):
+            raise ValueError(f"{len(x)} x values for {len(y)} y values")
+        keep = ~(np.isnan(x) | np.isnan(y))
+        if not keep.all():
+            x, y = x[keep], y[keep]
+        n = len(x)
+        if n == 0:
+            return
+        cap = self.x.capacity
+        if n > cap:
+            x, y = x[-cap:], y[-cap:]
+
+        # points about to roll out: if one of them is an extreme, the
+        # running min/max is no longer right
+        out = len(self.x) + len(x) - cap
+        if out >= len(self.x):
+            self._stale = True
+        elif out > 0 and not self._stale:
+            for old, axis in ((self.x.view()[:out], 0), (self.y.view()[:out], 1)):
+                if old.min() <= self._lo[axis] or old.max() >= self._hi[axis]:
+                    self._stale = True
+
+        if self._sorted:
+            last = self.x.last()
+            self._sorted = ((last is None or x[0] >= last)
+                            and (n == 1 or bool((np.diff(x) >= 0).all())))
+        self.x.extend(x)
+        self.y.extend(y)
+        if not self._stale:
+            self._widen(x, y)
+        self._dirty = True
+
+    def clear(self):
+        self.x.clear()
+        self.y.clear()
+        self._lo = [math.inf, math.inf]
+        self._hi = [-math.inf, -math.inf]
+        self._sorted = True
+        self._stale = False
+        self._dirty = True
+
+    # ---- Axes ----
+    def _widen(self, x, y):
+        for axis, v in ((0, x), (1, y)):
+            self._lo[axis] = min(self._lo[axis], float(v.min()))
+            self._hi[axis] = max(self._hi[axis], float(v.max()))
+
+    def _rescale(self, axis, lo, hi):
+        # new range if lo..hi left the old one or uses too little of it
+        r0, r1 = axis.min(), axis.max()
+        if r0 <= lo and hi <= r1 and hi - lo >= (r1 - r0) * SHRINK:
+            return
+        pad = (hi - lo) * MARGIN or abs(hi) * MARGIN or 1.0
+        axis.setRange(lo - pad, hi + pad)
+
+    # ---- Drawing ----
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._dirty = True   # a decimated line has to match the new width
+
+    def update_series(self):
+        import numpy as np
+        from decimate import minmax
+
+        if not self._dirty:
+            return   # no new points
+        self._dirty = False
+        t0 = time.perf_counter_ns()
+
+        x, y = self.x.view(), self.y.view()
+        if self._stale:
+            self._stale = False
+            self._lo = [math.inf, math.inf]
+            self._hi = [-math.inf, -math.inf]
+            if len(x):
+                self._widen(x, y)
+        # limits first: points far outside the old range make the series'
+        # geometry update many times slower
+        if self.autoscale and len(x):
+            self._rescale(self.ax_x, self._lo[0], self._hi[0])
+            self._rescale(self.ax_y, self._lo[1], self._hi[1])
+        if self.kind == "line" and self._sorted and not self._opengl:
+            x, y = minmax(x, y, max(self.width(), 100))   # view width: a pair per pixel or more
+        # replaceNp reads the buffers directly: contiguous float64 only
+        self.series.replaceNp(np.ascontiguousarray(x, dtype=np.float64),
+                              np.ascontiguousarray(y, dtype=np.float64))
+
+        self.points = len(x)
+        self.frames += 1
+        self.frame_ns += time.perf_counter_ns() - t0
+
+
+# ---------------- Window ----------------
+class XYPlotWindow(QWidget):
+    def __init__(self, title="XY Plot Example"):
+        super().__init__()
+
+        # ---- Window setup ----
+        self.setWindowTitle(title)
+        self.setFixedSize(600, 680)
+
+        self.chart_view = None   # StreamingXYChart, see build_chart()
+        self.reader_thread = None
+        self.parser = LineParser(KeyValueFormat())
+        self.rows = 0            # parsed lines, x for ROW
+
+        # ---- X input ----
+        self.input_x = QLineEdit(self)
+        self.input_x.setPlaceholderText("X value")
+        self.input_x.move(20, 20)
+        self.input_x.resize(100, 30)
+
+        # ---- Y input ----
+        self.input_y = QLineEdit(self)
+        self.input_y.setPlaceholderText("Y value")
+        self.input_y.move(140, 20)
+        self.input_y.resize(100, 30)
+
+        # ---- Button ----
+        self.btn1 = QPushButton("Plot", self)
+        self.btn1.move(260, 20)
+        self.btn1.resize(100, 30)
+        self.btn1.clicked.connect(self.on_btn1)
+
+        self.clear_button = QPushButton("Clear", self)
+        self.clear_button.move(380, 20)
+        self.clear_button.resize(100, 30)
+        self.clear_button.clicked.connect(self.on_clear)
+
+        # ---- Serial source ----
+        self.combo = QComboBox(self)
+        self.combo.move(20, 60)
+        self.combo.resize(140, 30)
+
+        self.connect_button = QPushButton("Connect", self)
+        self.connect_button.move(170, 60)
+        self.connect_button.resize(90, 30)
+        self.connect_button.clicked.connect(self.toggle_serial)
+
+        # fields of "name=value" lines, filled in as they show up
+        self.field_x = QComboBox(self)
+        self.field_x.addItem(ROW)
+        self.field_x.setToolTip("X: a field of the serial lines, or the line number")
+        self.field_x.move(270, 60)
+        self.field_x.resize(150, 30)
+        self.field_x.currentIndexChanged.connect(self.on_fields)
+
+        self.field_y = QComboBox(self)
+        self.field_y.setToolTip("Y: a field of the serial lines")
+        self.field_y.move(430, 60)
+        self.field_y.resize(150, 30)
+        self.field_y.currentIndexChanged.connect(self.on_fields)
+
+        # ---- Chart options ----
+        self.line_check = QCheckBox("Line", self)
+        self.line_check.move(20, 100)
+        self.line_check.resize(60, 30)
+        self.line_check.toggled.connect(self.on_kind)
+
+        self.opengl_check = QCheckBox("OpenGL", self)
+        self.opengl_check.setToolTip("Needed for hundreds of thousands of points")
+        self.opengl_check.move(90, 100)
+        self.opengl_check.resize(80, 30)
+        self.opengl_check.toggled.connect(self.on_opengl)
+
+        self.window_label = QLabel("Window:", self)
+        self.window_label.move(180, 100)
+        self.window_label.resize(60, 30)
+        self.window_spin = QSpinBox(self)
+        self.window_spin.setRange(10, 1_000_000)
+        self.window_spin.setSingleStep(1000)
+        self.window_spin.setValue(10_000)
+        self.window_spin.setToolTip("Points kept, the oldest roll out")
+        self.window_spin.move(240, 100)
+        self.window_spin.resize(100, 30)
+        self.window_spin.editingFinished.connect(self.on_window)
+
+        # ---- Status label ----
+        self.output_label = QLabel("Enter X and Y, then press Plot", self)
+        self.output_label.move(350, 100)
+        self.output_label.resize(230, 30)
+
+        # ---- Plot setup ----
+        # QtCharts loads once the window is up, the port list too
+        self.registry = PortRegistry()
+        self.port_chooser = PortChooser(self.combo, self.registry)
+        after_first_paint(self, self.build_chart)
+        after_first_paint(self, self.registry.start)
+
+    def build_chart(self):
+        # options changed before the chart was up apply now
+        kind = "line" if self.line_check.isChecked() else "scatter"
+        self.chart_view = StreamingXYChart(self, window=self.window_spin.value(), kind=kind,
+                                           opengl=self.opengl_check.isChecked(),
+                                           title="XY Plot")
+        self.chart_view.move(20, 140)
+        self.chart_view.resize(560, 520)
+        self.chart_view.show()
+        self.chart_view.start()
+
+    # ---- Button callback ----
+    def on_btn1(self):
+        if self.chart_view is None:
+            self.output_label.setText("Chart not ready yet")
+            return
+        try:
+            x = float(self.input_x.text())
+            y = float(self.input_y.text())
+
+            self.chart_view.append(x, y)
+            self.output_label.setText(f"Plotted point: ({x}, {y})")
+
+        except ValueError:
+            self.output_label.setText("Invalid input (enter numbers)")
+
+    def on_clear(self):
+        self.rows = 0
+        if self.chart_view is None:
+            return
+        self.chart_view.clear()
+
+    # ---- Chart options ----
+    def on_kind(self, line):
+        if self.chart_view is None:
+            return   # build_chart() reads the check box
+        self.chart_view.set_kind("line" if line else "scatter")
+
+    def on_opengl(self, on):
+        if self.chart_view is None:
+            return
+        self.chart_view.set_opengl(on)
+
+    def on_window(self):
+        if self.chart_view is None:
+            return
+        if self.window_spin.value() != self.chart_view.window:
+            self.chart_view.set_window(self.window_spin.value())
+
+    # ---- Serial source ----
+    def toggle_serial(self):
+        if self.reader_thread:
+            self.stop_serial()
+            return
+        port = self.combo.currentText()
+        if not port:
+            self.output_label.setText("Choose a serial port")
+            return
+        self.reader_thread = SerialReader(port)
+        self.reader_thread.lines_received.connect(self.on_lines)
+        self.reader_thread.disconnected.connect(self.on_serial_error)
+        self.reader_thread.start()
+        self.connect_button.setText("Disconnect")
+        self.output_label.setText(f"Reading {port}")
+
+    def stop_serial(self):
+        if self.reader_thread:
+            self.reader_thread.stop()
+            self.reader_thread = None
+        self.connect_button.setText("Connect")
+
+    def on_serial_error(self, msg):
+        self.stop_serial()
+        self.output_label.setText(msg)
+
+    def on_fields(self):
+        # points of other fields mean something else
+        if self.chart_view:
+            self.on_clear()
+
+    def on_lines(self, lines):
+        import numpy as np
+
+        batch = self.parser.parse_batch(lines)
+        if not batch.rows:
+            return
+        for name in batch.columns:
+            if self.field_y.findText(name) < 0:
+                self.field_x.addItem(name)
+                self.field_y.addItem(name)   # the first field becomes y
+        if self.chart_view is None:
+            return
+
+        # one bulk append per batch; rows without both fields are dropped
+        x_name, y_name = self.field_x.currentText(), self.field_y.currentText()
+        if x_name == ROW:
+            x = np.arange(self.rows, self.rows + batch.rows, dtype=np.float64)
+        else:
+            x = np.array(batch.columns.get(x_name, [None] * batch.rows), dtype=np.float64)
+        y = np.array(batch.columns.get(y_name, [None] * batch.rows), dtype=np.float64)
+        self.rows += batch.rows
+        self.chart_view.append(x, y)
+
+    def closeEvent(self, event):
+        self.stop_serial()
+        self.registry.stop()
+        if self.chart_view:
+            self.chart_view.stop()
+        event.accept()